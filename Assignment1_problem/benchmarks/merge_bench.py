@@ -0,0 +1,116 @@
+"""
+병합 순서 기반 MergeTokenizer와 greedy longest-match WordpieceTokenizer의 속도와 출력을 비교합니다.
+
+같은 코퍼스로 make_voca의 vocabulary와 병합 목록을 학습한 뒤, 두 토크나이저가 같은 토큰 집합
+(학습된 토큰과 그 "##" 연속 토큰)을 쓰도록 vocab 파일을 만들어 같은 코퍼스를 토큰화합니다.
+
+사용법:
+    python benchmarks/merge_bench.py --input tests/tests.txt --output merge_bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.word_piece_tokenizer import MergeTokenizer, WordpieceTokenizer
+from src.word_piece_tokenizer.make_voca import learn_wordpiece_vocab, save_merges
+from src.word_piece_tokenizer.utils import whitespace_tokenize
+from tokenizer_bench import TESTS_TXT, format_result, run_case
+
+
+def build_shared_vocab(vocab_set, output_path):
+    """학습된 토큰과 각 토큰의 "##" 형태를 모두 담은 vocab 파일을 만듭니다."""
+    tokens = sorted(token for token in vocab_set if token)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for token in ["[UNK]", "[CLS]", "[SEP]", "[PAD]"] + tokens + ["##" + token for token in tokens]:
+            f.write(token + "\n")
+
+
+def load_lines(paths, corpus_mb):
+    lines = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            lines.extend(line for line in f.read().split("\n") if line.strip())
+    corpus = []
+    size = 0
+    while size < corpus_mb * 1024 * 1024:
+        for line in lines:
+            corpus.append(line)
+            size += len(line.encode("utf-8"))
+    return lines, corpus
+
+
+def compare_outputs(greedy, merge, lines):
+    """단어 단위, 문장 단위 분할 일치율과 [UNK] 비율, 단어당 토큰 수를 구합니다."""
+    words = same_words = same_lines = 0
+    counts = {"greedy": [0, 0], "merge": [0, 0]}
+    for line in lines:
+        line_same = True
+        for word in whitespace_tokenize(line):
+            greedy_ids, greedy_tokens = greedy._segment_word(word)
+            merge_ids, merge_tokens = merge._segment_word(word)
+            words += 1
+            if greedy_tokens == merge_tokens:
+                same_words += 1
+            else:
+                line_same = False
+            for name, ids, tokenizer in (("greedy", greedy_ids, greedy), ("merge", merge_ids, merge)):
+                counts[name][0] += len(ids)
+                counts[name][1] += sum(index == tokenizer.unk_token_id for index in ids)
+        same_lines += line_same
+    report = {
+        "words": words,
+        "word_agreement": same_words / words if words else 1.0,
+        "line_agreement": same_lines / len(lines) if lines else 1.0,
+    }
+    for name, (n_tokens, n_unk) in counts.items():
+        report[f"{name}_tokens_per_word"] = n_tokens / words if words else 0.0
+        report[f"{name}_unk_rate"] = n_unk / n_tokens if n_tokens else 0.0
+    return report
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, nargs="+", default=[str(TESTS_TXT)], help="Training and benchmark corpus")
+    parser.add_argument("--num_merges", type=int, default=1000)
+    parser.add_argument("--target_vocab_size", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--corpus_mb", type=float, default=1.0, help="Size of the timed corpus in MB")
+    parser.add_argument("--output", type=str, default=None, help="Write results to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_arguments()
+    lines, corpus = load_lines(args.input, args.corpus_mb)
+    vocab_set, merges = learn_wordpiece_vocab(
+        args.input, num_merges=args.num_merges, target_vocab_size=args.target_vocab_size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        vocab_file = os.path.join(directory, "vocab.txt")
+        merges_file = os.path.join(directory, "merges.txt")
+        build_shared_vocab(vocab_set, vocab_file)
+        save_merges(merges, merges_file)
+        tokenizers = {
+            "greedy": WordpieceTokenizer(vocab_file=vocab_file),
+            "merge": MergeTokenizer(vocab_file=vocab_file, merges_file=merges_file),
+        }
+
+        results = {}
+        for name, tokenizer in tokenizers.items():
+            results[name] = run_case(tokenizer.tokenize, corpus, args.warmup, args.repeat)
+            print(format_result(f"corpus/{name}", results[name]))
+        results["comparison"] = compare_outputs(tokenizers["greedy"], tokenizers["merge"], lines)
+
+    print(f"merges: {len(merges)}, vocab: {len(vocab_set)}")
+    for key, value in results["comparison"].items():
+        print(f"{key:<28} {value:.4f}" if isinstance(value, float) else f"{key:<28} {value}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,265 @@
+"""
+오프라인 토크나이저 벤치마크입니다.
+
+warmup 후 여러 번 반복 측정해 호출당 지연 시간의 median/p95/p99와 tokens/s, MB/s 처리량을 구합니다.
+반복마다 걸린 시간의 퍼짐(spread)도 기록합니다.
+결과는 JSON baseline으로 저장할 수 있고, --compare로 이전 baseline 대비 회귀를 검사합니다.
+회귀는 threshold와 두 측정의 spread 합 중 큰 값(noise band)을 넘을 때만 보고합니다.
+네트워크나 외부 토크나이저 없이 저장소 안의 구현만 비교합니다.
+
+사용법:
+    python benchmarks/tokenizer_bench.py --output baseline.json
+    python benchmarks/tokenizer_bench.py --compare baseline.json --threshold 0.1
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.word_piece_tokenizer import FullTokenizer
+from src.word_piece_tokenizer.BasicTokenizer import BasicTokenizer
+
+DEFAULT_VOCAB = ROOT / "src" / "word_piece_tokenizer" / "vocab.txt"
+TESTS_TXT = ROOT / "tests" / "tests.txt"
+
+
+class GreedyLoopTokenizer:
+    """
+    트라이 도입 전의 Greedy Longest-Match-First 루프로 WordPiece 분할만 하는 비교용 토크나이저입니다.
+
+    BasicTokenizer는 현재 구현을 그대로 쓰므로 원래 파이프라인 전체가 아니라,
+    같은 전처리 위에서 WordPiece 단계를 트라이 대신 부분 문자열 dict 조회로 했을 때의 비용을 잽니다.
+    """
+
+    def __init__(self, vocab):
+        self.basic_tokenizer = BasicTokenizer()
+        self.vocab = vocab
+
+    def tokenize(self, text):
+        output_tokens = []
+        for token in self.basic_tokenizer.tokenize(text):
+            chars = list(token)
+            if len(chars) > 100:
+                output_tokens.append("[UNK]")
+                continue
+            is_bad = False
+            start = 0
+            sub_tokens = []
+            while start < len(chars):
+                end = len(chars)
+                cur_substr = None
+                while start < end:
+                    substr = "".join(chars[start:end])
+                    if start > 0:
+                        substr = "##" + substr
+                    if substr in self.vocab:
+                        cur_substr = substr
+                        break
+                    end -= 1
+                if cur_substr is None:
+                    is_bad = True
+                    break
+                sub_tokens.append(cur_substr)
+                start = end
+            if is_bad:
+                output_tokens.append("[UNK]")
+            else:
+                output_tokens.extend(sub_tokens)
+        return ["[CLS]"] + output_tokens + ["[SEP]"]
+
+
+def build_cases(corpus_mb):
+    """측정할 입력 묶음을 만듭니다. 모두 저장소 안의 데이터 또는 고정된 합성 문자열입니다."""
+    with open(TESTS_TXT, "r", encoding="utf-8") as f:
+        sentences = [line for line in f.read().split("\n") if line.strip()]
+    long_words = [
+        "Pneumonoultramicroscopicsilicovolcanoconiosis",
+        "internationalization " * 3,
+        "Supercalifragilisticexpialidocious antidisestablishmentarianism",
+        "a" * 90 + " " + "xyz" * 40,
+    ]
+    cjk_hangul = [
+        "와빅 와와빅 '와'와빅",
+        "abc-와와 짱 짱짱bye",
+        "自然語言處理 是 人工智能 的 一個 分支",
+        "한국어 문장과 中文 문자가 섞인 text입니다.",
+    ]
+    corpus = []
+    size = 0
+    target = corpus_mb * 1024 * 1024
+    while size < target:
+        for sentence in sentences:
+            corpus.append(sentence)
+            size += len(sentence.encode("utf-8"))
+    return {
+        "short_sentences": sentences,
+        "long_words": long_words,
+        "cjk_hangul": cjk_hangul,
+        "corpus": corpus,
+    }
+
+
+def build_tokenizers(vocab_file):
+    full = FullTokenizer(vocab_file=vocab_file)
+    return {
+        "full": full,
+        "full_cached": FullTokenizer(vocab_file=vocab_file, cache_size=1 << 16),
+        "full_compiled": FullTokenizer(vocab_file=vocab_file, compiled=True),
+        "greedy_loop": GreedyLoopTokenizer(full.wordpiece_tokenizer.vocab),
+    }
+
+
+def percentile(sorted_values, q):
+    """nearest-rank 방식의 백분위수입니다."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def run_case(tokenize, texts, warmup, repeat):
+    for _ in range(warmup):
+        for text in texts:
+            tokenize(text)
+
+    timer = time.perf_counter
+    latencies = []
+    run_times = []
+    n_tokens = 0
+    for _ in range(repeat):
+        n_tokens = 0
+        run_start = timer()
+        for text in texts:
+            start = timer()
+            tokens = tokenize(text)
+            latencies.append(timer() - start)
+            n_tokens += len(tokens)
+        run_times.append(timer() - run_start)
+
+    n_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    latencies.sort()
+    run_time = statistics.median(run_times)
+    # 반복 사이 시간 차이의 비율입니다. 비교할 때 이 안의 차이는 측정 잡음으로 봅니다.
+    spread = (max(run_times) - min(run_times)) / run_time if run_time else 0.0
+    return {
+        "calls": len(texts),
+        "repeat": repeat,
+        "latency_median_us": statistics.median(latencies) * 1e6,
+        "latency_p95_us": percentile(latencies, 95) * 1e6,
+        "latency_p99_us": percentile(latencies, 99) * 1e6,
+        "run_time_median_s": run_time,
+        "run_time_min_s": min(run_times),
+        "run_time_max_s": max(run_times),
+        "run_time_spread": spread,
+        "tokens_per_s": n_tokens / run_time if run_time else 0.0,
+        "mb_per_s": n_bytes / run_time / (1024 * 1024) if run_time else 0.0,
+    }
+
+
+def run_benchmarks(vocab_file, warmup, repeat, corpus_mb, only=None, corpus_repeat=3):
+    cases = build_cases(corpus_mb)
+    tokenizers = build_tokenizers(vocab_file)
+    results = {}
+    for case_name, texts in cases.items():
+        for tokenizer_name, tokenizer in tokenizers.items():
+            key = f"{case_name}/{tokenizer_name}"
+            if only and not any(pattern in key for pattern in only):
+                continue
+            # 큰 코퍼스는 한 번이 오래 걸리므로 반복 수를 따로 받되, spread를 구할 수 있게 두 번 이상 잽니다.
+            case_repeat = max(2, corpus_repeat) if case_name == "corpus" else repeat
+            case_warmup = min(warmup, 1) if case_name == "corpus" else warmup
+            results[key] = run_case(tokenizer.tokenize, texts, case_warmup, case_repeat)
+            print(format_result(key, results[key]))
+
+    with open(vocab_file, "rb") as f:
+        vocab_sha256 = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "vocab_sha256": vocab_sha256,
+            "warmup": warmup,
+            "repeat": repeat,
+            "corpus_repeat": corpus_repeat,
+            "corpus_mb": corpus_mb,
+        },
+        "results": results,
+    }
+
+
+def format_result(key, result):
+    return (f"{key:<40} median {result['latency_median_us']:9.2f}us  p95 {result['latency_p95_us']:9.2f}us  "
+            f"p99 {result['latency_p99_us']:9.2f}us  {result['tokens_per_s']:12.0f} tok/s  "
+            f"{result['mb_per_s']:7.3f} MB/s")
+
+
+def compare(current, baseline, threshold):
+    """
+    baseline 대비 median 지연 시간이 늘었거나 처리량이 줄어든 비율이 noise band를 넘는 항목을 찾습니다.
+    noise band는 threshold와 두 측정의 run_time_spread 합 중 큰 값입니다. spread가 없는 예전 baseline은 0으로 봅니다.
+
+    Returns:
+        회귀 항목 설명 리스트
+    """
+    regressions = []
+    if current["meta"]["vocab_sha256"] != baseline["meta"].get("vocab_sha256"):
+        print("Warning: baseline was recorded with a different vocab.txt")
+    for key, result in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        latency_ratio = result["latency_median_us"] / base["latency_median_us"] if base["latency_median_us"] else 1.0
+        throughput_ratio = result["tokens_per_s"] / base["tokens_per_s"] if base["tokens_per_s"] else 1.0
+        band = max(threshold, result.get("run_time_spread", 0.0) + base.get("run_time_spread", 0.0))
+        status = "ok"
+        if latency_ratio > 1 + band or throughput_ratio < 1 - band:
+            status = "REGRESSION"
+            regressions.append(
+                f"{key}: latency x{latency_ratio:.2f}, throughput x{throughput_ratio:.2f} (noise band {band:.0%})")
+        print(f"{key:<40} latency x{latency_ratio:5.2f}  throughput x{throughput_ratio:5.2f}  "
+              f"band {band:4.0%}  {status}")
+    return regressions
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vocab", type=str, default=str(DEFAULT_VOCAB), help="vocab.txt location")
+    parser.add_argument("--warmup", type=int, default=2, help="Warmup runs per case")
+    parser.add_argument("--repeat", type=int, default=20, help="Measured runs per case")
+    parser.add_argument("--corpus_mb", type=float, default=2.0, help="Size of the large corpus case in MB")
+    parser.add_argument("--corpus_repeat", type=int, default=3,
+                        help="Measured runs for the large corpus case (at least 2)")
+    parser.add_argument("--only", type=str, nargs="*", default=None, help="Run only keys containing these strings")
+    parser.add_argument("--output", type=str, default=None, help="Write results to this JSON file")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative slowdown before flagging")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_arguments()
+    if not os.path.isfile(args.vocab):
+        sys.exit(f"Can't find a vocabulary file at path '{args.vocab}'. Run make_voca.py or pass --vocab.")
+    report = run_benchmarks(args.vocab, args.warmup, args.repeat, args.corpus_mb, args.only, args.corpus_repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond the noise band (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
@@ -0,0 +1,126 @@
+"""
+make_voca의 빈도 가지치기와 표본 학습 옵션이 전체 학습 결과를 얼마나 바꾸는지 보여 주는 보고서입니다.
+
+각 옵션으로 학습한 vocabulary와 병합 목록을 옵션 없이 학습한 결과와 비교해,
+학습 시간, 남은 고유 단어 수, vocabulary Jaccard 유사도, 병합 순서 일치 정도를 출력합니다.
+
+사용법:
+    python benchmarks/train_report.py --input "corpus/*.txt" --num_merges 5000 --output report.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.word_piece_tokenizer.make_voca import (
+    count_words,
+    expand_input_paths,
+    get_word_counts,
+    learn_wordpiece_vocab,
+    prune_word_counts,
+    reservoir_sample_lines,
+)
+from tokenizer_bench import TESTS_TXT
+
+
+def default_variants(n_lines):
+    return {
+        "min_frequency=2": {"min_frequency": 2},
+        "min_frequency=3": {"min_frequency": 3},
+        "max_words=50%": {"max_words_fraction": 0.5},
+        "sample_rate=0.5": {"sample_rate": 0.5},
+        "sample_lines=50%": {"sample_lines": max(1, n_lines // 2)},
+    }
+
+
+def resolve_max_words(options, n_words):
+    """max_words_fraction을 전체 고유 단어 수에 대한 max_words 개수로 바꾼 옵션을 반환합니다."""
+    options = dict(options)
+    fraction = options.pop("max_words_fraction", None)
+    if fraction is not None:
+        options["max_words"] = max(1, int(n_words * fraction))
+    return options
+
+
+def count_lines(inputs):
+    n_lines = 0
+    for path in expand_input_paths(inputs):
+        with open(path, "r", encoding="utf-8") as f:
+            n_lines += sum(1 for line in f if line.strip())
+    return n_lines
+
+
+def count_distinct_words(inputs, options):
+    """옵션을 적용했을 때 학습에 쓰이는 고유 단어 수입니다."""
+    if options.get("sample_lines") is not None:
+        word_counts = get_word_counts(reservoir_sample_lines(inputs, options["sample_lines"], seed=options["seed"]))
+    else:
+        word_counts = count_words(inputs, sample_rate=options.get("sample_rate"), seed=options["seed"])
+    return len(prune_word_counts(word_counts, options.get("min_frequency", 1), options.get("max_words")))
+
+
+def compare_to_full(full, result, top_k):
+    full_vocab, full_merges = full
+    vocab, merges = result
+    common_prefix = 0
+    for full_pair, pair in zip(full_merges, merges):
+        if full_pair != pair:
+            break
+        common_prefix += 1
+    union = full_vocab | vocab
+    top = full_merges[:top_k]
+    merge_set = set(merges)
+    return {
+        "vocab_size": len(vocab),
+        "num_merges": len(merges),
+        "vocab_jaccard": len(full_vocab & vocab) / len(union) if union else 1.0,
+        "vocab_missing": len(full_vocab - vocab),
+        "vocab_extra": len(vocab - full_vocab),
+        "merge_common_prefix": common_prefix,
+        f"top{top_k}_merges_kept": sum(pair in merge_set for pair in top) / len(top) if top else 1.0,
+    }
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, nargs="+", default=[str(TESTS_TXT)], help="Training files or globs")
+    parser.add_argument("--num_merges", type=int, default=1000)
+    parser.add_argument("--target_vocab_size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top_k", type=int, default=100, help="How many of the first full-run merges to check")
+    parser.add_argument("--output", type=str, default=None, help="Write the report to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_arguments()
+    train_kwargs = {"num_merges": args.num_merges, "target_vocab_size": args.target_vocab_size}
+
+    start = time.perf_counter()
+    full = learn_wordpiece_vocab(args.input, **train_kwargs)
+    full_time = time.perf_counter() - start
+    full_words = count_words(args.input)
+    n_lines = count_lines(args.input)
+    report = {"full": {"time_s": full_time, "distinct_words": len(full_words),
+                       "vocab_size": len(full[0]), "num_merges": len(full[1])}}
+
+    for name, options in default_variants(n_lines).items():
+        options = resolve_max_words(dict(options, seed=args.seed), len(full_words))
+        start = time.perf_counter()
+        result = learn_wordpiece_vocab(args.input, **train_kwargs, **options)
+        entry = {"time_s": time.perf_counter() - start, "distinct_words": count_distinct_words(args.input, options)}
+        entry.update(compare_to_full(full, result, args.top_k))
+        report[name] = entry
+
+    print(f"{'variant':<20} {'time_s':>8} {'words':>8} {'vocab':>6} {'jaccard':>8} {'prefix':>7} {'top-k':>6}")
+    for name, entry in report.items():
+        print(f"{name:<20} {entry['time_s']:8.3f} {entry['distinct_words']:8d} {entry['vocab_size']:6d} "
+              f"{entry.get('vocab_jaccard', 1.0):8.3f} {entry.get('merge_common_prefix', entry['num_merges']):7d} "
+              f"{entry.get(f'top{args.top_k}_merges_kept', 1.0):6.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -1,11 +1,51 @@
-from .utils import whitespace_tokenize, _is_whitespace, _is_punctuation, _is_control
+from .profiling import Profiled
+from .utils import (
+    whitespace_tokenize,
+    _char_flags,
+    _compute_char_flags,
+    _get_accent_translation,
+    _get_clean_translation,
+    _has_astral_chars,
+    _is_chinese_char,
+    _CHINESE_CHAR_RE,
+    _NONSPACING_MARK,
+    _PUNCTUATION,
+    _STRIPPED,
+    _WHITESPACE,
+)
+import re
+import time
 import unicodedata
 
+# 순수 ASCII 입력용 테이블: 제어 문자는 제거하고 \t, \n, \r은 공백으로 바꿉니다.
+_ASCII_CLEAN_TRANSLATION = {
+    cp: (None if _compute_char_flags(cp) & _STRIPPED else " ")
+    for cp in range(128)
+    if _compute_char_flags(cp) & (_STRIPPED | _WHITESPACE)
+}
+_ASCII_PUNCTUATION = r"!-/:-@\[-`{-~"
+_ASCII_SPLIT_RE = re.compile(rf"(?i:\[mask\])|[{_ASCII_PUNCTUATION}]|[^{_ASCII_PUNCTUATION}]+")
+_ASCII_TOKEN_RE = re.compile(rf"(?i:\[mask\])|[{_ASCII_PUNCTUATION}]|[^{_ASCII_PUNCTUATION}\s]+")
+_WORD_RE = re.compile(r"\S+")
+_CHINESE_SPLIT_RE = re.compile(f"({_CHINESE_CHAR_RE.pattern})")
 
-class BasicTokenizer:
+
+class BasicTokenizer(Profiled):
     """Constructs a BasicTokenizer that will run basic tokenization (punctuation splitting, lower casing, etc.)."""
 
+    _PROFILED_STAGES = {
+        "tokenize": "basic_tokenize",
+        "iter_tokens": "basic_tokenize",
+        "_tokenize_ascii": "ascii_fast_path",
+        "_clean_text": "clean_text",
+        "_pad_chinese_chars": "pad_chinese_chars",
+        "_run_strip_accents": "strip_accents",
+        "_run_split_on_punc": "split_on_punc",
+    }
+
     def tokenize(self, text):
+        if text.isascii():
+            return self._tokenize_ascii(text)
         text = self._clean_text(text)
         text = self._pad_chinese_chars(text)
         orig_tokens = whitespace_tokenize(text)
@@ -18,36 +58,72 @@ class BasicTokenizer:
         output_tokens = whitespace_tokenize(" ".join(split_tokens))
         return output_tokens
 
+    def iter_tokens(self, text):
+        """
+        tokenize와 같은 토큰을 순서대로 내보내는 generator입니다.
+        한자 패딩, 토큰 재결합(" ".join) 같은 중간 문자열을 만들지 않고 단어 단위로 바로 처리합니다.
+        """
+        if text.isascii():
+            text = text.translate(_ASCII_CLEAN_TRANSLATION).lower()
+            for match in _ASCII_TOKEN_RE.finditer(text):
+                token = match.group()
+                yield token.upper() if token[0] == "[" else token
+            return
+        text = self._clean_text(text)
+        for match in _WORD_RE.finditer(text):
+            # 한자는 앞뒤에 공백을 넣는 대신 그 자리에서 단어를 나눕니다.
+            for piece in _CHINESE_SPLIT_RE.split(match.group()):
+                if not piece:
+                    continue
+                piece = self._run_strip_accents(piece.lower())
+                for token in self._run_split_on_punc(piece):
+                    yield from token.split()
+
+    def _tokenize_ascii(self, text):
+        # ASCII 문자열은 한자, 결합 문자가 없고 NFD 정규화 결과도 같으므로
+        # translate와 정규식 한 번으로 정리, 소문자화, 구두점 분리를 끝냅니다.
+        text = text.translate(_ASCII_CLEAN_TRANSLATION).lower()
+        return [token.upper() if token[0] == "[" else token for token in _ASCII_TOKEN_RE.findall(text)]
+
     def _clean_text(self, text):
+        if text.isascii():
+            return text.translate(_ASCII_CLEAN_TRANSLATION)
+        if not _has_astral_chars(text):
+            return text.translate(_get_clean_translation())
         output = []
         for char in text:
-            cp = ord(char)
-            if cp == 0 or cp == 0xFFFD or _is_control(char):
+            flags = _char_flags(ord(char))
+            if flags & _STRIPPED:
                 continue
-            if _is_whitespace(char):
+            if flags & _WHITESPACE:
                 output.append(" ")
             else:
                 output.append(char)
         return "".join(output)
 
     def _run_strip_accents(self, text):
+        if text.isascii():
+            return text
         text = unicodedata.normalize("NFD", text)
+        if not _has_astral_chars(text):
+            return text.translate(_get_accent_translation())
         output = []
         for char in text:
-            cat = unicodedata.category(char)
-            if cat == "Mn":
+            if _char_flags(ord(char)) & _NONSPACING_MARK:
                 continue
             output.append(char)
         return "".join(output)
 
     def _run_split_on_punc(self, text):
+        if text.isascii():
+            return [token.upper() if token[0] == "[" else token for token in _ASCII_SPLIT_RE.findall(text)]
         chars = list(text)
         i = 0
         start_new_word = True
         output = []
         while i < len(chars):
             char = chars[i]
-            if _is_punctuation(char):
+            if _char_flags(ord(char)) & _PUNCTUATION:
                 if char == '[' and i + 5 < len(chars) and "".join(chars[i:i+6]).upper() == "[MASK]":
                     output.append([x.upper() for x in chars[i:i+6]])
                     i += 5
@@ -64,27 +140,51 @@ class BasicTokenizer:
         return ["".join(x) for x in output]
 
     def _pad_chinese_chars(self, text):
-        output = []
-        for char in text:
-            cp = ord(char)
-            if self._is_chinese_char(cp):
-                output.append(" ")
-                output.append(char)
-                output.append(" ")
-            else:
-                output.append(char)
-        return "".join(output)
+        if text.isascii():
+            return text
+        return _CHINESE_CHAR_RE.sub(r" \g<0> ", text)
 
     def _is_chinese_char(self, cp):
-        if ((cp >= 0x4E00 and cp <= 0x9FFF)  #
-                or (cp >= 0x3400 and cp <= 0x4DBF)  #
-                or (cp >= 0x20000 and cp <= 0x2A6DF)  #
-                or (cp >= 0x2A700 and cp <= 0x2B73F)  #
-                or (cp >= 0x2B740 and cp <= 0x2B81F)  #
-                or (cp >= 0x2B820 and cp <= 0x2CEAF)  #
-                or (cp >= 0xF900 and cp <= 0xFAFF)  #
-                or (cp >= 0x2F800 and cp <= 0x2FA1F)  #
-            ):
-            return True
-
-        return False
+        return _is_chinese_char(cp)
+
+    def _wrap_stage(self, stats, stage, method):
+        # 진입점인 tokenize, iter_tokens에서만 입력 문자 수와 내보낸 단어 수를 셉니다.
+        if method.__name__ == "tokenize":
+            timer = time.perf_counter_ns
+            record = stats.record
+
+            def timed_tokenize(text):
+                start = timer()
+                tokens = method(text)
+                record(stage, timer() - start, len(text), chars=len(text), words=len(tokens))
+                return tokens
+
+            return timed_tokenize
+        if method.__name__ == "iter_tokens":
+            return _timed_generator(stats, stage, method)
+        return super()._wrap_stage(stats, stage, method)
+
+
+def _timed_generator(stats, stage, method):
+    """generator가 다음 토큰을 만드는 데 쓴 시간만 기록합니다. 소비하는 쪽의 시간은 제외됩니다."""
+    timer = time.perf_counter_ns
+
+    def timed_iter_tokens(text):
+        iterator = method(text)
+        elapsed = 0
+        words = 0
+        try:
+            while True:
+                start = timer()
+                try:
+                    token = next(iterator)
+                except StopIteration:
+                    elapsed += timer() - start
+                    return
+                elapsed += timer() - start
+                words += 1
+                yield token
+        finally:
+            stats.record(stage, elapsed, len(text), chars=len(text), words=words)
+
+    return timed_iter_tokens
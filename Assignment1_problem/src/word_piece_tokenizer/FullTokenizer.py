@@ -0,0 +1,84 @@
+from array import array
+
+from .BasicTokenizer import BasicTokenizer
+from .WordPieceTokenizer import WordpieceTokenizer
+from .parallel import imap_batch
+from .profiling import Profiled
+
+
+class FullTokenizer(Profiled):
+    """
+    BasicTokenizer와 WordpieceTokenizer를 하나로 이은 end-to-end 토크나이저입니다.
+
+    BasicTokenizer.iter_tokens가 내보내는 단어를 바로 WordPiece 트라이 매칭으로 넘기므로
+    중간 토큰 리스트나 " ".join으로 이어 붙인 문자열을 만들지 않습니다.
+    enable_profiling, profile은 두 하위 토크나이저를 같은 PipelineStats로 계측합니다.
+    """
+    def __init__(self, max_input_chars_per_word=100, cache_size=0, vocab_file=None, compiled=False,
+                 shared_vocab=None):
+        self.basic_tokenizer = BasicTokenizer()
+        self.wordpiece_tokenizer = WordpieceTokenizer(
+            max_input_chars_per_word=max_input_chars_per_word, cache_size=cache_size,
+            vocab_file=vocab_file, compiled=compiled, shared_vocab=shared_vocab)
+        self.init_kwargs = dict(self.wordpiece_tokenizer.init_kwargs)
+
+    def iter_tokens(self, text):
+        """
+        원문 텍스트를 WordPiece 토큰 단위로 내보내는 generator입니다. [CLS], [SEP]은 포함하지 않습니다.
+        """
+        segment_word = self.wordpiece_tokenizer._segment_word
+        for word in self.basic_tokenizer.iter_tokens(text):
+            yield from segment_word(word)[1]
+
+    def iter_ids(self, text):
+        """
+        원문 텍스트를 WordPiece 토큰 id 단위로 내보내는 generator입니다. [CLS], [SEP]은 포함하지 않습니다.
+        """
+        segment_word = self.wordpiece_tokenizer._segment_word
+        for word in self.basic_tokenizer.iter_tokens(text):
+            yield from segment_word(word)[0]
+
+    def tokenize(self, text):
+        """
+        원문 텍스트를 WordPiece 토큰 리스트로 변환합니다.
+
+        Args:
+            text: 정규화되지 않은 원문 텍스트
+
+        Returns:
+            WordPiece 토큰들의 리스트. 시작 토큰([CLS])과 종료 토큰([SEP])이 포함됩니다.
+        """
+        wordpiece = self.wordpiece_tokenizer
+        output_tokens = [wordpiece.cls_token]
+        output_tokens.extend(self.iter_tokens(text))
+        output_tokens.append(wordpiece.sep_token)
+        return output_tokens
+
+    def tokenize_batch(self, texts, num_workers=None, chunk_size=256):
+        """
+        여러 원문 텍스트를 프로세스 풀에서 나눠 토큰화합니다. 결과는 입력 순서를 따릅니다.
+        """
+        return list(self.imap_tokenize(texts, num_workers=num_workers, chunk_size=chunk_size))
+
+    def imap_tokenize(self, texts, num_workers=None, chunk_size=256):
+        """tokenize_batch의 streaming 버전입니다."""
+        return imap_batch(self, texts, "tokenize", num_workers=num_workers, chunk_size=chunk_size)
+
+    def encode(self, text):
+        """
+        원문 텍스트를 WordPiece 토큰 id 배열로 변환합니다.
+
+        Returns:
+            array('I') 형태의 토큰 id 배열. [CLS]와 [SEP] id가 포함됩니다.
+        """
+        wordpiece = self.wordpiece_tokenizer
+        output_ids = array("I", [wordpiece.cls_token_id])
+        output_ids.extend(self.iter_ids(text))
+        output_ids.append(wordpiece.sep_token_id)
+        return output_ids
+
+    def stats(self):
+        return self.wordpiece_tokenizer.stats()
+
+    def _profiled_parts(self):
+        return self.basic_tokenizer, self.wordpiece_tokenizer
@@ -0,0 +1,105 @@
+from array import array
+from pathlib import Path
+import os
+
+from .utils import LRUCache, apply_merges, default_merges_path, load_merges, load_vocab, whitespace_tokenize
+
+_END_OF_WORD = "</w>"
+
+
+class MergeTokenizer:
+    """
+    make_voca.py가 학습한 병합 목록(merges.txt)을 rank 순서대로 적용해 단어를 나누는 토크나이저입니다.
+
+    WordpieceTokenizer의 greedy longest-match 대신 학습 때와 같은 병합 순서를 재현합니다.
+    vocab에 "##" 연속 토큰이 있으면 WordpieceTokenizer와 비교할 수 있도록 단어의 첫 조각 외에는 "##"을 붙입니다.
+    make_voca.py가 저장한 vocab처럼 "##" 토큰이 없으면 이어지는 조각도 "##" 없이 그대로 찾습니다.
+    """
+    def __init__(self, vocab_file=None, merges_file=None, cache_size=0):
+        """
+        Args:
+            vocab_file: vocab.txt 경로. None이면 이 모듈 옆의 vocab.txt를 사용합니다.
+            merges_file: merges.txt 경로. None이면 vocab_file과 같은 디렉터리의 merges.txt를 사용합니다.
+            cache_size: 0보다 크면 단어 단위 분할 결과를 이 크기의 LRU 캐시에 저장합니다.
+        """
+        if vocab_file is None:
+            vocab_file = os.path.join(str(Path(__file__).resolve().parent), "vocab.txt")
+        if merges_file is None:
+            merges_file = default_merges_path(vocab_file)
+        # worker 프로세스에서 같은 토크나이저를 다시 만들 때 사용합니다.
+        self.init_kwargs = {"vocab_file": vocab_file, "merges_file": merges_file, "cache_size": cache_size}
+        self.vocab = load_vocab(vocab_file)
+        self.merge_ranks = load_merges(merges_file)
+        self.unk_token = "[UNK]"
+        self.sep_token = "[SEP]"
+        self.cls_token = "[CLS]"
+        self.unk_token_id = self.vocab[self.unk_token]
+        self.sep_token_id = self.vocab[self.sep_token]
+        self.cls_token_id = self.vocab[self.cls_token]
+        self.continuation_prefix = "##" if any(token.startswith("##") for token in self.vocab) else ""
+        self.cache = LRUCache(cache_size) if cache_size > 0 else None
+
+    def tokenize(self, text):
+        """
+        텍스트를 병합 규칙으로 나눈 토큰 리스트로 변환합니다.
+
+        Args:
+            text: 공백으로 구분된 단어들 (make_voca.py가 학습한 것과 같은 단위)
+
+        Returns:
+            토큰 리스트. 시작 토큰([CLS])과 종료 토큰([SEP])이 포함됩니다.
+        """
+        output_tokens = [self.cls_token]
+        for word in whitespace_tokenize(text):
+            output_tokens.extend(self._segment_word(word)[1])
+        output_tokens.append(self.sep_token)
+        return output_tokens
+
+    def encode(self, text):
+        """
+        tokenize와 같은 토큰을 id로 반환합니다. vocab에 없는 조각은 [UNK] id가 됩니다.
+
+        Returns:
+            array('I') 형태의 토큰 id 배열. [CLS]와 [SEP] id가 포함됩니다.
+        """
+        output_ids = array("I", [self.cls_token_id])
+        for word in whitespace_tokenize(text):
+            output_ids.extend(self._segment_word(word)[0])
+        output_ids.append(self.sep_token_id)
+        return output_ids
+
+    def merge_word(self, word):
+        """
+        단어에 병합을 rank 순서대로 적용한 symbol 리스트를 반환합니다 (</w> 포함).
+
+        예시: 병합이 [("h", "e"), ("o", "</w>"), ("l", "o</w>")]이면 "hello" -> ["he", "l", "lo</w>"]
+        """
+        return apply_merges(list(word) + [_END_OF_WORD], self.merge_ranks)
+
+    def _segment_word(self, word):
+        """한 단어를 (토큰 id 튜플, 토큰 튜플)로 분할합니다."""
+        cache = self.cache
+        if cache is not None:
+            segmented = cache.get(word)
+            if segmented is not None:
+                return segmented
+        tokens = []
+        ids = []
+        for symbol in self.merge_word(word):
+            piece = symbol.replace(_END_OF_WORD, "")
+            if not piece:
+                continue
+            if tokens:
+                piece = self.continuation_prefix + piece
+            # tokenize와 encode가 같은 결과를 내도록 조각 하나당 한 번만 찾고, 없으면 둘 다 [UNK]로 둡니다.
+            index = self.vocab.get(piece)
+            if index is None:
+                tokens.append(self.unk_token)
+                ids.append(self.unk_token_id)
+            else:
+                tokens.append(piece)
+                ids.append(index)
+        segmented = tuple(ids), tuple(tokens)
+        if cache is not None:
+            cache.put(word, segmented)
+        return segmented
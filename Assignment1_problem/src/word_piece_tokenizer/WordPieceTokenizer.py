@@ -1,25 +1,77 @@
+from array import array
 from collections import OrderedDict
 from pathlib import Path
 import os
+import time
 
 from .BasicTokenizer import BasicTokenizer
-from .utils import load_vocab, whitespace_tokenize
+from .WordpieceTrie import WordpieceTrie
+from .compiled_vocab import load_compiled_vocab
+from .parallel import imap_batch
+from .profiling import Profiled
+from .shared_vocab import attach_shared_vocab
+from .utils import LRUCache, load_vocab, whitespace_tokenize
 
-class WordpieceTokenizer:
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class WordpieceTokenizer(Profiled):
     """WordPiece 토크나이저 클래스입니다."""
-    def __init__(self, max_input_chars_per_word=100):
-        vocab_path = os.path.join(str(Path(__file__).resolve().parent), "vocab.txt")
-        self.vocab = load_vocab(vocab_path)
+
+    _PROFILED_STAGES = {"_segment_word": "wordpiece_match"}
+
+    def __init__(self, max_input_chars_per_word=100, cache_size=0, vocab_file=None, compiled=False,
+                 shared_vocab=None):
+        """
+        Args:
+            max_input_chars_per_word: 이보다 긴 단어는 [UNK]로 처리합니다.
+            cache_size: 0보다 크면 단어 단위 분할 결과를 이 크기의 LRU 캐시에 저장합니다.
+            vocab_file: vocab.txt 경로. None이면 이 모듈 옆의 vocab.txt를 사용합니다.
+            compiled: True면 컴파일된 vocab(vocab.bin)을 mmap으로 읽습니다. vocab.txt가 바뀌었으면 다시 컴파일합니다.
+            shared_vocab: SharedVocab.name. 주어지면 vocab_file 대신 해당 shared memory segment에 붙습니다.
+        """
+        if vocab_file is None:
+            vocab_file = os.path.join(str(Path(__file__).resolve().parent), "vocab.txt")
+        # worker 프로세스에서 같은 토크나이저를 다시 만들 때 사용합니다.
+        self.init_kwargs = {
+            "max_input_chars_per_word": max_input_chars_per_word,
+            "cache_size": cache_size,
+            "vocab_file": vocab_file,
+            "compiled": compiled,
+            "shared_vocab": shared_vocab,
+        }
+        self._shared_memory = None
+        if shared_vocab is not None:
+            self._shared_memory, self.vocab, self.ids_to_tokens, self.trie = attach_shared_vocab(shared_vocab)
+        elif compiled:
+            self.vocab, self.ids_to_tokens, self.trie = load_compiled_vocab(vocab_file)
+        else:
+            self.vocab = load_vocab(vocab_file)
+            self.ids_to_tokens = OrderedDict([(ids, tok) for tok, ids in self.vocab.items()])
+            self.trie = WordpieceTrie.from_vocab(self.vocab)
+        # 단어 전체 조회에 쓸 함수입니다. 컴파일된 vocab과 공유 vocab은 dict가 없으므로
+        # Mapping.get의 예외 처리 없이 prefix 트라이 경로만 따라가는 lookup을 바로 씁니다.
+        self._lookup_word = self.vocab.get if isinstance(self.vocab, dict) else self.trie.lookup
         self.unk_token = "[UNK]"
         self.sep_token = "[SEP]"
         self.cls_token = "[CLS]"
+        self.pad_token = "[PAD]"
+        self.unk_token_id = self.vocab[self.unk_token]
+        self.sep_token_id = self.vocab[self.sep_token]
+        self.cls_token_id = self.vocab[self.cls_token]
+        # vocab.txt에 [PAD]가 없으면 0번 id로 패딩하고 attention mask로 구분합니다.
+        self.pad_token_id = self.vocab.get(self.pad_token, 0)
         self.max_input_chars_per_word = max_input_chars_per_word
+        # cache_size > 0 이면 단어 단위 분할 결과를 LRU 캐시에 저장합니다.
+        self.cache = LRUCache(cache_size) if cache_size > 0 else None
 
     def tokenize(self, text):
         """
         텍스트를 WordPiece 토큰으로 변환합니다.
         이 함수는 주어진 어휘를 기반으로 Greedy Longest-Match-First 알고리즘을 사용하여 토큰화합니다.
-        
+
         예시: input = "unaffable" -> 출력: ["un", "##aff", "##able"]
 
         Args:
@@ -31,33 +83,182 @@ class WordpieceTokenizer:
         output_tokens = []
         # 입력 텍스트를 공백 기준으로 토큰화합니다.
         for token in whitespace_tokenize(text):
-            chars = list(token)
-            # 단어가 너무 길면 [UNK] 토큰을 추가합니다.
-            if len(chars) > self.max_input_chars_per_word:
-                output_tokens.append(self.unk_token)
+            output_tokens.extend(self._segment_word(token)[1])
+        return [self.cls_token] + output_tokens + [self.sep_token]
+
+    def tokenize_batch(self, texts, num_workers=None, chunk_size=256):
+        """
+        여러 텍스트를 프로세스 풀에서 나눠 토큰화합니다. 결과는 입력 순서를 따릅니다.
+
+        Args:
+            texts: 텍스트 iterable
+            num_workers: worker 프로세스 수. None이면 CPU 코어 수
+            chunk_size: worker 한 번의 작업에 넘길 텍스트 수
+
+        Returns:
+            각 텍스트의 tokenize 결과 리스트
+        """
+        return list(self.imap_tokenize(texts, num_workers=num_workers, chunk_size=chunk_size))
+
+    def imap_tokenize(self, texts, num_workers=None, chunk_size=256):
+        """tokenize_batch의 streaming 버전입니다. texts가 generator여도 메모리 사용량이 일정합니다."""
+        return imap_batch(self, texts, "tokenize", num_workers=num_workers, chunk_size=chunk_size)
+
+    def encode(self, text):
+        """
+        텍스트를 WordPiece 토큰 id 배열로 변환합니다. tokenize와 같은 토큰을 id로 바로 반환합니다.
+
+        Args:
+            text: BasicTokenizer를 거친 단일 토큰 또는 공백으로 구분된 토큰들
+
+        Returns:
+            array('I') 형태의 토큰 id 배열. [CLS]와 [SEP] id가 포함됩니다.
+        """
+        output_ids = array("I", [self.cls_token_id])
+        for token in whitespace_tokenize(text):
+            output_ids.extend(self._segment_word(token)[0])
+        output_ids.append(self.sep_token_id)
+        return output_ids
+
+    def encode_batch(self, texts, max_length=None, padding="longest", truncation=True):
+        """
+        여러 텍스트를 미리 할당한 int32 행렬에 한 번에 채워 넣습니다.
+
+        Args:
+            texts: 텍스트 리스트
+            max_length: 최대 시퀀스 길이 ([CLS], [SEP] 포함)
+            padding: "longest"면 배치 내 가장 긴 시퀀스, "max_length"면 max_length까지 오른쪽 패딩합니다.
+            truncation: True면 max_length를 넘는 시퀀스를 잘라내고 마지막에 [SEP]을 둡니다.
+
+        Returns:
+            {"input_ids", "attention_mask"} 딕셔너리. 값은 (배치 크기, 길이) int32 행렬로,
+            numpy가 설치되어 있으면 numpy.ndarray, 아니면 2차원 memoryview입니다.
+        """
+        if padding not in ("longest", "max_length"):
+            raise ValueError(f"Unknown padding strategy '{padding}'. Use 'longest' or 'max_length'.")
+        if padding == "max_length" and max_length is None:
+            raise ValueError("padding='max_length' requires max_length.")
+        if max_length is not None and max_length < 2:
+            raise ValueError(f"max_length must be at least 2, got {max_length}.")
+
+        encoded = [self.encode(text) for text in texts]
+        if not encoded:
+            raise ValueError("encode_batch needs at least one text.")
+        if max_length is not None and not truncation:
+            for row, ids in enumerate(encoded):
+                if len(ids) > max_length:
+                    raise ValueError(
+                        f"Sequence {row} has {len(ids)} tokens, longer than max_length={max_length}. "
+                        "Set truncation=True to truncate it.")
+
+        if padding == "max_length":
+            width = max_length
+        else:
+            width = max(len(ids) for ids in encoded)
+            if max_length is not None:
+                width = min(width, max_length)
+
+        n_rows = len(encoded)
+        input_ids = array("i", [self.pad_token_id]) * (n_rows * width)
+        attention_mask = array("i", bytes(4 * n_rows * width))
+        ones = array("i", [1]) * width
+        for row, ids in enumerate(encoded):
+            offset = row * width
+            length = len(ids)
+            if length > width:
+                input_ids[offset:offset + width - 1] = array("i", ids[:width - 1])
+                input_ids[offset + width - 1] = self.sep_token_id
+                length = width
+            else:
+                input_ids[offset:offset + length] = array("i", ids)
+            attention_mask[offset:offset + length] = ones[:length]
+
+        return {
+            "input_ids": _as_matrix(input_ids, n_rows, width),
+            "attention_mask": _as_matrix(attention_mask, n_rows, width),
+        }
+
+    def decode(self, ids, skip_special_tokens=False):
+        """
+        토큰 id들을 문자열로 복원합니다. "##" 연속 토큰은 앞 토큰에 붙입니다.
+
+        Args:
+            ids: 토큰 id 시퀀스
+            skip_special_tokens: True면 [CLS], [SEP], [PAD] 토큰을 제외합니다.
+
+        Returns:
+            복원된 문자열
+        """
+        special_ids = {self.cls_token_id, self.sep_token_id, self.pad_token_id} if skip_special_tokens else ()
+        words = []
+        for i in ids:
+            i = int(i)
+            if i in special_ids:
                 continue
-            is_bad = False
-            start = 0
-            sub_tokens = []
-            while start < len(chars):
-                end = len(chars)
-                cur_substr = None
-                while start < end:
-                    substr = "".join(chars[start:end])
-                    if start > 0:
-                        substr = "##" + substr
-                    if substr in self.vocab:
-                        cur_substr = substr
-                        break
-                    end -= 1
-                if cur_substr is None:
-                    is_bad = True
-                    break
-                sub_tokens.append(cur_substr)
-                start = end
-
-            if is_bad:
-                output_tokens.append(self.unk_token)
+            token = self.ids_to_tokens[i]
+            if token.startswith("##") and words:
+                words[-1] += token[2:]
             else:
-                output_tokens.extend(sub_tokens)
-        return [self.cls_token] + output_tokens + [self.sep_token]
+                words.append(token)
+        return " ".join(words)
+
+    def _segment_word(self, token):
+        """
+        한 단어를 (토큰 id 튜플, 토큰 튜플)로 분할합니다.
+        max_input_chars_per_word를 넘는 단어는 캐시를 거치지 않고 [UNK]로 처리합니다.
+        """
+        # 단어가 너무 길면 [UNK] 토큰을 추가합니다.
+        if len(token) > self.max_input_chars_per_word:
+            return (self.unk_token_id,), (self.unk_token,)
+        cache = self.cache
+        if cache is not None:
+            segmented = cache.get(token)
+            if segmented is not None:
+                return segmented
+        # 단어 전체가 vocab에 있으면 그것이 가장 긴 매칭이므로 failure link를 따라가는 분할을 하지 않습니다.
+        index = self._lookup_word(token)
+        if index is not None:
+            segmented = (index,), (token,)
+            if cache is not None:
+                cache.put(token, segmented)
+            return segmented
+        # 트라이를 한 번 순회하며 Greedy Longest-Match-First 결과를 얻습니다.
+        sub_ids = self.trie.segment(token)
+        if sub_ids is None:
+            segmented = (self.unk_token_id,), (self.unk_token,)
+        else:
+            segmented = tuple(sub_ids), tuple([self.ids_to_tokens[i] for i in sub_ids])
+        if cache is not None:
+            cache.put(token, segmented)
+        return segmented
+
+    def stats(self):
+        """계측 결과 snapshot입니다. 캐시를 쓰면 캐시 카운터도 함께 담습니다."""
+        snapshot = super().stats()
+        if snapshot and self.cache is not None:
+            snapshot["cache"] = self.cache.stats()
+        return snapshot
+
+    def _wrap_stage(self, stats, stage, method):
+        timer = time.perf_counter_ns
+        record = stats.record
+        unk_token_id = self.unk_token_id
+        max_chars = self.max_input_chars_per_word
+
+        def timed_segment_word(token):
+            start = timer()
+            segmented = method(token)
+            elapsed = timer() - start
+            ids = segmented[0]
+            record(stage, elapsed, len(token), segmented_words=1, wordpieces=len(ids),
+                   unk_words=int(ids[0] == unk_token_id), long_words=int(len(token) > max_chars))
+            return segmented
+
+        return timed_segment_word
+
+
+def _as_matrix(buffer, n_rows, width):
+    """평탄한 int32 array를 복사 없이 (n_rows, width) 행렬로 봅니다."""
+    if np is not None:
+        return np.frombuffer(buffer, dtype=np.int32).reshape(n_rows, width)
+    return memoryview(buffer).cast("B").cast("i", (n_rows, width))
@@ -0,0 +1,163 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+PREFIX_ROOT = 0
+SUFFIX_ROOT = 1
+NO_NODE = -1
+
+
+class WordpieceTrie:
+    """
+    Greedy Longest-Match-First WordPiece 분할을 한 번의 좌→우 순회로 수행하는 트라이입니다.
+
+    단어 시작 토큰용 prefix 트라이(루트 0)와 "##" 연속 토큰용 suffix 트라이(루트 1)를
+    하나의 노드 배열에 담고, 각 노드에 failure link와 failure pop(실패 시 확정되는 토큰 id들)을
+    미리 계산해 둡니다. (Fast WordPiece, LinMaxMatch)
+
+    모든 구조는 평탄한 정수 배열로 저장되므로 그대로 직렬화하거나 공유 메모리에 올릴 수 있습니다.
+    """
+
+    def __init__(self, edge_start, edge_chars, edge_next, fail, pops_start, pops, node_token):
+        self.edge_start = edge_start
+        self.edge_chars = edge_chars
+        self.edge_next = edge_next
+        self.fail = fail
+        self.pops_start = pops_start
+        self.pops = pops
+        self.node_token = node_token
+
+    @classmethod
+    def from_vocab(cls, vocab, suffix_indicator="##"):
+        """
+        token -> index 매핑(load_vocab의 결과)으로부터 트라이를 구성합니다.
+
+        Args:
+            vocab: token -> index 매핑
+            suffix_indicator: 연속 토큰 접두사
+
+        Returns:
+            WordpieceTrie 인스턴스
+        """
+        children = [{}, {}]
+        token_ids = [NO_NODE, NO_NODE]
+
+        def insert(root, token, index):
+            node = root
+            for char in token:
+                nxt = children[node].get(char)
+                if nxt is None:
+                    nxt = len(children)
+                    children[node][char] = nxt
+                    children.append({})
+                    token_ids.append(NO_NODE)
+                node = nxt
+            token_ids[node] = index
+
+        n_indicator = len(suffix_indicator)
+        for token, index in vocab.items():
+            if not token:
+                continue
+            # 단어 시작 위치에서는 vocab 문자열을 그대로 비교합니다.
+            insert(PREFIX_ROOT, token, index)
+            if token.startswith(suffix_indicator) and len(token) > n_indicator:
+                insert(SUFFIX_ROOT, token[n_indicator:], index)
+
+        n_nodes = len(children)
+        fail = [NO_NODE] * n_nodes
+        pops = [()] * n_nodes
+
+        # failure link는 항상 더 얕은 suffix 트라이 노드를 가리키므로 suffix 트라이를 먼저 계산합니다.
+        for root in (SUFFIX_ROOT, PREFIX_ROOT):
+            queue = deque([root])
+            while queue:
+                parent = queue.popleft()
+                for char, node in children[parent].items():
+                    queue.append(node)
+                    if token_ids[node] != NO_NODE:
+                        fail[node] = SUFFIX_ROOT
+                        pops[node] = (token_ids[node],)
+                        continue
+                    popped = pops[parent]
+                    target = fail[parent]
+                    while target != NO_NODE and char not in children[target]:
+                        popped = popped + pops[target]
+                        target = fail[target]
+                    if target != NO_NODE:
+                        fail[node] = children[target][char]
+                        pops[node] = popped
+
+        edge_start = array("i", [0])
+        edge_chars = array("I")
+        edge_next = array("i")
+        for node in range(n_nodes):
+            for char, nxt in sorted(children[node].items()):
+                edge_chars.append(ord(char))
+                edge_next.append(nxt)
+            edge_start.append(len(edge_chars))
+
+        pops_start = array("i", [0])
+        flat_pops = array("i")
+        for node in range(n_nodes):
+            flat_pops.extend(pops[node])
+            pops_start.append(len(flat_pops))
+
+        return cls(edge_start, edge_chars, edge_next, array("i", fail), pops_start, flat_pops, array("i", token_ids))
+
+    def __len__(self):
+        return len(self.fail)
+
+    def lookup(self, token):
+        """
+        vocab 문자열 token의 id를 prefix 트라이를 따라가 찾습니다. 없으면 None을 반환합니다.
+        """
+        edge_start, edge_chars, edge_next = self.edge_start, self.edge_chars, self.edge_next
+        node = PREFIX_ROOT
+        for char in token:
+            cp = ord(char)
+            lo = edge_start[node]
+            hi = edge_start[node + 1]
+            i = bisect_left(edge_chars, cp, lo, hi)
+            if i == hi or edge_chars[i] != cp:
+                return None
+            node = edge_next[i]
+        index = self.node_token[node]
+        return None if index == NO_NODE else index
+
+    def segment(self, word):
+        """
+        한 단어를 WordPiece 토큰 id 리스트로 분할합니다.
+
+        Args:
+            word: 공백이 없는 단일 단어
+
+        Returns:
+            토큰 id 리스트. 분할할 수 없으면 None을 반환합니다.
+        """
+        edge_start, edge_chars, edge_next = self.edge_start, self.edge_chars, self.edge_next
+        fail, pops_start, pops = self.fail, self.pops_start, self.pops
+        output = []
+        node = PREFIX_ROOT
+        for char in word:
+            cp = ord(char)
+            while True:
+                lo = edge_start[node]
+                hi = edge_start[node + 1]
+                i = bisect_left(edge_chars, cp, lo, hi)
+                if i < hi and edge_chars[i] == cp:
+                    node = edge_next[i]
+                    break
+                target = fail[node]
+                if target == NO_NODE:
+                    return None
+                output.extend(pops[pops_start[node]:pops_start[node + 1]])
+                node = target
+
+        # 단어 끝에서 남은 매칭을 모두 확정합니다.
+        while node != SUFFIX_ROOT:
+            target = fail[node]
+            if target == NO_NODE:
+                return None
+            output.extend(pops[pops_start[node]:pops_start[node + 1]])
+            node = target
+        return output
@@ -1 +1,3 @@
 from .WordPieceTokenizer import WordpieceTokenizer
+from .FullTokenizer import FullTokenizer
+from .MergeTokenizer import MergeTokenizer
@@ -0,0 +1,214 @@
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from .WordpieceTrie import WordpieceTrie
+from .utils import read_vocab_tokens
+
+_MAGIC = b"WPVOCAB\x01"
+# magic, vocab.txt sha256, byteorder, 토큰 줄 수, 고유 토큰 수, 노드 수, 간선 수, pop 수, 토큰 blob 크기
+_HEADER = struct.Struct("<8s32s8sIIIIII")
+_ALIGN = 8
+
+
+def vocab_checksum(vocab_file):
+    """vocab.txt 내용의 sha256 digest입니다. 컴파일된 파일이 최신인지 확인할 때 씁니다."""
+    with open(vocab_file, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def default_compiled_path(vocab_file):
+    return os.path.splitext(vocab_file)[0] + ".bin"
+
+
+def _pad(n):
+    return (-n) % _ALIGN
+
+
+def compile_vocab_bytes(vocab_file):
+    """
+    vocab.txt를 토큰 테이블과 WordPiece 트라이를 담은 바이너리로 변환합니다.
+
+    Returns:
+        컴파일된 바이너리 (bytes)
+    """
+    tokens = read_vocab_tokens(vocab_file)
+    vocab = OrderedDict()
+    for index, token in enumerate(tokens):
+        vocab[token] = index
+    trie = WordpieceTrie.from_vocab(vocab)
+
+    token_offsets = array("I", [0])
+    blob = bytearray()
+    for token in tokens:
+        blob += token.encode("utf-8")
+        token_offsets.append(len(blob))
+
+    header = _HEADER.pack(
+        _MAGIC, vocab_checksum(vocab_file), sys.byteorder.encode("ascii").ljust(8, b"\0"),
+        len(tokens), sum(1 for token in vocab if token), len(trie), len(trie.edge_chars), len(trie.pops), len(blob))
+    sections = [
+        header,
+        token_offsets.tobytes(),
+        bytes(blob),
+        trie.edge_start.tobytes(),
+        trie.edge_chars.tobytes(),
+        trie.edge_next.tobytes(),
+        trie.fail.tobytes(),
+        trie.pops_start.tobytes(),
+        trie.pops.tobytes(),
+        trie.node_token.tobytes(),
+    ]
+    output = bytearray()
+    for section in sections:
+        output += section
+        output += bytes(_pad(len(output)))
+    return bytes(output)
+
+
+def compile_vocab(vocab_file, output_file=None):
+    """
+    vocab.txt를 컴파일해 output_file(기본값: vocab.bin)에 저장합니다.
+
+    Returns:
+        저장한 파일 경로
+    """
+    if output_file is None:
+        output_file = default_compiled_path(vocab_file)
+    data = compile_vocab_bytes(vocab_file)
+    # 다른 프로세스가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, output_file)
+    return output_file
+
+
+def read_header(buffer):
+    """
+    컴파일된 바이너리의 헤더를 읽습니다. 형식이 맞지 않으면 None을 반환합니다.
+    """
+    if len(buffer) < _HEADER.size:
+        return None
+    fields = _HEADER.unpack_from(buffer, 0)
+    if fields[0] != _MAGIC or fields[2].rstrip(b"\0") != sys.byteorder.encode("ascii"):
+        return None
+    return fields
+
+
+def parse_compiled_vocab(buffer):
+    """
+    컴파일된 바이너리 buffer(mmap, shared memory 등)를 복사 없이 해석합니다.
+
+    Returns:
+        (CompiledVocab, TokenTable, WordpieceTrie) 튜플
+    """
+    header = read_header(buffer)
+    if header is None:
+        raise ValueError("Not a compiled vocabulary for this format version and byte order.")
+    _, _, _, n_lines, n_unique, n_nodes, n_edges, n_pops, blob_size = header
+    view = memoryview(buffer)
+    position = _HEADER.size + _pad(_HEADER.size)
+
+    def take(typecode, count):
+        nonlocal position
+        nbytes = count * array(typecode).itemsize
+        section = view[position:position + nbytes]
+        position += nbytes + _pad(nbytes)
+        return section if typecode == "B" else section.cast(typecode)
+
+    token_offsets = take("I", n_lines + 1)
+    blob = take("B", blob_size)
+    edge_start = take("i", n_nodes + 1)
+    edge_chars = take("I", n_edges)
+    edge_next = take("i", n_edges)
+    fail = take("i", n_nodes)
+    pops_start = take("i", n_nodes + 1)
+    pops = take("i", n_pops)
+    node_token = take("i", n_nodes)
+
+    trie = WordpieceTrie(edge_start, edge_chars, edge_next, fail, pops_start, pops, node_token)
+    ids_to_tokens = TokenTable(token_offsets, blob)
+    return CompiledVocab(trie, ids_to_tokens, n_unique), ids_to_tokens, trie
+
+
+def load_compiled_vocab(vocab_file, compiled_file=None):
+    """
+    컴파일된 vocab을 mmap으로 엽니다. 파일이 없거나 vocab.txt의 checksum과 다르면 다시 컴파일합니다.
+
+    Returns:
+        (CompiledVocab, TokenTable, WordpieceTrie) 튜플
+    """
+    if compiled_file is None:
+        compiled_file = default_compiled_path(vocab_file)
+    checksum = vocab_checksum(vocab_file)
+    buffer = _map_file(compiled_file)
+    header = read_header(buffer) if buffer is not None else None
+    if header is None or header[1] != checksum:
+        compile_vocab(vocab_file, compiled_file)
+        buffer = _map_file(compiled_file)
+    return parse_compiled_vocab(buffer)
+
+
+def _map_file(path):
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class TokenTable(Mapping):
+    """id -> token 매핑입니다. 토큰 문자열은 조회할 때 blob에서 디코딩합니다."""
+
+    def __init__(self, token_offsets, blob):
+        self._offsets = token_offsets
+        self._blob = blob
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self._offsets) - 1:
+            raise KeyError(index)
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+
+class CompiledVocab(Mapping):
+    """
+    token -> id 매핑입니다. dict를 만들지 않고 트라이의 prefix 경로를 따라가 id를 찾습니다.
+    """
+
+    def __init__(self, trie, ids_to_tokens, n_unique):
+        self._trie = trie
+        self._ids_to_tokens = ids_to_tokens
+        self._n_unique = n_unique
+
+    def __getitem__(self, token):
+        index = self._trie.lookup(token) if token else None
+        if index is None:
+            raise KeyError(token)
+        return index
+
+    def get(self, token, default=None):
+        index = self._trie.lookup(token) if token else None
+        return default if index is None else index
+
+    def __contains__(self, token):
+        return isinstance(token, str) and bool(token) and self._trie.lookup(token) is not None
+
+    def __len__(self):
+        return self._n_unique
+
+    def __iter__(self):
+        # 중복 토큰은 load_vocab과 같이 마지막 id만 유효합니다.
+        for index, token in self._ids_to_tokens.items():
+            if self._trie.lookup(token) == index:
+                yield token
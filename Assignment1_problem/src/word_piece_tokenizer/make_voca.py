@@ -1,7 +1,27 @@
+import argparse
+import glob
+import heapq
 import math 
+import multiprocessing
+import os
+import pickle
+import random
+import re
+from array import array
 from collections import defaultdict, Counter
 from pathlib import Path
-from utils import whitespace_tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from .utils import add_merge_rank, apply_merges, default_merges_path, line_aligned_ranges, whitespace_tokenize
+except ImportError:
+    from utils import add_merge_rank, apply_merges, default_merges_path, line_aligned_ranges, whitespace_tokenize
+
+_STATE_VERSION = 1
 
 def get_corpus(file_path):
     """파일에서 모든 텍스트 라인을 읽어 리스트로 반환합니다."""
@@ -24,13 +44,128 @@ def get_initial_vocab(corpus):
             vocab[token_seq] += 1
     return vocab
 
+def get_word_counts(corpus):
+    """
+    단어 -> 빈도 Counter입니다. get_initial_vocab과 달리 "h e l l o </w>" 문자열을 만들지 않습니다.
+    """
+    word_counts = Counter()
+    for line in corpus:
+        word_counts.update(whitespace_tokenize(line))
+    return word_counts
+
+def expand_input_paths(file_paths):
+    """
+    파일 경로 또는 glob 패턴(하나 또는 리스트)을 실제 파일 경로 리스트로 펼칩니다.
+    """
+    if isinstance(file_paths, (str, os.PathLike)):
+        file_paths = [file_paths]
+    paths = []
+    for pattern in file_paths:
+        pattern = str(pattern)
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"No input files match '{pattern}'.")
+        paths.extend(matches)
+    return paths
+
+def _count_range(path, start, end, sample_rate=None, seed=0):
+    """
+    파일의 바이트 구간 하나에서 단어 빈도를 셉니다. 구간은 줄 경계에서 시작하고 끝납니다.
+    sample_rate가 주어지면 구간마다 (seed, 경로, 시작 위치)로 정한 난수로 그 비율의 줄만 셉니다.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = data.decode("utf-8")
+    if sample_rate is None:
+        # 줄마다 whitespace_tokenize한 결과를 이어 붙인 것과 구간 전체를 split()한 결과는 같습니다.
+        return Counter(text.split())
+    rng = random.Random(f"{seed}:{path}:{start}")
+    word_counts = Counter()
+    for line in text.split("\n"):
+        if rng.random() < sample_rate:
+            word_counts.update(line.split())
+    return word_counts
+
+def count_words(file_paths, num_workers=None, chunk_bytes=1 << 24, sample_rate=None, seed=0):
+    """
+    여러 파일(glob 가능)을 줄 경계에 맞춘 바이트 구간으로 나눠 프로세스 풀에서 단어 빈도를 셉니다.
+    파일 전체를 메모리에 올리지 않으므로 메모리 사용량은 고유 단어 수에 비례합니다.
+
+    Args:
+        file_paths: 파일 경로 또는 glob 패턴 (하나 또는 리스트)
+        num_workers: worker 프로세스 수. None이면 os.cpu_count(), 1 이하이면 현재 프로세스에서 셉니다.
+        chunk_bytes: worker 한 번의 작업에 넘길 대략적인 바이트 수
+        sample_rate: 주어지면 각 바이트 구간에서 이 비율의 줄만 뽑아 셉니다 (구간별 층화 표본).
+            결과는 seed와 chunk_bytes에 따라 정해지며 worker 수와는 무관합니다.
+        seed: 표본 추출 seed
+
+    Returns:
+        단어 -> 빈도 Counter
+    """
+    if sample_rate is not None and not 0 < sample_rate <= 1:
+        raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}.")
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    tasks = [(path, start, end, sample_rate, seed) for path in expand_input_paths(file_paths)
+             for start, end in line_aligned_ranges(path, chunk_bytes)]
+    word_counts = Counter()
+    if num_workers <= 1 or len(tasks) < 2:
+        for task in tasks:
+            word_counts.update(_count_range(*task))
+        return word_counts
+    with multiprocessing.Pool(min(num_workers, len(tasks))) as pool:
+        for counts in pool.imap_unordered(_count_star, tasks):
+            word_counts.update(counts)
+    return word_counts
+
+def reservoir_sample_lines(file_paths, num_lines, seed=0):
+    """
+    모든 입력 파일의 비어 있지 않은 줄 중 num_lines개를 균등하게 뽑습니다 (reservoir sampling).
+    파일을 한 번만 순서대로 읽고, 메모리에는 뽑힌 줄만 둡니다.
+    """
+    if num_lines <= 0:
+        raise ValueError(f"num_lines must be positive, got {num_lines}.")
+    rng = random.Random(seed)
+    reservoir = []
+    seen = 0
+    for path in expand_input_paths(file_paths):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if seen < num_lines:
+                    reservoir.append(line)
+                else:
+                    index = rng.randrange(seen + 1)
+                    if index < num_lines:
+                        reservoir[index] = line
+                seen += 1
+    return reservoir
+
+def prune_word_counts(word_counts, min_frequency=1, max_words=None):
+    """
+    빈도가 min_frequency보다 낮은 단어를 버리고, max_words가 주어지면 빈도 상위 max_words개 단어만 남깁니다.
+    빈도가 같으면 단어 순으로 정하므로 결과는 입력 순서와 무관합니다.
+    """
+    pruned = Counter({word: freq for word, freq in word_counts.items() if freq >= min_frequency})
+    if max_words is not None and len(pruned) > max_words:
+        kept = sorted(pruned.items(), key=lambda item: (-item[1], item[0]))[:max_words]
+        pruned = Counter(dict(kept))
+    return pruned
+
+def _count_star(task):
+    return _count_range(*task)
+
 def get_pair_stats(vocab):
     """
     현재 vocabulary에서 각 단어(토큰 시퀀스) 내 인접한 토큰 쌍의 빈도를 계산합니다.
     """
     pairs = defaultdict(int)
-    # TODO: 각 token_seq에서 인접한 토큰 쌍을 추출하여, 전체 vocabulary에서의 빈도를 계산하는 코드를 작성하세요.
-    # 예: for token_seq, freq in vocab.items(): ... 
+    for token_seq, freq in vocab.items():
+        tokens = token_seq.split()
+        for i in range(len(tokens) - 1):
+            pairs[tokens[i], tokens[i + 1]] += freq
     return pairs
 
 def get_unigram_counts(vocab):
@@ -50,8 +185,11 @@ def merge_vocab(pair, vocab):
     "a b" 형태의 bigram을 "ab"로 치환합니다.
     """
     merged_vocab = {}
-    # TODO: 주어진 pair를 활용하여 vocab 내의 모든 token sequence에서 "a b"를 "ab"로 병합하는 코드를 작성하세요.
-
+    bigram = re.escape(" ".join(pair))
+    pattern = re.compile(r"(?<!\S)" + bigram + r"(?!\S)")
+    replacement = "".join(pair)
+    for token_seq, freq in vocab.items():
+        merged_vocab[pattern.sub(lambda _: replacement, token_seq)] = freq
     return merged_vocab
 
 def compute_likelihood_score(pair, pair_freq, unigram_counts, total_tokens):
@@ -61,19 +199,427 @@ def compute_likelihood_score(pair, pair_freq, unigram_counts, total_tokens):
     - 기대 빈도: (freq(token1) * freq(token2)) / total_tokens
     점수는 observed * log(observed/expected)로 계산합니다.
     """
-    # TODO: likelihood 점수를 계산하는 코드를 작성하세요.
-    return 0
+    expected = (unigram_counts[pair[0]] * unigram_counts[pair[1]]) / total_tokens
+    return pair_freq * math.log(pair_freq / expected)
+
+def get_current_vocab(vocab):
+    """현재 vocabulary의 토큰 집합입니다. 단어 경계 표시 </w>는 제거합니다."""
+    current_vocab = set()
+    for token_seq in vocab.keys():
+        tokens = token_seq.split()
+        for token in tokens:
+            token = token.replace("</w>", "")
+            current_vocab.add(token)
+    return current_vocab
+
+def select_best_pair(scores):
+    """
+    가장 높은 점수의 pair를 고릅니다. 점수가 같으면 사전순으로 앞선 pair를 고르므로
+    pair_stats의 순회 순서와 관계없이 결과가 정해집니다.
+    """
+    return min(scores, key=lambda pair: (-scores[pair], pair))
+
+class IncrementalPairStats:
+    """
+    병합마다 전체 vocabulary를 다시 세지 않고, 병합에 영향을 받은 단어의 pair/unigram 빈도만 갱신합니다.
+
+    - symbol은 정수 id로 intern하고, 모든 단어의 symbol id를 하나의 array('I')에 이어 붙여 저장합니다.
+      단어 i는 symbols[offsets[i]:offsets[i] + lengths[i]]이며 빈도는 freqs[i]입니다.
+      병합은 이 구간을 제자리에서 다시 쓰므로 반복 중에 단어 문자열을 만들지 않습니다.
+    - pair (a << 32 | b) -> 그 pair가 등장하는 단어 index 집합 (inverted index)
+    - symbol -> 그 symbol을 포함하는 pair 집합 (unigram 빈도가 줄어 점수가 오를 수 있는 pair를 찾을 때 사용)
+    - 점수 우선순위 큐 (lazy invalidation)
+
+    점수 observed * log(observed * total / (freq(a) * freq(b)))는 total_tokens가 줄어들면 함께 줄어들기 때문에,
+    병합에 영향을 받지 않은 pair의 큐 점수는 현재 점수의 상한입니다. 큐에서 꺼낸 점수가 현재 점수와 같을 때만
+    채택하고, 다르면 현재 점수로 다시 넣습니다. 따라서 선택 결과(동점 처리 포함)는 매 반복 전체를 다시 계산하는
+    방식과 같습니다.
+    """
+
+    # merge 후 빈도나 점수가 바뀐 pair를 우선순위 큐에 다시 넣을지 여부입니다.
+    _requeues_pairs = True
+
+    def __init__(self, word_counts=(), state=None):
+        """
+        Args:
+            word_counts: count_words 또는 get_word_counts 결과 (단어 -> 빈도)
+            state: state() 또는 load_trainer_state 결과. 주어지면 저장된 단어 분할과 병합 목록에서 이어서 학습하고,
+                word_counts는 그 위에 더할 새 빈도로 취급합니다.
+        """
+        self.symbol_strings = []
+        self.symbol_ids = {}
+        self.unigram_counts = array("q")
+        self.symbols = array("I")
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.freqs = array("Q")
+        self.words = []
+        self.word_ids = {}
+        self.merges = []
+        self.merge_ranks = {}
+        self.pair_counts = {}
+        self.pair_words = defaultdict(set)
+        self.symbol_pairs = defaultdict(set)
+        self.total_tokens = 0
+        # </w>를 제거한 토큰 -> 그 토큰이 되는 (빈도가 양수인) symbol 수. len()이 현재 vocabulary 크기입니다.
+        self._stripped = Counter()
+        self._heap = []
+        if state is None:
+            self.intern("</w>")
+        else:
+            self._restore(state)
+        self.add_word_counts(word_counts)
+
+    def add_word_counts(self, word_counts):
+        """
+        단어 빈도를 더합니다. 처음 보는 단어는 지금까지의 병합을 rank 순서대로 적용해 분할한 뒤 추가합니다.
+        새 빈도에 비례하는 시간만 들고, 기존 단어를 다시 세지 않습니다.
+        """
+        for word, freq in word_counts.items():
+            index = self.word_ids.get(word)
+            if index is None:
+                index = self._append_word(word)
+            self.freqs[index] += freq
+            self._count_word(index, freq)
+        self._rebuild_heap()
+
+    def state(self):
+        """
+        학습을 이어가는 데 필요한 상태입니다. 단어별 현재 분할은 빈 공간 없이 다시 이어 붙여 저장합니다.
+        pair 빈도와 색인은 분할에서 다시 계산할 수 있으므로 저장하지 않습니다.
+        """
+        symbols = array("I")
+        offsets = array("Q")
+        for index in range(len(self.words)):
+            start = self.offsets[index]
+            offsets.append(len(symbols))
+            symbols.extend(self.symbols[start:start + self.lengths[index]])
+        return {
+            "version": _STATE_VERSION,
+            "words": self.words,
+            "freqs": self.freqs,
+            "symbol_strings": self.symbol_strings,
+            "symbols": symbols,
+            "offsets": offsets,
+            "lengths": self.lengths,
+            "merges": self.merges,
+        }
+
+    def _restore(self, state):
+        if state.get("version") != _STATE_VERSION:
+            raise ValueError(f"Unsupported trainer state version {state.get('version')}.")
+        for symbol in state["symbol_strings"]:
+            self.intern(symbol)
+        self.symbols = array("I", state["symbols"])
+        self.offsets = array("Q", state["offsets"])
+        self.lengths = array("I", state["lengths"])
+        self.freqs = array("Q", state["freqs"])
+        self.words = list(state["words"])
+        self.word_ids = {word: index for index, word in enumerate(self.words)}
+        for pair in state["merges"]:
+            self._record_merge(tuple(pair))
+        for index, freq in enumerate(self.freqs):
+            self._count_word(index, freq)
+
+    def _append_word(self, word):
+        symbols = list(word) + ["</w>"]
+        if self.merge_ranks:
+            symbols = apply_merges(symbols, self.merge_ranks)
+        index = len(self.words)
+        self.words.append(word)
+        self.word_ids[word] = index
+        self.offsets.append(len(self.symbols))
+        self.symbols.extend([self.intern(symbol) for symbol in symbols])
+        self.lengths.append(len(symbols))
+        self.freqs.append(0)
+        return index
+
+    def _count_word(self, index, freq):
+        symbols = self.symbols
+        start = self.offsets[index]
+        end = start + self.lengths[index]
+        for position in range(start, end):
+            self._add_unigram(symbols[position], freq)
+        for position in range(start, end - 1):
+            self._add_pair(symbols[position] << 32 | symbols[position + 1], freq, index)
+
+    def _record_merge(self, pair):
+        add_merge_rank(self.merge_ranks, pair, len(self.merges))
+        self.merges.append(pair)
+
+    def _rebuild_heap(self):
+        self._heap = []
+        for key in self.pair_counts:
+            self._push(key)
+
+    def intern(self, symbol):
+        """symbol 문자열의 정수 id를 반환합니다. 처음 보는 symbol이면 새 id를 만듭니다."""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbol_strings)
+            self.symbol_strings.append(symbol)
+            self.unigram_counts.append(0)
+        return symbol_id
+
+    def word(self, index):
+        """단어 index의 현재 symbol 문자열 리스트입니다."""
+        start = self.offsets[index]
+        return [self.symbol_strings[i] for i in self.symbols[start:start + self.lengths[index]]]
+
+    def vocab_size(self):
+        return len(self._stripped)
+
+    def current_vocab(self):
+        return set(self._stripped)
+
+    def score(self, key):
+        return compute_likelihood_score(
+            (key >> 32, key & 0xFFFFFFFF), self.pair_counts[key], self.unigram_counts, self.total_tokens)
+
+    def best_pair(self):
+        """
+        현재 점수가 가장 높은 pair (symbol 문자열 튜플)와 점수를 반환합니다. pair가 없으면 (None, 0)입니다.
+        """
+        heap = self._heap
+        while heap:
+            neg_score, first, second, key = heap[0]
+            if key not in self.pair_counts:
+                heapq.heappop(heap)
+                continue
+            score = self.score(key)
+            if score == -neg_score:
+                return (first, second), score
+            heapq.heapreplace(heap, (-score, first, second, key))
+        return None, 0
+
+    def merge(self, pair):
+        """
+        pair를 이 pair가 등장하는 단어에서만 병합하고 관련 빈도를 갱신합니다.
+        """
+        first = self.symbol_ids[pair[0]]
+        second = self.symbol_ids[pair[1]]
+        merged = self.intern(pair[0] + pair[1])
+        self._record_merge(pair)
+        symbols = self.symbols
+        # 점수를 다시 넣을 pair 집합입니다. 우선순위 큐를 쓰지 않는 backend는 모으지 않습니다.
+        touched = set() if self._requeues_pairs else None
+        for index in list(self.pair_words.get(first << 32 | second, ())):
+            start = self.offsets[index]
+            end = start + self.lengths[index]
+            freq = self.freqs[index]
+            for position in range(start, end - 1):
+                key = symbols[position] << 32 | symbols[position + 1]
+                self._remove_pair(key, freq, index)
+                if touched is not None:
+                    touched.add(key)
+            # merge_vocab의 정규식 치환과 같이 왼쪽부터 겹치지 않게, 단어 구간 안에서 제자리 병합합니다.
+            read = write = start
+            while read < end:
+                if read + 1 < end and symbols[read] == first and symbols[read + 1] == second:
+                    symbols[write] = merged
+                    read += 2
+                else:
+                    symbols[write] = symbols[read]
+                    read += 1
+                write += 1
+            n_merged = end - write
+            self.lengths[index] = write - start
+            for position in range(start, write - 1):
+                key = symbols[position] << 32 | symbols[position + 1]
+                self._add_pair(key, freq, index)
+                if touched is not None:
+                    touched.add(key)
+            self._add_unigram(first, -n_merged * freq)
+            self._add_unigram(second, -n_merged * freq)
+            self._add_unigram(merged, n_merged * freq)
+
+        if touched is None:
+            return
+        # 빈도가 바뀐 pair와, unigram 빈도가 줄어 점수가 오를 수 있는 pair의 점수를 다시 넣습니다.
+        touched.update(self.symbol_pairs.get(first, ()))
+        touched.update(self.symbol_pairs.get(second, ()))
+        for key in touched:
+            if key in self.pair_counts:
+                self._push(key)
+        # 오래된 항목이 쌓이면 살아 있는 pair의 현재 점수로 큐를 다시 만듭니다.
+        if len(self._heap) > 4 * len(self.pair_counts) + 1024:
+            self._rebuild_heap()
+
+    def _push(self, key):
+        # 동점이면 symbol 문자열 순으로 고르도록 문자열도 함께 넣습니다 (select_best_pair와 같은 순서).
+        heapq.heappush(self._heap, (
+            -self.score(key), self.symbol_strings[key >> 32], self.symbol_strings[key & 0xFFFFFFFF], key))
+
+    def _add_unigram(self, symbol_id, delta):
+        before = self.unigram_counts[symbol_id]
+        after = before + delta
+        self.unigram_counts[symbol_id] = after
+        self.total_tokens += delta
+        if before <= 0 < after or after <= 0 < before:
+            stripped = self.symbol_strings[symbol_id].replace("</w>", "")
+            if after > 0:
+                self._stripped[stripped] += 1
+            else:
+                self._stripped[stripped] -= 1
+                if not self._stripped[stripped]:
+                    del self._stripped[stripped]
+
+    def _add_pair(self, key, freq, index):
+        count = self.pair_counts.get(key)
+        if count is None:
+            self.symbol_pairs[key >> 32].add(key)
+            self.symbol_pairs[key & 0xFFFFFFFF].add(key)
+            count = 0
+        self.pair_counts[key] = count + freq
+        self.pair_words[key].add(index)
+
+    def _remove_pair(self, key, freq, index):
+        count = self.pair_counts[key] - freq
+        if count > 0:
+            self.pair_counts[key] = count
+            self.pair_words[key].discard(index)
+            return
+        del self.pair_counts[key]
+        del self.pair_words[key]
+        for symbol_id in (key >> 32, key & 0xFFFFFFFF):
+            symbol_pairs = self.symbol_pairs[symbol_id]
+            symbol_pairs.discard(key)
+            if not symbol_pairs:
+                del self.symbol_pairs[symbol_id]
+
+class VectorizedPairStats(IncrementalPairStats):
+    """
+    IncrementalPairStats와 같은 증분 갱신을 하되, 최고 점수 pair를 우선순위 큐 대신 numpy로 고릅니다.
 
-def learn_wordpiece_vocab(file_path, num_merges=1000, target_vocab_size=1000):
+    pair 빈도와 두 symbol id를 slot 단위로 정렬된 배열에 두고, 매 반복 모든 후보의
+    observed * log(observed / expected)를 한 번의 벡터 연산으로 계산해 argmax를 구합니다.
+    np.log와 math.log는 마지막 자리가 다를 수 있으므로, 최댓값에 아주 가까운 후보만
+    compute_likelihood_score로 다시 계산해 (점수, pair 문자열) 순으로 고릅니다.
+    따라서 선택 결과는 다른 방식과 같습니다.
+    """
+
+    def __init__(self, word_counts=(), state=None):
+        if np is None:
+            raise ImportError("scoring='vectorized' requires numpy. Install it with `pip install numpy`.")
+        self._slots = {}
+        self._slot_keys = []
+        self._free_slots = []
+        self._freq = np.zeros(1024, dtype=np.float64)
+        self._first = np.zeros(1024, dtype=np.int64)
+        self._second = np.zeros(1024, dtype=np.int64)
+        super().__init__(word_counts, state=state)
+
+    def best_pair(self):
+        if not self._slots:
+            return None, 0
+        n = len(self._slot_keys)
+        freq = self._freq[:n]
+        unigram = np.frombuffer(self.unigram_counts, dtype=np.int64).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = unigram[self._first[:n]] * unigram[self._second[:n]] / self.total_tokens
+            scores = np.where(freq > 0, freq * np.log(freq / expected), -np.inf)
+        best = scores.max()
+        candidates = np.flatnonzero(scores >= best - abs(best) * 1e-9)
+        symbol_strings = self.symbol_strings
+        best_score, first, second = min(
+            (-self.score(key), symbol_strings[key >> 32], symbol_strings[key & 0xFFFFFFFF])
+            for key in (self._slot_keys[slot] for slot in candidates.tolist()))
+        return (first, second), -best_score
+
+    # 큐를 쓰지 않습니다. 점수는 best_pair에서 매번 배열 전체로 다시 계산하므로 merge가 바뀐 pair를 모으지 않습니다.
+    _requeues_pairs = False
+
+    def _push(self, key):
+        pass
+
+    def _add_pair(self, key, freq, index):
+        super()._add_pair(key, freq, index)
+        self._set_freq(key, self.pair_counts[key])
+
+    def _remove_pair(self, key, freq, index):
+        super()._remove_pair(key, freq, index)
+        self._set_freq(key, self.pair_counts.get(key, 0))
+
+    def _set_freq(self, key, count):
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._slot_keys[slot] = key
+            else:
+                slot = len(self._slot_keys)
+                self._slot_keys.append(key)
+                if slot == len(self._freq):
+                    self._freq = np.concatenate([self._freq, np.zeros_like(self._freq)])
+                    self._first = np.concatenate([self._first, np.zeros_like(self._first)])
+                    self._second = np.concatenate([self._second, np.zeros_like(self._second)])
+            self._slots[key] = slot
+            self._first[slot] = key >> 32
+            self._second[slot] = key & 0xFFFFFFFF
+        self._freq[slot] = count
+        if not count:
+            # 빈 slot은 빈도 0으로 남겨 두면 점수 계산에서 -inf로 빠지고, 다음 새 pair가 재사용합니다.
+            del self._slots[key]
+            self._free_slots.append(slot)
+
+_SCORING_BACKENDS = {"heap": IncrementalPairStats, "vectorized": VectorizedPairStats}
+
+def learn_wordpiece_vocab(file_path, num_merges=1000, target_vocab_size=1000, incremental=True, num_workers=None,
+                          scoring="heap", min_frequency=1, max_words=None, sample_rate=None, sample_lines=None,
+                          seed=0, resume_from=None, save_state=None):
     """
     test.txt 파일을 기반으로 likelihood 기반의 점수를 사용해 vocabulary를 학습합니다.
     
+    file_path: 학습 파일 경로 또는 glob 패턴 (하나 또는 리스트)
     num_merges: 최대 병합 횟수
     target_vocab_size: 원하는 최종 vocabulary 크기 (특수 토큰 포함)
+    incremental: True면 IncrementalPairStats로 병합에 영향을 받은 빈도만 갱신합니다.
+        False면 매 반복 전체 통계를 다시 계산합니다. 두 방식의 병합 순서는 같습니다.
+    num_workers: incremental일 때 단어 빈도를 셀 worker 프로세스 수 (count_words 참고)
+    scoring: incremental일 때 최고 점수 pair를 고르는 방식.
+        "heap"은 우선순위 큐, "vectorized"는 numpy로 모든 후보를 한 번에 계산합니다 (numpy 필요).
+    min_frequency, max_words: 학습 전에 단어를 거르는 기준 (prune_word_counts 참고)
+    sample_rate: 각 바이트 구간에서 이 비율의 줄만 뽑아 학습합니다 (count_words 참고)
+    sample_lines: 전체 코퍼스에서 이 개수의 줄만 reservoir sampling으로 뽑아 학습합니다
+    seed: 표본 추출 seed
+    resume_from: save_trainer_state로 저장한 상태 파일 경로. 주어지면 저장된 병합에서 이어서 학습하며,
+        file_path는 새로 추가된 파일만 가리키면 됩니다 (없으면 None). target_vocab_size는 새 목표 크기입니다.
+        반환하는 병합 목록에는 이전 병합도 포함됩니다.
+    save_state: 학습이 끝난 상태를 이 경로에 저장합니다. 나중에 resume_from으로 이어서 학습할 수 있습니다.
+    min_frequency, max_words, sample_rate, sample_lines, resume_from, save_state는 incremental=True일 때만 쓸 수 있습니다.
+    이어서 학습할 때 sample_rate, sample_lines는 새 파일에만 적용되고, min_frequency, max_words는 쓸 수 없습니다.
+    옵션별로 전체 학습 결과와 얼마나 달라지는지는 benchmarks/train_report.py로 확인할 수 있습니다.
     """
-    corpus = get_corpus(file_path)
+    if scoring not in _SCORING_BACKENDS:
+        raise ValueError(f"Unknown scoring backend '{scoring}'. Use one of {sorted(_SCORING_BACKENDS)}.")
+    if sample_rate is not None and sample_lines is not None:
+        raise ValueError("Use either sample_rate or sample_lines, not both.")
+    if incremental:
+        state = None
+        if resume_from is not None:
+            # 저장된 단어 빈도는 이미 합쳐져 있어 새 파일만으로는 전체 빈도 기준으로 거를 수 없습니다.
+            if min_frequency != 1 or max_words is not None:
+                raise ValueError("min_frequency and max_words cannot be combined with resume_from.")
+            state = load_trainer_state(resume_from)
+        if not file_path:
+            word_counts = {}
+        elif sample_lines is not None:
+            word_counts = get_word_counts(reservoir_sample_lines(file_path, sample_lines, seed=seed))
+        else:
+            word_counts = count_words(file_path, num_workers=num_workers, sample_rate=sample_rate, seed=seed)
+        word_counts = prune_word_counts(word_counts, min_frequency=min_frequency, max_words=max_words)
+        stats = _learn_incremental(word_counts, num_merges, target_vocab_size, scoring, state=state)
+        if save_state is not None:
+            save_trainer_state(stats, save_state)
+        return stats.current_vocab(), list(stats.merges)
+    if (min_frequency != 1 or max_words is not None or sample_rate is not None or sample_lines is not None
+            or resume_from is not None or save_state is not None):
+        raise ValueError("Pruning, sampling and trainer state options require incremental=True.")
+    corpus = [line for path in expand_input_paths(file_path) for line in get_corpus(path)]
     vocab = get_initial_vocab(corpus)
+
     merges = []
+    current_vocab = get_current_vocab(vocab)
 
     for i in range(num_merges):
         pair_stats = get_pair_stats(vocab)
@@ -82,14 +628,14 @@ def learn_wordpiece_vocab(file_path, num_merges=1000, target_vocab_size=1000):
         
         # 각 후보 쌍에 대해 likelihood 점수를 계산하는 부분
         scores = {}
-        # TODO: pair_stats를 순회하면서 각 pair에 대한 likelihood 점수를 계산하고 scores 딕셔너리에 저장하는 코드를 작성하세요.
+        for pair, pair_freq in pair_stats.items():
+            scores[pair] = compute_likelihood_score(pair, pair_freq, unigram_counts, total_tokens)
         
         if not scores:
             break
         
-        # TODO: scores 딕셔너리에서 가장 높은 점수를 가진 pair(best_pair)와 그 점수(best_score)를 결정하는 코드를 작성하세요.
-        best_pair = None   # 예시: best_pair = max(scores, key=scores.get)
-        best_score = 0     # 예시: best_score = scores[best_pair]
+        best_pair = select_best_pair(scores)
+        best_score = scores[best_pair]
         
         # 점수가 음수이거나 변화가 없으면 종료
         if best_score <= 0:
@@ -99,17 +645,42 @@ def learn_wordpiece_vocab(file_path, num_merges=1000, target_vocab_size=1000):
         vocab = merge_vocab(best_pair, vocab)
         
         # 현재 vocabulary 크기 확인 (특수 토큰 제외)
-        current_vocab = set()
-        for token_seq in vocab.keys():
-            tokens = token_seq.split()
-            for token in tokens:
-                token = token.replace("</w>", "")
-                current_vocab.add(token)
+        current_vocab = get_current_vocab(vocab)
         if len(current_vocab) >= target_vocab_size:
             break
 
     return current_vocab, merges
 
+def _learn_incremental(word_counts, num_merges, target_vocab_size, scoring="heap", state=None):
+    stats = _SCORING_BACKENDS[scoring](word_counts, state=state)
+    # 이어서 학습할 때는 이미 목표 크기에 도달했으면 더 병합하지 않습니다.
+    if state is not None and stats.vocab_size() >= target_vocab_size:
+        return stats
+    for i in range(num_merges):
+        best_pair, best_score = stats.best_pair()
+        if best_pair is None or best_score <= 0:
+            break
+        stats.merge(best_pair)
+        if stats.vocab_size() >= target_vocab_size:
+            break
+    return stats
+
+def save_trainer_state(stats, output_path):
+    """IncrementalPairStats의 상태(단어 빈도, 단어별 분할, 병합 목록)를 저장합니다."""
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(stats.state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, output_path)
+
+def load_trainer_state(state_path):
+    """save_trainer_state로 저장한 상태를 읽습니다. 직접 만든 파일만 읽으세요 (pickle 형식)."""
+    with open(state_path, "rb") as f:
+        return pickle.load(f)
+
+def default_state_path(vocab_path):
+    """vocab.txt와 같은 디렉터리의 trainer_state.pkl 경로입니다."""
+    return os.path.join(os.path.dirname(os.path.abspath(vocab_path)), "trainer_state.pkl")
+
 def save_vocab(vocab_set, output_path="vocab.txt"):
     """
     생성된 vocabulary를 파일로 저장합니다.
@@ -122,10 +693,50 @@ def save_vocab(vocab_set, output_path="vocab.txt"):
         for token in sorted(vocab_set):
             f.write(token + "\n")
 
+def save_merges(merges, output_path="merges.txt"):
+    """
+    병합 목록을 rank 순서대로 한 줄에 "symbol1 symbol2" 형식으로 저장합니다. MergeTokenizer가 읽습니다.
+    """
+    with open(output_path, "w", encoding="utf-8") as f:
+        for first, second in merges:
+            f.write(f"{first} {second}\n")
+
+def get_arguments():
+    default_input = Path(__file__).resolve().parent.parent.parent / "tests" / "tests.txt"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, nargs="+", default=None,
+                        help="Training files or glob patterns (default: tests.txt, or no new files with --resume)")
+    parser.add_argument("--output", type=str, default="src/word_piece_tokenizer/vocab.txt")
+    parser.add_argument("--merges_output", type=str, default=None,
+                        help="Where to save the merge list (default: merges.txt next to --output)")
+    parser.add_argument("--num_merges", type=int, default=1000)
+    parser.add_argument("--target_vocab_size", type=int, default=1000)
+    parser.add_argument("--num_workers", type=int, default=None, help="Processes used to count words")
+    parser.add_argument("--scoring", type=str, default="heap", choices=sorted(_SCORING_BACKENDS),
+                        help="How the best pair is selected each merge")
+    parser.add_argument("--min_frequency", type=int, default=1, help="Drop words seen fewer times than this")
+    parser.add_argument("--max_words", type=int, default=None, help="Keep only this many most frequent words")
+    parser.add_argument("--sample_rate", type=float, default=None, help="Train on this fraction of lines per chunk")
+    parser.add_argument("--sample_lines", type=int, default=None, help="Train on this many reservoir-sampled lines")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed")
+    parser.add_argument("--resume", "--extend", dest="resume", type=str, default=None,
+                        help="Continue from a saved trainer state; --input then lists only the new files")
+    parser.add_argument("--state_output", type=str, default=None,
+                        help="Where to save the trainer state (default: trainer_state.pkl next to --output)")
+    args = parser.parse_args()
+    if args.input is None and args.resume is None:
+        args.input = [str(default_input)]
+    return args
+
 if __name__ == "__main__":
-    # test.txt 파일을 기반으로 vocabulary 생성
-    file_path = Path(__file__).resolve().parent.parent.parent / "tests" / "tests.txt"
-    vocab_set, merges = learn_wordpiece_vocab(str(file_path), num_merges=1000, target_vocab_size=1000)
-    save_vocab(vocab_set, output_path="src/word_piece_tokenizer/vocab.txt")
+    # 기본값은 tests.txt 파일을 기반으로 vocabulary 생성
+    args = get_arguments()
+    vocab_set, merges = learn_wordpiece_vocab(
+        args.input, num_merges=args.num_merges, target_vocab_size=args.target_vocab_size,
+        num_workers=args.num_workers, scoring=args.scoring, min_frequency=args.min_frequency,
+        max_words=args.max_words, sample_rate=args.sample_rate, sample_lines=args.sample_lines, seed=args.seed,
+        resume_from=args.resume, save_state=args.state_output or default_state_path(args.output))
+    save_vocab(vocab_set, output_path=args.output)
+    save_merges(merges, output_path=args.merges_output or default_merges_path(args.output))
     print("Vocabulary 생성 완료. 총 토큰 수:", len(vocab_set))
     print("병합 기록 (일부):", merges[:10])
@@ -0,0 +1,107 @@
+from collections import deque
+from itertools import chain, islice
+import multiprocessing
+import os
+
+# 각 worker 프로세스가 pool initializer에서 한 번만 만드는 토크나이저입니다.
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer_cls, init_kwargs):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer_cls(**init_kwargs)
+
+
+def _run_chunk(method_name, chunk):
+    method = getattr(_worker_tokenizer, method_name)
+    return [method(text) for text in chunk]
+
+
+def _chunked(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_batch(tokenizer, texts, method="tokenize", num_workers=None, chunk_size=256, min_parallel_size=4096):
+    """
+    texts를 chunk_size 단위로 나눠 프로세스 풀에서 처리하고, 결과를 입력 순서대로 하나씩 내보냅니다.
+
+    동시에 처리 중인 chunk는 num_workers * 2개로 제한되므로 texts가 generator여도 메모리가 일정합니다.
+    입력이 min_parallel_size개보다 적거나 num_workers가 1 이하이면 풀을 만들지 않고 현재 프로세스에서 처리합니다.
+
+    Args:
+        tokenizer: init_kwargs 속성을 가진 토크나이저 (WordpieceTokenizer, FullTokenizer)
+        texts: 텍스트 iterable
+        method: 각 텍스트에 호출할 토크나이저 메서드 이름 ("tokenize", "encode" 등)
+        num_workers: worker 프로세스 수. None이면 os.cpu_count()
+        chunk_size: worker 한 번의 작업에 넘길 텍스트 수
+        min_parallel_size: 프로세스 풀을 쓰기 위한 최소 입력 크기
+
+    Yields:
+        각 텍스트에 method를 적용한 결과
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}.")
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    chunks = _chunked(texts, chunk_size)
+    head = []
+    n_head = 0
+    if num_workers > 1:
+        # 풀 생성 비용을 감당할 만큼 입력이 있는지 앞부분만 읽어 확인합니다.
+        for chunk in chunks:
+            head.append(chunk)
+            n_head += len(chunk)
+            if n_head >= min_parallel_size:
+                break
+
+    if num_workers <= 1 or n_head < min_parallel_size:
+        fn = getattr(tokenizer, method)
+        for chunk in chain(head, chunks):
+            for text in chunk:
+                yield fn(text)
+        return
+
+    calls = ((method, chunk) for chunk in chain(head, chunks))
+    for results in _imap_ordered(tokenizer, _run_chunk, calls, num_workers):
+        yield from results
+
+
+def imap_tasks(tokenizer, func, tasks, num_workers=None):
+    """
+    func(worker 토크나이저, *args)를 tasks의 각 args에 대해 프로세스 풀에서 실행하고 결과를 순서대로 내보냅니다.
+    func는 worker에서 import할 수 있는 모듈 수준 함수여야 합니다.
+    num_workers가 1 이하이거나 작업이 하나뿐이면 현재 프로세스에서 실행합니다.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    tasks = iter(tasks)
+    head = list(islice(tasks, 2))
+    if num_workers <= 1 or len(head) < 2:
+        for args in chain(head, tasks):
+            yield func(tokenizer, *args)
+        return
+    yield from _imap_ordered(tokenizer, _run_task, ((func, args) for args in chain(head, tasks)), num_workers)
+
+
+def _run_task(func, args):
+    return func(_worker_tokenizer, *args)
+
+
+def _imap_ordered(tokenizer, worker_fn, calls, num_workers):
+    # 동시에 처리 중인 작업 수를 num_workers * 2로 제한해 입력을 한꺼번에 읽지 않습니다.
+    max_pending = num_workers * 2
+    with multiprocessing.Pool(
+            num_workers, initializer=_init_worker, initargs=(type(tokenizer), tokenizer.init_kwargs)) as pool:
+        pending = deque()
+        for call in calls:
+            pending.append(pool.apply_async(worker_fn, call))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
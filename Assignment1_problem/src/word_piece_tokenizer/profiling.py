@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+import threading
+import time
+
+_COUNTERS = ("chars", "words", "wordpieces", "segmented_words", "unk_words", "long_words")
+
+
+class PipelineStats:
+    """
+    토크나이저 단계별 누적 시간과 호출 수, 처리량 카운터를 모읍니다.
+
+    stages의 시간은 단계 안에서 호출한 하위 단계 시간을 포함합니다 (예: basic_tokenize ⊃ clean_text).
+    여러 스레드에서 같은 토크나이저를 써도 되도록 갱신은 lock 안에서 합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._counters = dict.fromkeys(_COUNTERS, 0)
+
+    def record(self, stage, elapsed_ns, n_chars, **counts):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0, 0]
+            entry[0] += 1
+            entry[1] += elapsed_ns
+            entry[2] += n_chars
+            for name, value in counts.items():
+                self._counters[name] += value
+
+    def snapshot(self):
+        """
+        현재까지의 통계를 복사해 반환합니다.
+
+        Returns:
+            {"stages": {단계: {"calls", "time_s", "chars"}}, 카운터들..., "unk_rate"} 딕셔너리
+        """
+        with self._lock:
+            stages = {
+                stage: {"calls": calls, "time_s": elapsed_ns / 1e9, "chars": chars}
+                for stage, (calls, elapsed_ns, chars) in self._stages.items()
+            }
+            snapshot = dict(self._counters)
+        snapshot["stages"] = stages
+        segmented = snapshot["segmented_words"]
+        snapshot["unk_rate"] = snapshot["unk_words"] / segmented if segmented else 0.0
+        return snapshot
+
+
+class Profiled:
+    """
+    단계별 계측을 켜고 끌 수 있게 해 주는 mixin입니다.
+
+    _PROFILED_STAGES의 메서드를 켤 때만 인스턴스 속성으로 감싼 함수로 덮어쓰고, 끌 때 제거합니다.
+    꺼져 있을 때는 클래스의 원래 메서드가 그대로 호출되므로 추가 비용이 없습니다.
+    """
+
+    # 메서드 이름 -> 단계 이름
+    _PROFILED_STAGES = {}
+    profiler = None
+
+    def enable_profiling(self, stats=None):
+        """
+        계측을 켭니다.
+
+        Args:
+            stats: 결과를 모을 PipelineStats. None이면 새로 만듭니다. 여러 토크나이저가 공유할 수 있습니다.
+
+        Returns:
+            사용하는 PipelineStats
+        """
+        if self.profiler is not None:
+            self.disable_profiling()
+        if stats is None:
+            stats = PipelineStats()
+        for method_name, stage in self._PROFILED_STAGES.items():
+            method = getattr(self, method_name)
+            setattr(self, method_name, self._wrap_stage(stats, stage, method))
+        for part in self._profiled_parts():
+            part.enable_profiling(stats)
+        self.profiler = stats
+        return stats
+
+    def disable_profiling(self):
+        for method_name in self._PROFILED_STAGES:
+            self.__dict__.pop(method_name, None)
+        for part in self._profiled_parts():
+            part.disable_profiling()
+        self.__dict__.pop("profiler", None)
+
+    def stats(self):
+        """계측 결과 snapshot입니다. 계측이 꺼져 있으면 빈 딕셔너리를 반환합니다."""
+        return self.profiler.snapshot() if self.profiler is not None else {}
+
+    @contextmanager
+    def profile(self, stats=None):
+        """
+        with 블록 안에서만 계측을 켭니다.
+
+        예시:
+            with tokenizer.profile() as stats:
+                tokenizer.tokenize(text)
+            print(stats.snapshot())
+        """
+        previous = self.profiler
+        stats = self.enable_profiling(stats)
+        try:
+            yield stats
+        finally:
+            self.disable_profiling()
+            if previous is not None:
+                self.enable_profiling(previous)
+
+    def _profiled_parts(self):
+        """같은 PipelineStats로 함께 계측할 하위 토크나이저들입니다."""
+        return ()
+
+    def _wrap_stage(self, stats, stage, method):
+        """문자열 하나를 받는 단계 메서드의 시간, 호출 수, 입력 문자 수를 기록하도록 감쌉니다."""
+        timer = time.perf_counter_ns
+        record = stats.record
+
+        def timed(text, *args, **kwargs):
+            start = timer()
+            result = method(text, *args, **kwargs)
+            record(stage, timer() - start, len(text))
+            return result
+
+        return timed
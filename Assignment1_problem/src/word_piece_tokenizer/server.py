@@ -0,0 +1,368 @@
+"""
+WordPiece 토크나이저를 asyncio 서버로 띄워 여러 서비스가 한 host의 warm 토크나이저를 같이 쓰게 합니다.
+
+프로토콜: 각 frame은 4바이트 big-endian 길이 + UTF-8 JSON입니다.
+    요청: {"id": int, "method": "tokenize" | "encode", "text": str}
+    응답: {"id": int, "result": list} 또는 {"id": int, "error": str}
+
+실행 예시:
+    python -m src.word_piece_tokenizer.server --port 8765
+    python -m src.word_piece_tokenizer.server --unix /tmp/wordpiece.sock
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import struct
+
+from . import parallel
+from .FullTokenizer import FullTokenizer
+from .WordPieceTokenizer import WordpieceTokenizer
+
+_LENGTH = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+METHODS = ("tokenize", "encode")
+
+
+async def read_frame(reader):
+    """frame 하나를 읽어 JSON으로 해석합니다. 연결이 끝났으면 None을 반환합니다."""
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed in the middle of a frame.") from e
+        return None
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit.")
+    return json.loads(await reader.readexactly(length))
+
+
+def write_frame(writer, message):
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    writer.write(_LENGTH.pack(len(payload)) + payload)
+
+
+def _run_requests(requests, tokenizer=None):
+    """
+    (method, text) 묶음을 처리합니다. tokenizer가 None이면 worker 프로세스의 토크나이저를 사용합니다.
+    encode 결과(array)는 JSON으로 보낼 수 있도록 list로 바꿉니다.
+    """
+    if tokenizer is None:
+        tokenizer = parallel._worker_tokenizer
+    results = []
+    for method, text in requests:
+        result = getattr(tokenizer, method)(text)
+        results.append(result.tolist() if method == "encode" else result)
+    return results
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 요청을 max_batch_size개 또는 max_wait_ms 중 먼저 채워지는 기준으로 묶어 worker 풀에 보냅니다.
+
+    대기열은 max_pending개로 제한되어, 가득 차면 submit이 기다리고 그동안 해당 연결에서 더 읽지 않습니다.
+    동시에 처리 중인 batch도 worker 수의 두 배로 제한합니다.
+    """
+
+    def __init__(self, tokenizer, max_batch_size=64, max_wait_ms=2.0, max_pending=1024, num_workers=None):
+        """
+        Args:
+            tokenizer: init_kwargs 속성을 가진 토크나이저 (WordpieceTokenizer, FullTokenizer)
+            max_batch_size: batch 하나에 담을 최대 요청 수
+            max_wait_ms: 첫 요청이 들어온 뒤 batch를 채우며 기다리는 최대 시간
+            max_pending: 대기열에 쌓일 수 있는 최대 요청 수
+            num_workers: worker 프로세스 수. None이면 os.cpu_count(), 0이면 이벤트 루프의 스레드 풀에서 처리합니다.
+        """
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}.")
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._in_flight = asyncio.Semaphore(max(1, 2 * num_workers))
+        self._executor = None
+        if num_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=num_workers, initializer=parallel._init_worker,
+                initargs=(type(tokenizer), tokenizer.init_kwargs))
+        self._task = None
+        self._batches = set()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def enqueue(self, method, text):
+        """요청 하나를 대기열에 넣고 결과 future를 반환합니다. 대기열이 가득 차면 자리가 날 때까지 기다립니다."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}'. Use one of {METHODS}.")
+        if not isinstance(text, str):
+            raise ValueError(f"text must be a string, got {type(text).__name__}.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((method, text, future))
+        return future
+
+    async def submit(self, method, text):
+        """요청 하나를 대기열에 넣고 결과를 기다립니다."""
+        return await (await self.enqueue(method, text))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._in_flight.acquire()
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        requests = [(method, text) for method, text, _ in batch]
+        try:
+            if self._executor is not None:
+                results = await loop.run_in_executor(self._executor, _run_requests, requests)
+            else:
+                results = await loop.run_in_executor(None, _run_requests, requests, self.tokenizer)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._in_flight.release()
+
+
+class TokenizerServer:
+    """MicroBatcher 앞에서 length-prefixed JSON 요청을 받는 asyncio 서버입니다."""
+
+    def __init__(self, tokenizer, host="127.0.0.1", port=0, path=None, **batcher_kwargs):
+        """
+        Args:
+            tokenizer: 서버가 사용할 토크나이저
+            host, port: localhost TCP 주소. port=0이면 빈 포트를 고릅니다.
+            path: 주어지면 TCP 대신 이 경로의 Unix socket에서 받습니다.
+            batcher_kwargs: MicroBatcher 인자 (max_batch_size, max_wait_ms, max_pending, num_workers)
+        """
+        self.tokenizer = tokenizer
+        self.host = host
+        self.port = port
+        self.path = path
+        self._batcher_kwargs = batcher_kwargs
+        self.batcher = None
+        self._server = None
+        self._connections = {}
+
+    async def start(self):
+        self.batcher = MicroBatcher(self.tokenizer, **self._batcher_kwargs)
+        self.batcher.start()
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # 열린 연결을 닫아 각 handler가 읽기를 끝내고 남은 응답을 정리하게 합니다.
+            for writer in self._connections.values():
+                writer.close()
+            if self._connections:
+                await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self.batcher is not None:
+            await self.batcher.close()
+            self.batcher = None
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        pending = set()
+        try:
+            while True:
+                try:
+                    message = await read_frame(reader)
+                except (ConnectionError, ValueError):
+                    break
+                if not isinstance(message, dict):
+                    break
+                # 대기열이 가득 차면 여기서 기다리며 이 연결에서 더 읽지 않습니다.
+                # 같은 연결에서 여러 요청을 보내도 되므로 응답은 처리되는 대로 id와 함께 씁니다.
+                future = await self._enqueue(message)
+                pending.add(future)
+                future.add_done_callback(pending.discard)
+                future.add_done_callback(lambda done, request_id=message.get("id"): self._respond(
+                    writer, request_id, done))
+                await writer.drain()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _enqueue(self, message):
+        try:
+            return await self.batcher.enqueue(message.get("method"), message.get("text"))
+        except ValueError as e:
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(e)
+            return future
+
+    def _respond(self, writer, request_id, future):
+        if writer.is_closing():
+            return
+        if future.cancelled():
+            write_frame(writer, {"id": request_id, "error": "cancelled"})
+        elif future.exception() is not None:
+            write_frame(writer, {"id": request_id, "error": str(future.exception())})
+        else:
+            write_frame(writer, {"id": request_id, "result": future.result()})
+
+
+class TokenizerClient:
+    """
+    TokenizerServer용 client입니다. 최대 pool_size개의 연결을 만들어 재사용합니다.
+
+    예시:
+        async with TokenizerClient(port=8765) as client:
+            tokens = await client.tokenize("hello world")
+    """
+
+    def __init__(self, host="127.0.0.1", port=None, path=None, pool_size=4):
+        if port is None and path is None:
+            raise ValueError("TokenizerClient needs a TCP port or a Unix socket path.")
+        self.host = host
+        self.port = port
+        self.path = path
+        self.pool_size = pool_size
+        self._idle = []
+        self._slots = asyncio.Semaphore(pool_size)
+        self._next_id = 0
+
+    async def tokenize(self, text):
+        return await self._request("tokenize", text)
+
+    async def encode(self, text):
+        return await self._request("encode", text)
+
+    async def tokenize_many(self, texts):
+        """여러 텍스트를 동시에 보냅니다. 서버에서 하나의 micro-batch로 묶일 수 있습니다."""
+        return await asyncio.gather(*(self.tokenize(text) for text in texts))
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _connect(self):
+        if self.path is not None:
+            return await asyncio.open_unix_connection(self.path)
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _request(self, method, text):
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            self._next_id += 1
+            request_id = self._next_id
+            reader, writer = connection
+            try:
+                write_frame(writer, {"id": request_id, "method": method, "text": text})
+                await writer.drain()
+                response = await read_frame(reader)
+            except BaseException:
+                writer.close()
+                raise
+            if response is None:
+                writer.close()
+                raise ConnectionError("Server closed the connection.")
+            self._idle.append(connection)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", type=str, default=None, help="Serve on this Unix socket path instead of TCP")
+    parser.add_argument("--vocab", type=str, default=None, help="vocab.txt location")
+    parser.add_argument("--full", action="store_true", help="Run BasicTokenizer before WordPiece (FullTokenizer)")
+    parser.add_argument("--compiled", action="store_true", help="Use the compiled vocab.bin")
+    parser.add_argument("--cache_size", type=int, default=0)
+    parser.add_argument("--max_batch_size", type=int, default=64)
+    parser.add_argument("--max_wait_ms", type=float, default=2.0)
+    parser.add_argument("--max_pending", type=int, default=1024)
+    parser.add_argument("--num_workers", type=int, default=None)
+    return parser.parse_args()
+
+
+async def main(args):
+    tokenizer_cls = FullTokenizer if args.full else WordpieceTokenizer
+    tokenizer = tokenizer_cls(cache_size=args.cache_size, vocab_file=args.vocab, compiled=args.compiled)
+    server = TokenizerServer(
+        tokenizer, host=args.host, port=args.port, path=args.unix, max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms, max_pending=args.max_pending, num_workers=args.num_workers)
+    await server.start()
+    print(f"Serving on {args.unix or f'{args.host}:{server.port}'}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(get_arguments()))
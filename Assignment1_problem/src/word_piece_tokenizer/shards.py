@@ -0,0 +1,201 @@
+from array import array
+import json
+import mmap
+import os
+
+from .parallel import imap_tasks
+from .utils import line_aligned_ranges
+
+# numpy 없이도 읽고 쓸 수 있도록 array typecode로 저장 형식을 표현합니다.
+_TYPECODES = {"uint16": "H", "uint32": "I"}
+_OFFSET_TYPECODE = "Q"
+META_FILE = "meta.json"
+
+
+def _encode_range(tokenizer, path, start, end):
+    """worker에서 바이트 구간을 직접 읽어 줄(문서) 단위로 encode합니다."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    ids = array("I")
+    lengths = array(_OFFSET_TYPECODE)
+    for line in data.decode("utf-8").split("\n"):
+        if not line.strip():
+            continue
+        encoded = tokenizer.encode(line)
+        ids.extend(encoded)
+        lengths.append(len(encoded))
+    return ids, lengths
+
+
+class ShardWriter:
+    """
+    토큰 id를 memory-mapped 샤드 파일(shard_XXXXX.bin)에 순서대로 씁니다.
+    각 샤드에는 문서 시작 오프셋 인덱스(shard_XXXXX.idx)가 함께 저장되며, 한 문서는 한 샤드 안에만 들어갑니다.
+    """
+
+    def __init__(self, output_dir, dtype="uint16", shard_tokens=1 << 26):
+        if dtype not in _TYPECODES:
+            raise ValueError(f"Unknown dtype '{dtype}'. Use one of {sorted(_TYPECODES)}.")
+        if shard_tokens <= 0:
+            raise ValueError(f"shard_tokens must be positive, got {shard_tokens}.")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.dtype = dtype
+        self.typecode = _TYPECODES[dtype]
+        self.itemsize = array(self.typecode).itemsize
+        self.shard_tokens = shard_tokens
+        self.shards = []
+        self._file = None
+        self._mmap = None
+        self._view = None
+
+    def _open_shard(self, capacity):
+        name = f"shard_{len(self.shards):05d}"
+        self._file = open(os.path.join(self.output_dir, name + ".bin"), "w+b")
+        self._file.truncate(capacity * self.itemsize)
+        self._mmap = mmap.mmap(self._file.fileno(), capacity * self.itemsize)
+        self._view = memoryview(self._mmap).cast(self.typecode)
+        self._capacity = capacity
+        self._position = 0
+        self._offsets = array(_OFFSET_TYPECODE, [0])
+        self._name = name
+
+    def _close_shard(self):
+        self._view.release()
+        self._mmap.flush()
+        self._mmap.close()
+        # 미리 잡아 둔 공간 중 쓰지 않은 뒷부분을 잘라냅니다.
+        self._file.truncate(self._position * self.itemsize)
+        self._file.close()
+        with open(os.path.join(self.output_dir, self._name + ".idx"), "wb") as f:
+            self._offsets.tofile(f)
+        self.shards.append({"name": self._name, "tokens": self._position, "documents": len(self._offsets) - 1})
+        self._file = self._mmap = self._view = None
+
+    def add_documents(self, ids, lengths):
+        """
+        여러 문서의 토큰 id를 이어 붙인 ids와 문서별 길이 lengths를 씁니다.
+        """
+        start = 0
+        for length in lengths:
+            if self._view is not None and self._position + length > self._capacity:
+                self._close_shard()
+            if self._view is None:
+                self._open_shard(max(self.shard_tokens, length))
+            end = start + length
+            self._view[self._position:self._position + length] = array(self.typecode, ids[start:end])
+            self._position += length
+            self._offsets.append(self._position)
+            start = end
+
+    def close(self):
+        """열린 샤드를 마무리하고 meta.json을 씁니다."""
+        if self._view is not None:
+            self._close_shard()
+        meta = {
+            "dtype": self.dtype,
+            "num_tokens": sum(shard["tokens"] for shard in self.shards),
+            "num_documents": sum(shard["documents"] for shard in self.shards),
+            "shards": self.shards,
+        }
+        with open(os.path.join(self.output_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_token_shards(input_paths, output_dir, tokenizer, num_workers=None, chunk_bytes=1 << 24,
+                       shard_tokens=1 << 26, dtype=None):
+    """
+    텍스트 파일들을 줄(문서) 단위로 토큰화해 memory-mapped 토큰 id 샤드로 저장합니다.
+    파일 전체를 메모리에 올리지 않고 줄 경계로 나눈 바이트 구간을 worker들이 병렬로 읽어 encode합니다.
+
+    Args:
+        input_paths: 입력 텍스트 파일 경로 또는 경로 리스트
+        output_dir: 샤드를 저장할 디렉터리
+        tokenizer: encode 메서드와 init_kwargs를 가진 토크나이저 (보통 FullTokenizer)
+        num_workers: worker 프로세스 수. None이면 CPU 코어 수
+        chunk_bytes: worker 한 번의 작업에 넘길 바이트 구간 크기
+        shard_tokens: 샤드 하나에 담을 최대 토큰 수
+        dtype: "uint16" 또는 "uint32". None이면 vocab 크기에 맞춰 고릅니다.
+
+    Returns:
+        meta.json에 기록된 샤드 정보 딕셔너리
+    """
+    if isinstance(input_paths, (str, os.PathLike)):
+        input_paths = [input_paths]
+    if dtype is None:
+        vocab = getattr(tokenizer, "wordpiece_tokenizer", tokenizer).vocab
+        dtype = "uint16" if max(vocab.values()) < (1 << 16) else "uint32"
+
+    tasks = ((str(path), start, end) for path in input_paths for start, end in line_aligned_ranges(path, chunk_bytes))
+    writer = ShardWriter(output_dir, dtype=dtype, shard_tokens=shard_tokens)
+    for ids, lengths in imap_tasks(tokenizer, _encode_range, tasks, num_workers=num_workers):
+        writer.add_documents(ids, lengths)
+    return writer.close()
+
+
+class ShardReader:
+    """
+    write_token_shards로 만든 샤드를 mmap으로 열어 문서 단위 memoryview를 복사 없이 내보냅니다.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        typecode = _TYPECODES[self.meta["dtype"]]
+        self._files = []
+        self._mmaps = []
+        self._views = []
+        self._offsets = []
+        for shard in self.meta["shards"]:
+            with open(os.path.join(directory, shard["name"] + ".idx"), "rb") as f:
+                offsets = array(_OFFSET_TYPECODE)
+                offsets.frombytes(f.read())
+            f = open(os.path.join(directory, shard["name"] + ".bin"), "rb")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._files.append(f)
+            self._mmaps.append(mm)
+            self._views.append(memoryview(mm).cast(typecode))
+            self._offsets.append(offsets)
+
+    def __len__(self):
+        return self.meta["num_documents"]
+
+    def __iter__(self):
+        for view, offsets in zip(self._views, self._offsets):
+            for i in range(len(offsets) - 1):
+                yield view[offsets[i]:offsets[i + 1]]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("document index out of range")
+        for view, offsets in zip(self._views, self._offsets):
+            n_docs = len(offsets) - 1
+            if index < n_docs:
+                return view[offsets[index]:offsets[index + 1]]
+            index -= n_docs
+
+    def close(self):
+        """mmap을 닫습니다. 내보낸 문서 memoryview를 모두 해제한 뒤 호출해야 합니다."""
+        for view in self._views:
+            view.release()
+        for mm in self._mmaps:
+            mm.close()
+        for f in self._files:
+            f.close()
+        self._views = self._mmaps = self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
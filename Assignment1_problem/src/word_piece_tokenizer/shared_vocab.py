@@ -0,0 +1,63 @@
+from multiprocessing import shared_memory
+
+from .compiled_vocab import compile_vocab_bytes, parse_compiled_vocab
+
+
+class SharedVocab:
+    """
+    컴파일된 vocab(토큰 테이블 + 트라이)을 multiprocessing.shared_memory segment에 올려 둡니다.
+
+    부모 프로세스에서 한 번 만들고 name만 worker에 넘기면, 각 worker는
+    WordpieceTokenizer(shared_vocab=name)으로 같은 segment를 읽기 전용으로 붙여 씁니다.
+    worker 수가 늘어도 vocab과 트라이는 물리 메모리에 한 벌만 존재합니다.
+    """
+
+    def __init__(self, vocab_file):
+        data = compile_vocab_bytes(vocab_file)
+        self._shm = shared_memory.SharedMemory(create=True, size=len(data))
+        self._shm.buf[:len(data)] = data
+        self.name = self._shm.name
+        self.size = len(data)
+
+    def close(self):
+        """segment를 닫고 제거합니다. 이미 붙어 있는 프로세스는 자신의 매핑을 닫을 때까지 계속 읽을 수 있습니다."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _AttachedSharedMemory(shared_memory.SharedMemory):
+    """
+    worker 쪽 매핑입니다. 트라이 배열 memoryview가 남아 있는 채로 GC되어도
+    (인터프리터 종료 시 등) BufferError를 내지 않고, 매핑은 마지막 view가 사라질 때 해제됩니다.
+    """
+
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+def attach_shared_vocab(name):
+    """
+    SharedVocab segment에 읽기 전용으로 붙습니다.
+
+    Returns:
+        (SharedMemory, CompiledVocab, TokenTable, WordpieceTrie) 튜플.
+        SharedMemory 객체는 매핑을 유지하기 위해 호출한 쪽에서 들고 있어야 합니다.
+    """
+    try:
+        # Python 3.13+: segment 수명은 만든 프로세스가 관리하므로 추적하지 않습니다.
+        shm = _AttachedSharedMemory(name=name, track=False)
+    except TypeError:
+        shm = _AttachedSharedMemory(name=name)
+    vocab, ids_to_tokens, trie = parse_compiled_vocab(shm.buf.toreadonly())
+    return shm, vocab, ids_to_tokens, trie
@@ -1,22 +1,221 @@
+from bisect import bisect_right
 from collections import OrderedDict
+import heapq
 import os
+import re
+import threading
 import unicodedata
 
+# 문자 분류 플래그 (BMP 전체에 대해 한 번만 계산해 bytearray에 저장합니다)
+_WHITESPACE = 1
+_STRIPPED = 2
+_PUNCTUATION = 4
+_CHINESE = 8
+_NONSPACING_MARK = 16
 
-def load_vocab(vocab_file):
+_BMP_SIZE = 0x10000
+_ASTRAL_RE = re.compile("[\U00010000-\U0010FFFF]")
+_CHINESE_CHAR_RE = re.compile(
+    "[\u4E00-\u9FFF\u3400-\u4DBF\U00020000-\U0002A6DF\U0002A700-\U0002B73F"
+    "\U0002B740-\U0002B81F\U0002B820-\U0002CEAF\uF900-\uFAFF\U0002F800-\U0002FA1F]")
+
+_char_flags_table = None
+_clean_translation = None
+_accent_translation = None
+
+
+def read_vocab_tokens(vocab_file):
     if not os.path.isfile(vocab_file):
         raise ValueError(
             f"Can't find a vocabulary file at path '{vocab_file}'.")
 
-    vocab = OrderedDict()
     with open(vocab_file, "r", encoding="utf-8") as reader:
         tokens = reader.readlines()
-    for index, token in enumerate(tokens):
-        token = token.rstrip("\n")
+    return [token.rstrip("\n") for token in tokens]
+
+
+def load_vocab(vocab_file):
+    vocab = OrderedDict()
+    for index, token in enumerate(read_vocab_tokens(vocab_file)):
         vocab[token] = index
     return vocab
 
 
+def default_merges_path(vocab_file):
+    """vocab.txt와 같은 디렉터리의 merges.txt 경로입니다."""
+    return os.path.join(os.path.dirname(os.path.abspath(vocab_file)), "merges.txt")
+
+
+def load_merges(merges_file):
+    """
+    make_voca.save_merges로 저장한 병합 목록을 읽습니다.
+
+    Returns:
+        (symbol1, symbol2) -> rank 튜플 딕셔너리 (add_merge_rank 참고).
+    """
+    if not os.path.isfile(merges_file):
+        raise ValueError(f"Can't find a merges file at path '{merges_file}'.")
+    ranks = {}
+    with open(merges_file, "r", encoding="utf-8") as reader:
+        for rank, line in enumerate(reader):
+            pair = tuple(line.rstrip("\n").split(" "))
+            if len(pair) != 2:
+                raise ValueError(f"Malformed merge on line {rank + 1} of '{merges_file}': {line!r}")
+            add_merge_rank(ranks, pair, rank)
+    return ranks
+
+
+def add_merge_rank(ranks, pair, rank):
+    """
+    pair의 rank 튜플에 rank를 추가합니다.
+
+    학습 중 다른 병합으로 같은 symbol이 새로 생기면 이미 병합한 pair가 나중에 다시 학습될 수 있으므로,
+    처음 rank만 남기지 않고 모든 rank를 오름차순으로 보관합니다. apply_merges는 pair가 새로 생긴 시점 이후의
+    가장 가까운 rank에 그 pair를 병합합니다.
+    """
+    ranks[pair] = ranks.get(pair, ()) + (rank,)
+
+
+def _next_merge_rank(ranks, pair, after):
+    """pair의 rank 중 after보다 큰 가장 작은 rank입니다. 없으면 None입니다."""
+    pair_ranks = ranks.get(pair)
+    if pair_ranks is None:
+        return None
+    position = bisect_right(pair_ranks, after)
+    return pair_ranks[position] if position < len(pair_ranks) else None
+
+
+def apply_merges(symbols, ranks):
+    """
+    symbol 리스트에 병합을 rank 순서대로 적용한 결과를 반환합니다. MergeTokenizer와 make_voca가 함께 씁니다.
+
+    symbol을 연결 리스트로 두고 인접 pair를 (rank, 위치) heap에 넣어, 가장 낮은 rank의 pair부터 병합합니다.
+    병합할 때마다 바뀐 이웃 pair 두 개만 heap에 추가하므로 길이 n에 대해 O(n log n)입니다.
+    같은 rank는 왼쪽 위치부터 처리되어 학습 때의 왼쪽부터 겹치지 않는 병합과 같은 결과가 됩니다.
+    pair가 새로 생기면 현재보다 높은 rank 중 가장 가까운 rank에 병합하고, 그런 rank가 없으면 병합하지 않습니다.
+
+    Args:
+        symbols: 병합 전 symbol 리스트 (예: ["h", "e", "l", "l", "o", "</w>"])
+        ranks: (symbol1, symbol2) -> rank 튜플 딕셔너리 (load_merges 결과)
+    """
+    symbols = list(symbols)
+    n = len(symbols)
+    prev = list(range(-1, n - 1))
+    next_ = list(range(1, n + 1))
+    next_[-1] = -1
+    heap = []
+    for i in range(n - 1):
+        rank = _next_merge_rank(ranks, (symbols[i], symbols[i + 1]), -1)
+        if rank is not None:
+            heap.append((rank, i, symbols[i], symbols[i + 1]))
+    heapq.heapify(heap)
+
+    while heap:
+        rank, i, first, second = heapq.heappop(heap)
+        j = next_[i]
+        # 이미 병합되어 바뀐 위치의 오래된 항목은 건너뜁니다.
+        if j < 0 or symbols[i] != first or symbols[j] != second:
+            continue
+        merged = first + second
+        symbols[i] = merged
+        symbols[j] = None
+        k = next_[j]
+        next_[i] = k
+        if k >= 0:
+            prev[k] = i
+            next_rank = _next_merge_rank(ranks, (merged, symbols[k]), rank)
+            if next_rank is not None:
+                heapq.heappush(heap, (next_rank, i, merged, symbols[k]))
+        h = prev[i]
+        if h >= 0:
+            prev_rank = _next_merge_rank(ranks, (symbols[h], merged), rank)
+            if prev_rank is not None:
+                heapq.heappush(heap, (prev_rank, h, symbols[h], merged))
+
+    output = []
+    i = 0 if n else -1
+    while i >= 0:
+        output.append(symbols[i])
+        i = next_[i]
+    return output
+
+
+class LRUCache:
+    """
+    용량이 제한된 thread-safe LRU 캐시입니다.
+    hits/misses/evictions 카운터를 실행 중에 읽을 수 있습니다.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError(f"Cache capacity must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+            if len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def line_aligned_ranges(path, chunk_bytes):
+    """
+    파일을 대략 chunk_bytes 크기의 (start, end) 바이트 구간으로 나눕니다.
+    각 구간은 줄 경계에서 끝나므로 한 줄이 두 구간에 걸치지 않습니다.
+    """
+    if chunk_bytes <= 0:
+        raise ValueError(f"chunk_bytes must be positive, got {chunk_bytes}.")
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            yield start, end
+            start = end
+
+
 def whitespace_tokenize(text):
     text = text.strip()
     if not text:
@@ -51,4 +250,78 @@ def _is_punctuation(char):
     cat = unicodedata.category(char)
     if cat.startswith("P"):
         return True
-    return False
\ No newline at end of file
+    return False
+
+
+def _is_chinese_char(cp):
+    if ((cp >= 0x4E00 and cp <= 0x9FFF)  #
+            or (cp >= 0x3400 and cp <= 0x4DBF)  #
+            or (cp >= 0x20000 and cp <= 0x2A6DF)  #
+            or (cp >= 0x2A700 and cp <= 0x2B73F)  #
+            or (cp >= 0x2B740 and cp <= 0x2B81F)  #
+            or (cp >= 0x2B820 and cp <= 0x2CEAF)  #
+            or (cp >= 0xF900 and cp <= 0xFAFF)  #
+            or (cp >= 0x2F800 and cp <= 0x2FA1F)  #
+        ):
+        return True
+
+    return False
+
+
+def _compute_char_flags(cp):
+    char = chr(cp)
+    flags = 0
+    if _is_whitespace(char):
+        flags |= _WHITESPACE
+    if cp == 0 or cp == 0xFFFD or _is_control(char):
+        flags |= _STRIPPED
+    if _is_punctuation(char):
+        flags |= _PUNCTUATION
+    if _is_chinese_char(cp):
+        flags |= _CHINESE
+    if unicodedata.category(char) == "Mn":
+        flags |= _NONSPACING_MARK
+    return flags
+
+
+def _get_char_flags_table():
+    """BMP 문자 분류 테이블을 처음 필요할 때 한 번 만들어 재사용합니다."""
+    global _char_flags_table
+    if _char_flags_table is None:
+        _char_flags_table = bytearray([_compute_char_flags(cp) for cp in range(_BMP_SIZE)])
+    return _char_flags_table
+
+
+def _char_flags(cp):
+    """BMP 문자는 테이블에서, 그 외(astral plane) 문자는 직접 분류합니다."""
+    if cp < _BMP_SIZE:
+        return _get_char_flags_table()[cp]
+    return _compute_char_flags(cp)
+
+
+def _get_clean_translation():
+    """_clean_text용 str.translate 테이블: 제거할 문자는 None, 공백 문자는 " "로 매핑합니다."""
+    global _clean_translation
+    if _clean_translation is None:
+        table = _get_char_flags_table()
+        translation = {}
+        for cp in range(_BMP_SIZE):
+            if table[cp] & _STRIPPED:
+                translation[cp] = None
+            elif table[cp] & _WHITESPACE:
+                translation[cp] = " "
+        _clean_translation = translation
+    return _clean_translation
+
+
+def _get_accent_translation():
+    """_run_strip_accents용 str.translate 테이블: BMP의 Mn 문자를 제거합니다."""
+    global _accent_translation
+    if _accent_translation is None:
+        table = _get_char_flags_table()
+        _accent_translation = {cp: None for cp in range(_BMP_SIZE) if table[cp] & _NONSPACING_MARK}
+    return _accent_translation
+
+
+def _has_astral_chars(text):
+    return _ASTRAL_RE.search(text) is not None
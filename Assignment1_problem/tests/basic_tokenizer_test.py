@@ -0,0 +1,50 @@
+import unittest
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer.BasicTokenizer import BasicTokenizer
+
+
+class TestBasicTokenizer(unittest.TestCase):
+
+    def setUp(self):
+        self._tokenizer = BasicTokenizer()
+
+    def test_ascii_sentence(self):
+        s = "I'm saying 'running'\tthis\x00 morning!\r\nHugging-Face"
+        self.assertEqual(
+            self._tokenizer.tokenize(s),
+            ["i", "'", "m", "saying", "'", "running", "'", "this", "morning", "!", "hugging", "-", "face"])
+
+    def test_mask_tokens(self):
+        self.assertEqual(
+            self._tokenizer.tokenize("hello [MASK]! [mask]s [Mas"),
+            ["hello", "[MASK]", "!", "[MASK]", "s", "[", "mas"])
+
+    def test_accents_and_chinese(self):
+        self.assertEqual(
+            self._tokenizer.tokenize("Café NAÏVE 中文字 \U00020001x"),
+            ["cafe", "naive", "中", "文", "字", "\U00020001", "x"])
+
+    def test_controls_and_astral_marks(self):
+        self.assertEqual(
+            self._tokenizer.tokenize("a​b�c \U000E0001d \U0001D167e 'ok'"),
+            ["abc", "d", "e", "'", "ok", "'"])
+
+    def test_ascii_split_matches_general_path(self):
+        # 끝에 ASCII가 아닌 구두점을 붙이면 일반 경로를 타므로 두 결과를 비교할 수 있습니다.
+        for s in ["abc-def", "[MASK]x", "x[mAsK", "[mas", "a,b.c!", "a b"]:
+            self.assertEqual(self._tokenizer._run_split_on_punc(s) + ["«"],
+                             self._tokenizer._run_split_on_punc(s + "«"))
+
+    def test_iter_tokens_matches_tokenize(self):
+        for s in ["This is the Hugging Face!", "hello [MASK]! how are you?", "abc-와와 '와'와빅",
+                  "Café 中文字x \U00020001\U0001D167y\u2028z", "a\x00b\tc\u200bd"]:
+            self.assertEqual(list(self._tokenizer.iter_tokens(s)), self._tokenizer.tokenize(s))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.tokenizer_bench import compare, percentile
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 21))
+        # n=20에서 p95는 19번째, p50은 10번째 값입니다.
+        self.assertEqual(percentile(values, 95), 19)
+        self.assertEqual(percentile(values, 50), 10)
+        self.assertEqual(percentile(values, 100), 20)
+        self.assertEqual(percentile(values, 0), 1)
+
+    def test_empty(self):
+        self.assertEqual(percentile([], 95), 0.0)
+
+
+class TestCompare(unittest.TestCase):
+
+    @staticmethod
+    def report(tokens_per_s, spread):
+        return {"meta": {"vocab_sha256": "x"},
+                "results": {"corpus/full": {"latency_median_us": 1e6 / tokens_per_s, "tokens_per_s": tokens_per_s,
+                                            "run_time_spread": spread}}}
+
+    def test_noise_band(self):
+        # 두 측정의 spread 합(0.4) 안의 차이는 회귀로 보지 않습니다.
+        self.assertEqual(compare(self.report(80, 0.2), self.report(100, 0.2), 0.1), [])
+        self.assertEqual(len(compare(self.report(50, 0.2), self.report(100, 0.2), 0.1)), 1)
+        # spread가 작으면 threshold가 기준입니다.
+        self.assertEqual(len(compare(self.report(85, 0.0), self.report(100, 0.0), 0.1)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import threading
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer.utils import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_counters_and_eviction(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", ("a",))
+        cache.put("b", ("b",))
+        self.assertEqual(cache.get("a"), ("a",))
+        # "b"가 가장 오래 사용되지 않았으므로 제거됩니다.
+        cache.put("c", ("c",))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ("a",))
+        self.assertEqual(cache.stats(), {"size": 2, "capacity": 2, "hits": 2, "misses": 2, "evictions": 1})
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+    def test_concurrent_access(self):
+        cache = LRUCache(16)
+
+        def worker(offset):
+            for i in range(2000):
+                key = (i + offset) % 32
+                if cache.get(key) is None:
+                    cache.put(key, (key,))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(len(cache), 16)
+        self.assertEqual(cache.hits + cache.misses, 8 * 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
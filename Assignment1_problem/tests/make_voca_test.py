@@ -0,0 +1,157 @@
+import math
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer import MergeTokenizer, make_voca
+from src.word_piece_tokenizer.make_voca import (
+    compute_likelihood_score,
+    count_words,
+    get_corpus,
+    get_initial_vocab,
+    get_pair_stats,
+    get_word_counts,
+    learn_wordpiece_vocab,
+    load_trainer_state,
+    merge_vocab,
+    prune_word_counts,
+    reservoir_sample_lines,
+    save_merges,
+    save_vocab,
+)
+
+TESTS_TXT = str(Path(__file__).resolve().parent / "tests.txt")
+
+
+class TestMakeVoca(unittest.TestCase):
+
+    def test_naive_helpers(self):
+        vocab = {"a b a b </w>": 2, "b a </w>": 1}
+        self.assertEqual(dict(get_pair_stats(vocab)),
+                         {("a", "b"): 4, ("b", "a"): 3, ("b", "</w>"): 2, ("a", "</w>"): 1})
+        self.assertEqual(merge_vocab(("a", "b"), vocab), {"ab ab </w>": 2, "b a </w>": 1})
+        score = compute_likelihood_score(("a", "b"), 4, {"a": 5, "b": 5}, 13)
+        self.assertAlmostEqual(score, 4 * math.log(4 / (5 * 5 / 13)))
+
+    def test_incremental_matches_naive(self):
+        for num_merges, target_vocab_size in ((400, 10 ** 6), (1000, 150)):
+            expected = learn_wordpiece_vocab(TESTS_TXT, num_merges, target_vocab_size, incremental=False)
+            result = learn_wordpiece_vocab(TESTS_TXT, num_merges, target_vocab_size)
+            self.assertEqual(result[1], expected[1])
+            self.assertEqual(result[0], expected[0])
+
+    @unittest.skipIf(make_voca.np is None, "numpy is not installed")
+    def test_vectorized_scoring_matches_heap(self):
+        expected = learn_wordpiece_vocab(TESTS_TXT, 600, 10 ** 6, num_workers=1)
+        result = learn_wordpiece_vocab(TESTS_TXT, 600, 10 ** 6, num_workers=1, scoring="vectorized")
+        self.assertEqual(result, expected)
+
+    def test_parallel_word_counts(self):
+        expected = get_word_counts(get_corpus(TESTS_TXT))
+        self.assertEqual(count_words(TESTS_TXT, num_workers=2, chunk_bytes=512), expected)
+        pattern = str(Path(TESTS_TXT).parent / "tests.tx?")
+        self.assertEqual(count_words([pattern, TESTS_TXT], num_workers=1, chunk_bytes=100),
+                         expected + expected)
+
+    def test_pruning_and_sampling(self):
+        word_counts = {"a": 5, "b": 1, "c": 3, "d": 3}
+        self.assertEqual(prune_word_counts(word_counts, min_frequency=2), {"a": 5, "c": 3, "d": 3})
+        self.assertEqual(prune_word_counts(word_counts, max_words=2), {"a": 5, "c": 3})
+        sample = reservoir_sample_lines(TESTS_TXT, 10, seed=1)
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(sample, reservoir_sample_lines(TESTS_TXT, 10, seed=1))
+        full = count_words(TESTS_TXT, num_workers=1)
+        sampled = count_words(TESTS_TXT, num_workers=2, chunk_bytes=512, sample_rate=0.5, seed=3)
+        self.assertEqual(sampled, count_words(TESTS_TXT, num_workers=1, chunk_bytes=512, sample_rate=0.5, seed=3))
+        self.assertLess(sum(sampled.values()), sum(full.values()))
+        vocab_set, merges = learn_wordpiece_vocab(TESTS_TXT, 200, 10 ** 6, num_workers=1, min_frequency=2)
+        self.assertTrue(merges)
+
+    def test_merge_tokenizer_replays_training_merges(self):
+        vocab = get_initial_vocab(get_corpus(TESTS_TXT))
+        vocab_set, merges = learn_wordpiece_vocab(TESTS_TXT, 300, 10 ** 6, num_workers=1)
+        for pair in merges:
+            vocab = merge_vocab(pair, vocab)
+        with tempfile.TemporaryDirectory() as directory:
+            vocab_file = os.path.join(directory, "vocab.txt")
+            save_vocab(vocab_set, vocab_file)
+            save_merges(merges, os.path.join(directory, "merges.txt"))
+            tokenizer = MergeTokenizer(vocab_file=vocab_file)
+        for token_seq in vocab:
+            word = token_seq.replace(" ", "")[:-len("</w>")]
+            self.assertEqual(tokenizer.merge_word(word), token_seq.split())
+        self.assertEqual(tokenizer.tokenize("the"), ["[CLS]", "the", "[SEP]"])
+
+    def test_merge_tokenizer_with_make_voca_vocab_has_no_unk(self):
+        # make_voca가 저장한 vocab에는 "##" 토큰이 없으므로 이어지는 조각도 그대로 찾아야 합니다.
+        vocab_set, merges = learn_wordpiece_vocab(TESTS_TXT, 300, 10 ** 6, num_workers=1)
+        with tempfile.TemporaryDirectory() as directory:
+            vocab_file = os.path.join(directory, "vocab.txt")
+            save_vocab(vocab_set, vocab_file)
+            save_merges(merges, os.path.join(directory, "merges.txt"))
+            tokenizer = MergeTokenizer(vocab_file=vocab_file)
+        words = set(count_words([TESTS_TXT], num_workers=1))
+        segmented = [tokenizer._segment_word(word) for word in words]
+        self.assertTrue(any(len(tokens) > 1 for _, tokens in segmented))
+        for ids, tokens in segmented:
+            self.assertNotIn("[UNK]", tokens)
+            self.assertNotIn(tokenizer.unk_token_id, ids)
+
+    def test_merge_tokenizer_replays_repeated_merge(self):
+        # ("x", "ab")는 "ab"가 생기기 전에 한 번, 생긴 뒤에 다시 학습된 pair입니다. 두 rank 모두 적용해야 합니다.
+        merges = [("x", "ab"), ("a", "b"), ("x", "ab")]
+        vocab = {"x a b </w>": 1}
+        for pair in merges:
+            vocab = merge_vocab(pair, vocab)
+        with tempfile.TemporaryDirectory() as directory:
+            vocab_file = os.path.join(directory, "vocab.txt")
+            save_vocab({"x", "ab", "xab"}, vocab_file)
+            save_merges(merges, os.path.join(directory, "merges.txt"))
+            tokenizer = MergeTokenizer(vocab_file=vocab_file)
+        self.assertEqual(tokenizer.merge_ranks[("x", "ab")], (0, 2))
+        self.assertEqual(tokenizer.merge_word("xab"), list(vocab)[0].split())
+        self.assertEqual(tokenizer.tokenize("xab"), ["[CLS]", "xab", "[SEP]"])
+
+    def test_merge_tokenizer_tokenize_matches_encode(self):
+        with tempfile.TemporaryDirectory() as directory:
+            vocab_file = os.path.join(directory, "vocab.txt")
+            # "c"는 단어 앞 형태로만 있으므로 "##c"는 [UNK]가 되어야 합니다.
+            save_vocab({"ab", "c", "##d"}, vocab_file)
+            save_merges([("a", "b")], os.path.join(directory, "merges.txt"))
+            tokenizer = MergeTokenizer(vocab_file=vocab_file)
+        text = "abd abc c x"
+        tokens = tokenizer.tokenize(text)
+        self.assertEqual(tokens, ["[CLS]", "ab", "##d", "ab", "[UNK]", "c", "[UNK]", "[SEP]"])
+        self.assertEqual([tokenizer.vocab[token] for token in tokens], list(tokenizer.encode(text)))
+
+    def test_resume_from_trainer_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = os.path.join(directory, "trainer_state.pkl")
+            _, base_merges = learn_wordpiece_vocab(TESTS_TXT, 200, 10 ** 6, num_workers=1, save_state=state_file)
+            # 새 파일 없이 이어서 학습하면 처음부터 더 많이 병합한 결과와 같습니다.
+            expected = learn_wordpiece_vocab(TESTS_TXT, 350, 10 ** 6, num_workers=1)
+            self.assertEqual(learn_wordpiece_vocab(None, 150, 10 ** 6, resume_from=state_file), expected)
+
+            delta_file = os.path.join(directory, "delta.txt")
+            with open(delta_file, "w", encoding="utf-8") as f:
+                f.write("tokenizers tokenize tokenized text\nthe zyzzyva zyzzyva\n")
+            vocab_set, merges = learn_wordpiece_vocab(delta_file, 100, 10 ** 6, num_workers=1,
+                                                      resume_from=state_file, save_state=state_file)
+            self.assertEqual(merges[:len(base_merges)], base_merges)
+            self.assertGreater(len(merges), len(base_merges))
+            state = load_trainer_state(state_file)
+        counts = dict(zip(state["words"], state["freqs"]))
+        expected_counts = count_words(TESTS_TXT, num_workers=1)
+        expected_counts.update({"tokenizers": 1, "tokenize": 1, "tokenized": 1, "text": 1, "zyzzyva": 2})
+        expected_counts["the"] += 1
+        self.assertEqual(counts, dict(expected_counts))
+        self.assertEqual(state["merges"], merges)
+
+
+if __name__ == '__main__':
+    unittest.main()
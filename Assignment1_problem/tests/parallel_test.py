@@ -0,0 +1,39 @@
+import unittest
+import os
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer.parallel import imap_batch
+
+
+class UpperTokenizer:
+    """worker 프로세스에서 다시 만들 수 있는 테스트용 토크나이저입니다."""
+
+    def __init__(self, suffix=""):
+        self.init_kwargs = {"suffix": suffix}
+        self.suffix = suffix
+
+    def tokenize(self, text):
+        return [text.upper() + self.suffix, os.getpid()]
+
+
+class TestImapBatch(unittest.TestCase):
+
+    def test_order_is_preserved_in_pool(self):
+        tokenizer = UpperTokenizer("!")
+        texts = (f"line {i}" for i in range(1000))
+        results = list(imap_batch(tokenizer, texts, num_workers=2, chunk_size=7, min_parallel_size=10))
+        self.assertEqual([token for token, _ in results], [f"LINE {i}!" for i in range(1000)])
+        self.assertNotIn(os.getpid(), {pid for _, pid in results})
+
+    def test_small_batch_runs_in_process(self):
+        tokenizer = UpperTokenizer()
+        results = list(imap_batch(tokenizer, ["a", "b"], num_workers=4, chunk_size=1, min_parallel_size=10))
+        self.assertEqual(results, [["A", os.getpid()], ["B", os.getpid()]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import os
+import tempfile
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer import FullTokenizer
+from src.word_piece_tokenizer.server import TokenizerClient, TokenizerServer
+
+VOCAB = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "un", "##aff", "##able", "hello", "!", "you"]
+
+
+class TestTokenizerServer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vocab_file = os.path.join(self._dir.name, "vocab.txt")
+        with open(self.vocab_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(VOCAB) + "\n")
+        self.tokenizer = FullTokenizer(vocab_file=self.vocab_file)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    async def test_micro_batched_requests(self):
+        texts = [f"Hello! unaffable {i}" for i in range(40)]
+        # 대기열을 작게 잡아 backpressure 상황에서도 모든 요청이 순서대로 돌아오는지 확인합니다.
+        async with TokenizerServer(self.tokenizer, num_workers=0, max_batch_size=8, max_pending=4) as server:
+            async with TokenizerClient(port=server.port, pool_size=3) as client:
+                results = await client.tokenize_many(texts)
+                self.assertEqual(results, [self.tokenizer.tokenize(text) for text in texts])
+                self.assertEqual(await client.encode("unaffable you"), [1, 4, 5, 6, 9, 2])
+                with self.assertRaises(RuntimeError):
+                    await client._request("decode", "you")
+
+    async def test_unix_socket_with_worker_processes(self):
+        path = os.path.join(self._dir.name, "tokenizer.sock")
+        async with TokenizerServer(self.tokenizer, path=path, num_workers=2) as server:
+            async with TokenizerClient(path=server.path) as client:
+                self.assertEqual(await client.tokenize("hello you"), ["[CLS]", "hello", "you", "[SEP]"])
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+from array import array
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer.shards import ShardReader, line_aligned_ranges, write_token_shards
+
+
+class OrdTokenizer:
+    """문자마다 코드 포인트를 id로 내보내는 테스트용 토크나이저입니다."""
+
+    def __init__(self):
+        self.init_kwargs = {}
+        self.vocab = {"a": 0, "max": 70000}
+
+    def encode(self, text):
+        return array("I", [ord(char) for char in text.strip()])
+
+
+class TestTokenShards(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "corpus.txt")
+        self.lines = [f"document {i} " + "x" * (i % 13) for i in range(300)] + ["", "와빅 짱"]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.lines) + "\n")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_ranges_are_line_aligned(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        ranges = list(line_aligned_ranges(self.path, 100))
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b"\n")
+
+    def test_round_trip(self):
+        out = os.path.join(self._dir.name, "shards")
+        meta = write_token_shards(self.path, out, OrdTokenizer(), num_workers=2, chunk_bytes=256, shard_tokens=500)
+        documents = [line for line in self.lines if line.strip()]
+        self.assertEqual(meta["dtype"], "uint32")
+        self.assertEqual(meta["num_documents"], len(documents))
+        self.assertGreater(len(meta["shards"]), 1)
+
+        with ShardReader(out) as reader:
+            self.assertEqual(len(reader), len(documents))
+            for document, ids in zip(documents, reader):
+                self.assertEqual(ids.tolist(), [ord(char) for char in document.strip()])
+                ids.release()
+            last = reader[-1]
+            self.assertEqual(last.tolist(), [ord(char) for char in "와빅 짱"])
+            last.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
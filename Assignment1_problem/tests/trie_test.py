@@ -0,0 +1,74 @@
+import unittest
+import random
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer.WordpieceTrie import WordpieceTrie
+
+
+def greedy_segment(word, vocab):
+    """기존 WordpieceTokenizer.tokenize의 단어 단위 Greedy Longest-Match-First 구현입니다."""
+    chars = list(word)
+    start = 0
+    sub_tokens = []
+    while start < len(chars):
+        end = len(chars)
+        cur_substr = None
+        while start < end:
+            substr = "".join(chars[start:end])
+            if start > 0:
+                substr = "##" + substr
+            if substr in vocab:
+                cur_substr = substr
+                break
+            end -= 1
+        if cur_substr is None:
+            return None
+        sub_tokens.append(vocab[cur_substr])
+        start = end
+    return sub_tokens
+
+
+class TestWordpieceTrie(unittest.TestCase):
+
+    def build(self, tokens):
+        vocab = {token: index for index, token in enumerate(tokens)}
+        return vocab, WordpieceTrie.from_vocab(vocab)
+
+    def test_unaffable(self):
+        vocab, trie = self.build(["[UNK]", "un", "##aff", "##able", "##a", "a"])
+        self.assertEqual(trie.segment("unaffable"), [vocab["un"], vocab["##aff"], vocab["##able"]])
+
+    def test_unknown_word(self):
+        vocab, trie = self.build(["un", "##aff"])
+        self.assertIsNone(trie.segment("unable"))
+        self.assertIsNone(trie.segment("x"))
+
+    def test_literal_suffix_indicator(self):
+        vocab, trie = self.build(["#", "##", "##a", "b"])
+        self.assertEqual(trie.segment("##a"), greedy_segment("##a", vocab))
+        self.assertEqual(trie.segment("##"), greedy_segment("##", vocab))
+        self.assertEqual(trie.segment("#b"), greedy_segment("#b", vocab))
+
+    def test_matches_greedy_on_random_words(self):
+        rng = random.Random(0)
+        alphabet = "abc#"
+        for _ in range(50):
+            tokens = set()
+            for _ in range(rng.randint(1, 25)):
+                token = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                tokens.add(token)
+                tokens.add("##" + token)
+            tokens = sorted(tokens)
+            rng.shuffle(tokens)
+            vocab, trie = self.build(tokens[: len(tokens) // 2 + 1])
+            for _ in range(50):
+                word = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+                self.assertEqual(trie.segment(word), greedy_segment(word, vocab), word)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.word_piece_tokenizer import FullTokenizer, WordpieceTokenizer
+from src.word_piece_tokenizer.compiled_vocab import default_compiled_path
+from src.word_piece_tokenizer.parallel import imap_batch
+from src.word_piece_tokenizer.shared_vocab import SharedVocab
+
+VOCAB = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "un", "##aff", "##able", "a", "##a", "hello", "##!", "!", "you", "bye"]
+
+
+class TestWordpieceTokenizer(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vocab_file = os.path.join(self._dir.name, "vocab.txt")
+        with open(self.vocab_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(VOCAB) + "\n")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_tokenize_and_encode(self):
+        for compiled in (False, True):
+            tokenizer = WordpieceTokenizer(vocab_file=self.vocab_file, compiled=compiled, cache_size=4)
+            self.assertEqual(tokenizer.tokenize("unaffable hello! xyz"),
+                             ["[CLS]", "un", "##aff", "##able", "hello", "##!", "[UNK]", "[SEP]"])
+            ids = tokenizer.encode("unaffable you")
+            self.assertEqual(list(ids), [1, 4, 5, 6, 12, 2])
+            self.assertEqual(tokenizer.decode(ids, skip_special_tokens=True), "unaffable you")
+
+    def test_encode_batch(self):
+        tokenizer = WordpieceTokenizer(vocab_file=self.vocab_file)
+        batch = tokenizer.encode_batch(["you", "unaffable bye"], max_length=5)
+        self.assertEqual(batch["input_ids"].tolist(), [[1, 12, 2, 3, 3], [1, 4, 5, 6, 2]])
+        self.assertEqual(batch["attention_mask"].tolist(), [[1, 1, 1, 0, 0], [1, 1, 1, 1, 1]])
+        with self.assertRaises(ValueError):
+            tokenizer.encode_batch(["unaffable bye"], max_length=4, truncation=False)
+
+    def test_compiled_vocab_is_rebuilt_when_stale(self):
+        tokenizer = WordpieceTokenizer(vocab_file=self.vocab_file, compiled=True)
+        self.assertTrue(os.path.isfile(default_compiled_path(self.vocab_file)))
+        self.assertNotIn("xyz", tokenizer.vocab)
+        with open(self.vocab_file, "a", encoding="utf-8") as f:
+            f.write("xyz\n")
+        tokenizer = WordpieceTokenizer(vocab_file=self.vocab_file, compiled=True)
+        self.assertEqual(tokenizer.vocab["xyz"], len(VOCAB))
+        self.assertEqual(tokenizer.tokenize("xyz"), ["[CLS]", "xyz", "[SEP]"])
+
+    def test_full_tokenizer(self):
+        tokenizer = FullTokenizer(vocab_file=self.vocab_file, compiled=True)
+        self.assertEqual(tokenizer.tokenize("Hello!  UNAFFABLE"),
+                         ["[CLS]", "hello", "!", "un", "##aff", "##able", "[SEP]"])
+
+    def test_profiling(self):
+        tokenizer = FullTokenizer(vocab_file=self.vocab_file)
+        with tokenizer.profile():
+            tokenizer.tokenize("Hello! unaffable xyz " + "a" * 120)
+            tokenizer.basic_tokenizer.tokenize("Héllo 中文")
+            stats = tokenizer.stats()
+        self.assertEqual(stats["segmented_words"], 5)
+        self.assertEqual(stats["unk_words"], 2)
+        self.assertEqual(stats["long_words"], 1)
+        self.assertEqual(stats["wordpieces"], 7)
+        self.assertEqual(stats["stages"]["basic_tokenize"]["calls"], 2)
+        self.assertEqual(stats["stages"]["clean_text"]["chars"], len("Héllo 中文"))
+        # 계측을 끄면 감싼 메서드가 모두 제거됩니다.
+        self.assertEqual(tokenizer.stats(), {})
+        self.assertNotIn("_segment_word", tokenizer.wordpiece_tokenizer.__dict__)
+        self.assertNotIn("_clean_text", tokenizer.basic_tokenizer.__dict__)
+
+    def test_shared_vocab(self):
+        texts = [f"unaffable hello! you {i}" for i in range(20)]
+        expected = [WordpieceTokenizer(vocab_file=self.vocab_file).tokenize(text) for text in texts]
+        with SharedVocab(self.vocab_file) as shared:
+            tokenizer = WordpieceTokenizer(shared_vocab=shared.name)
+            self.assertEqual([tokenizer.tokenize(text) for text in texts], expected)
+            self.assertEqual(tokenizer.init_kwargs["shared_vocab"], shared.name)
+            with self.assertRaises(TypeError):
+                tokenizer.trie.pops[0] = 1
+            results = imap_batch(tokenizer, texts, num_workers=2, chunk_size=3, min_parallel_size=1)
+            self.assertEqual(list(results), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+배치 단위 generate(evaluate_batches 방식)와 continuous batching(evaluate_continuous 방식)의 처리량을 CPU에서 비교합니다.
+
+CommonsenseQA 예제에 few-shot 프롬프트를 붙여 작은 causal LM으로 greedy 생성하고,
+두 방식의 초당 예제 수와 출력 일치율을 출력합니다. 두 방식 모두 답변이 끝나면 그 행의 생성을 멈춥니다.
+
+사용법:
+    python benchmark_generation.py --model_name HuggingFaceTB/SmolLM2-135M --num_examples 64 --batch_size 8
+"""
+import argparse
+import json
+import time
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteriaList
+
+from continuous_batching import ContinuousBatchGenerator
+from device_inference import AnswerCompletionCriteria, is_answer_complete
+from utils import format_prompt
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_name", type=str, default="HuggingFaceTB/SmolLM2-135M", help="Small causal LM")
+    parser.add_argument("--task", type=str, default="cqa", help="Which few-shot prompt to use")
+    parser.add_argument("--num_examples", type=int, default=64)
+    parser.add_argument("--batch_size", type=int, default=8, help="Static batch size and number of continuous slots")
+    parser.add_argument("--gen_length", type=int, default=128)
+    parser.add_argument("--n_shot", type=int, default=2, help="Number of few-shot examples in the prompt")
+    parser.add_argument("--num_threads", type=int, default=None)
+    return parser.parse_args()
+
+
+def load_prompts(tok, task, n_shot, num_examples):
+    with open(f"./n_shot_prompts/{task}.json", "r") as fp:
+        base_data = json.load(fp)
+    prompt_text = "\n".join(item["prompt"] for item in base_data["n_shot_prompts"][:n_shot])
+    prompts = []
+    with open("CommonsenseQA/train_rand_split.jsonl", "r") as fp:
+        for line in fp:
+            record = json.loads(line)
+            prompts.append(tok(format_prompt(prompt_text, record["question"], record["answerKey"]))["input_ids"])
+            if len(prompts) == num_examples:
+                break
+    return prompts
+
+
+def run_static(model, tok, prompts, batch_size, gen_length):
+    predictions = []
+    for start in range(0, len(prompts), batch_size):
+        batch = tok.pad({"input_ids": prompts[start : start + batch_size]}, padding="longest", return_tensors="pt")
+        prompt_length = batch["input_ids"].size(1)
+        outputs = model.generate(
+            **batch,
+            max_length=prompt_length + gen_length,
+            pad_token_id=tok.eos_token_id,
+            do_sample=False,
+            stopping_criteria=StoppingCriteriaList([AnswerCompletionCriteria(tok, prompt_length)]),
+        )
+        predictions.extend(tok.batch_decode(outputs[:, prompt_length:], skip_special_tokens=True))
+    return predictions
+
+
+def run_continuous(model, tok, prompts, batch_size, gen_length):
+    engine = ContinuousBatchGenerator(
+        model, tok, num_slots=batch_size, max_new_tokens=gen_length, device="cpu", stop_fn=is_answer_complete
+    )
+    predictions = [None] * len(prompts)
+    for idx, prediction, _ in engine.generate(enumerate(prompts)):
+        predictions[idx] = prediction
+    return predictions, engine.stats
+
+
+if __name__ == "__main__":
+    args = get_arguments()
+    if args.num_threads:
+        torch.set_num_threads(args.num_threads)
+    tok = AutoTokenizer.from_pretrained(args.model_name)
+    if tok.pad_token is None:
+        tok.pad_token = tok.eos_token
+    tok.padding_side = "left"
+    model = AutoModelForCausalLM.from_pretrained(args.model_name).eval()
+    prompts = load_prompts(tok, args.task, args.n_shot, args.num_examples)
+
+    with torch.no_grad():
+        start = time.perf_counter()
+        static_predictions = run_static(model, tok, prompts, args.batch_size, args.gen_length)
+        static_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        continuous_predictions, stats = run_continuous(model, tok, prompts, args.batch_size, args.gen_length)
+        continuous_time = time.perf_counter() - start
+
+    same = sum(a.strip() == b.strip() for a, b in zip(static_predictions, continuous_predictions))
+    print(f"static:     {len(prompts) / static_time:.2f} examples/s ({static_time:.1f}s)")
+    print(f"continuous: {len(prompts) / continuous_time:.2f} examples/s ({continuous_time:.1f}s) {stats}")
+    print(f"speedup:    {static_time / continuous_time:.2f}x, identical outputs: {same}/{len(prompts)}")
@@ -0,0 +1,249 @@
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+from transformers import DynamicCache
+
+
+# ------------------------- KV 캐시 관련 함수 -------------------------
+
+def cache_to_layers(past_key_values):
+    """
+    모델이 반환한 캐시를 레이어별 (key, value) 리스트로 바꿉니다. key, value는 (batch, head, 길이, dim) 텐서입니다.
+    """
+    if hasattr(past_key_values, "layers"):
+        return [(layer.keys, layer.values) for layer in past_key_values.layers]
+    if hasattr(past_key_values, "to_legacy_cache"):
+        past_key_values = past_key_values.to_legacy_cache()
+    return [(key, value) for key, value in past_key_values]
+
+def layers_to_cache(layers):
+    """
+    레이어별 (key, value) 리스트로 모델에 넣을 DynamicCache를 만듭니다.
+    """
+    cache = DynamicCache()
+    for layer_idx, (key, value) in enumerate(layers):
+        cache.update(key, value, layer_idx)
+    return cache
+
+def left_pad_layers(layers, attention_mask, length):
+    """
+    캐시와 attention_mask의 길이 축 왼쪽을 채워 length로 맞춥니다. 채운 위치는 attention_mask가 0입니다.
+    """
+    pad = length - attention_mask.size(1)
+    if pad <= 0:
+        return layers, attention_mask
+    layers = [(F.pad(key, (0, 0, pad, 0)), F.pad(value, (0, 0, pad, 0))) for key, value in layers]
+    return layers, F.pad(attention_mask, (pad, 0))
+
+def select_next_tokens(logits, do_sample=False, top_p=0.9, temperature=1.0):
+    """
+    마지막 위치의 logits로 다음 토큰을 고릅니다. do_sample이면 top-p sampling, 아니면 greedy입니다.
+    """
+    if not do_sample:
+        return logits.argmax(dim=-1)
+    probs = torch.softmax(logits.float() / temperature, dim=-1)
+    sorted_probs, sorted_indices = probs.sort(dim=-1, descending=True)
+    # 누적 확률이 top_p를 넘기 전까지의 토큰만 남깁니다 (가장 확률이 높은 토큰은 항상 남음).
+    sorted_probs[(sorted_probs.cumsum(dim=-1) - sorted_probs) > top_p] = 0
+    choice = torch.multinomial(sorted_probs, 1)
+    return sorted_indices.gather(-1, choice).squeeze(-1)
+
+
+# ------------------------- Continuous batching -------------------------
+
+class ContinuousBatchGenerator:
+    """
+    고정된 수의 slot으로 생성을 진행하면서, 끝난 시퀀스는 바로 내보내고 빈 slot에 새 프롬프트를 넣는 생성 엔진입니다.
+
+    활성 시퀀스들의 KV 캐시는 하나의 배치 캐시로 유지합니다. 각 행은 길이 축 오른쪽에 정렬되고 왼쪽 빈 곳은
+    attention_mask가 0입니다. 새 프롬프트는 따로 prefill한 뒤 길이를 맞춰 배치에 붙이고, 끝난 행은 배치에서 빼며,
+    모든 행이 쓰지 않는 왼쪽 열은 잘라 냅니다. position id는 행마다 attention_mask로 센 실제 토큰 수를 씁니다.
+
+    FSDP로 감싼 모델은 forward마다 rank 간 all-gather를 하므로 모든 rank가 같은 횟수로 forward를 호출해야 합니다.
+    여러 rank에서 돌 때는 매 step prefill/decode 여부를 all-reduce로 맞추고, 할 일이 없는 rank는 한 토큰짜리
+    더미 forward를 호출해 모든 rank의 생성이 끝날 때까지 보조를 맞춥니다 (generate의 synced_gpus와 같은 방식).
+    """
+    def __init__(self, model, tok, num_slots, max_new_tokens, device, stop_fn=None, do_sample=False, top_p=0.9,
+                 temperature=1.0, prefill_inputs_fn=None, window=48, synced=None):
+        """
+        Args:
+            model: forward를 호출할 causal LM. FSDP로 감싼 모델이면 synced로 rank 간 forward 횟수를 맞춥니다.
+            num_slots: 동시에 생성하는 시퀀스 수
+            max_new_tokens: 시퀀스마다 생성할 최대 토큰 수
+            stop_fn: 생성한 텍스트의 마지막 window 토큰을 받아 True면 그 시퀀스를 끝내는 함수
+            prefill_inputs_fn: (input_ids, attention_mask)를 받아 past_key_values가 포함된 prefill 입력을 돌려주는 함수.
+                None을 돌려주면 캐시 없이 prefill합니다. few-shot prefix 캐시를 재사용할 때 씁니다.
+            window: stop_fn에 넘길 마지막 토큰 수
+            synced: True면 매 step rank 간에 할 일을 all-reduce로 맞춥니다. None이면 분산 환경이 초기화되어 있고
+                world size가 1보다 클 때 켭니다.
+        """
+        self.model = model
+        self.tok = tok
+        self.num_slots = num_slots
+        self.max_new_tokens = max_new_tokens
+        self.device = device
+        self.stop_fn = stop_fn
+        self.do_sample = do_sample
+        self.top_p = top_p
+        self.temperature = temperature
+        self.prefill_inputs_fn = prefill_inputs_fn
+        self.window = window
+        if synced is None:
+            synced = dist.is_available() and dist.is_initialized() and dist.get_world_size() > 1
+        self.synced = synced
+        self.stats = {"prefills": 0, "decode_steps": 0, "dummy_forwards": 0, "generated_tokens": 0}
+
+    def _sync_flags(self, *flags):
+        """
+        flags를 모든 rank에 대해 OR한 값을 반환합니다. synced가 아니면 그대로 반환합니다.
+        """
+        if not self.synced:
+            return [bool(flag) for flag in flags]
+        flags = torch.tensor([int(flag) for flag in flags], device=self.device)
+        dist.all_reduce(flags, op=dist.ReduceOp.MAX)
+        return [bool(flag) for flag in flags.tolist()]
+
+    def _dummy_forward(self):
+        """
+        다른 rank가 forward를 하는 동안 collective 횟수를 맞추기 위해 한 토큰짜리 입력으로 forward만 호출합니다.
+        """
+        input_ids = torch.full((1, 1), self.tok.pad_token_id, device=self.device)
+        self.model(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), use_cache=False)
+        self.stats["dummy_forwards"] += 1
+
+    def _prefill(self, prompts):
+        """
+        새 프롬프트들을 left padding으로 묶어 prefill하고 (캐시, attention_mask, 첫 토큰)을 반환합니다.
+        """
+        longest = max(len(ids) for ids in prompts)
+        pad_id = self.tok.pad_token_id
+        input_ids = torch.tensor([[pad_id] * (longest - len(ids)) + list(ids) for ids in prompts], device=self.device)
+        attention_mask = torch.tensor(
+            [[0] * (longest - len(ids)) + [1] * len(ids) for ids in prompts], device=self.device
+        )
+
+        inputs = None
+        if self.prefill_inputs_fn is not None:
+            inputs = self.prefill_inputs_fn(input_ids, attention_mask)
+        if inputs is None:
+            inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        past_key_values = inputs.get("past_key_values")
+        past_length = past_key_values.get_seq_length() if past_key_values is not None else 0
+        attention_mask = inputs["attention_mask"]
+        position_ids = (attention_mask.long().cumsum(dim=-1) - 1).clamp(min=0)
+
+        outputs = self.model(
+            input_ids=inputs["input_ids"][:, past_length:],
+            attention_mask=attention_mask,
+            position_ids=position_ids[:, past_length:],
+            past_key_values=past_key_values,
+            use_cache=True,
+        )
+        self.stats["prefills"] += 1
+        next_tokens = select_next_tokens(outputs.logits[:, -1], self.do_sample, self.top_p, self.temperature)
+        return outputs.past_key_values, attention_mask, next_tokens
+
+    def _is_finished(self, tokens):
+        return tokens[-1] == self.tok.eos_token_id or len(tokens) >= self.max_new_tokens
+
+    def generate(self, examples):
+        """
+        examples를 생성이 끝나는 순서대로 내보냅니다.
+
+        Args:
+            examples: (key, 프롬프트 토큰 id 리스트) 쌍의 iterable. padding 없이 실제 토큰만 넣습니다.
+
+        Yields:
+            (key, 생성한 텍스트, 생성한 토큰 수)
+        """
+        examples = iter(examples)
+        exhausted = False
+        keys, generated = [], []
+        # 배치가 바뀔 때만 캐시를 레이어 텐서로 풀어 고치고, decode step 사이에는 모델이 돌려준 캐시를 그대로 씁니다.
+        past, attention_mask, next_tokens = None, None, None
+
+        while True:
+            # 빈 slot에 새 프롬프트를 넣습니다.
+            admitted = []
+            while not exhausted and len(keys) + len(admitted) < self.num_slots:
+                try:
+                    admitted.append(next(examples))
+                except StopIteration:
+                    exhausted = True
+            # 어느 rank든 할 일이 남아 있으면 모든 rank가 같은 횟수로 forward를 호출합니다.
+            any_prefill, any_work = self._sync_flags(bool(admitted), bool(keys or admitted))
+            if not any_work:
+                return
+            if admitted:
+                new_past, new_mask, new_tokens = self._prefill([ids for _, ids in admitted])
+                keys.extend(key for key, _ in admitted)
+                generated.extend([token] for token in new_tokens.tolist())
+                if past is None:
+                    past, attention_mask, next_tokens = new_past, new_mask, new_tokens
+                else:
+                    length = max(attention_mask.size(1), new_mask.size(1))
+                    layers, attention_mask = left_pad_layers(cache_to_layers(past), attention_mask, length)
+                    new_layers, new_mask = left_pad_layers(cache_to_layers(new_past), new_mask, length)
+                    layers = [
+                        (torch.cat([key, new_key]), torch.cat([value, new_value]))
+                        for (key, value), (new_key, new_value) in zip(layers, new_layers)
+                    ]
+                    past = layers_to_cache(layers)
+                    attention_mask = torch.cat([attention_mask, new_mask])
+                    next_tokens = torch.cat([next_tokens, new_tokens])
+            elif any_prefill:
+                self._dummy_forward()
+
+            # 끝난 시퀀스를 내보내고 배치에서 뺍니다.
+            finished = [row for row, tokens in enumerate(generated) if self._is_finished(tokens)]
+            if self.stop_fn is not None and keys:
+                finished_rows = set(finished)
+                candidates = [row for row in range(len(keys)) if row not in finished_rows]
+                texts = self.tok.batch_decode([generated[row][-self.window:] for row in candidates], skip_special_tokens=True)
+                finished.extend(row for row, text in zip(candidates, texts) if self.stop_fn(text))
+            if finished:
+                finished = set(finished)
+                for row in sorted(finished):
+                    self.stats["generated_tokens"] += len(generated[row])
+                    yield keys[row], self.tok.decode(generated[row], skip_special_tokens=True), len(generated[row])
+                keep = [row for row in range(len(keys)) if row not in finished]
+                keys = [keys[row] for row in keep]
+                generated = [generated[row] for row in keep]
+                if not keys:
+                    past, attention_mask, next_tokens = None, None, None
+                else:
+                    keep_index = torch.tensor(keep, device=attention_mask.device)
+                    layers = [
+                        (key.index_select(0, keep_index), value.index_select(0, keep_index))
+                        for key, value in cache_to_layers(past)
+                    ]
+                    attention_mask = attention_mask.index_select(0, keep_index)
+                    next_tokens = next_tokens.index_select(0, keep_index)
+                    # 남은 행이 모두 쓰지 않는 왼쪽 열은 잘라 냅니다.
+                    start = int(attention_mask.any(dim=0).int().argmax())
+                    if start > 0:
+                        layers = [(key[:, :, start:], value[:, :, start:]) for key, value in layers]
+                        attention_mask = attention_mask[:, start:]
+                    past = layers_to_cache(layers)
+
+            # 모든 활성 시퀀스를 한 토큰씩 진행합니다. 빈 slot이 생겼으면 decode 전에 새 프롬프트를 먼저 넣습니다.
+            decode = bool(keys) and (exhausted or not finished)
+            (any_decode,) = self._sync_flags(decode)
+            if not decode:
+                if any_decode:
+                    self._dummy_forward()
+                continue
+            position_ids = attention_mask.long().sum(dim=1, keepdim=True)
+            attention_mask = torch.cat([attention_mask, attention_mask.new_ones((attention_mask.size(0), 1))], dim=1)
+            outputs = self.model(
+                input_ids=next_tokens[:, None],
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=past,
+                use_cache=True,
+            )
+            self.stats["decode_steps"] += 1
+            past = outputs.past_key_values
+            next_tokens = select_next_tokens(outputs.logits[:, -1], self.do_sample, self.top_p, self.temperature)
+            for tokens, token in zip(generated, next_tokens.tolist()):
+                tokens.append(token)
@@ -7,9 +7,11 @@ from tqdm import tqdm
 import os
 import torch.distributed as dist
 import re
-from itertools import chain
 from torch.distributed.fsdp import FullyShardedDataParallel as FSDP
 import torch.multiprocessing as mp
+import time
+from transformers import DynamicCache, StoppingCriteria, StoppingCriteriaList
+from continuous_batching import ContinuousBatchGenerator, cache_to_layers
 from utils import (
     load_model_and_tokenizer,
     create_incorrect_loader,
@@ -18,6 +20,10 @@ from utils import (
     cleanup_distributed,
     save_log_arguments,
     warn_truncation,
+    get_file_logger,
+    padding_ratio,
+    format_prompt,
+    tokenize_with_lengths,
 )
 
 pp = pprint.PrettyPrinter(indent=2).pprint
@@ -47,90 +53,278 @@ def write_output_example(config, out_path, prediction, record, eos_token):
     return formatted_example
 
 
-# 예측 결과를 평가하는 함수 (정답, 오답 처리)
-def compute_metric(config, preds, dataset, out_path, tok, show_hint):
-    incorrect_items = []
-    correct_count, total_count = 0, 0
-    try:
-        for idx, (pred_item, record) in enumerate(zip(preds, dataset), 1):
-            try:
-                is_correct = False
-                correct_answer = record.get("answer")
-                if correct_answer is None:
-                    print(f"Warning: Missing answer for index {idx}")
-                    continue
-
-                marker_index = pred_item.find("Q: ")
-                if marker_index != -1:
-                    pred_item = pred_item[:marker_index]
-
-                if "####" in pred_item:
-                    parts = pred_item.split("####")
-                    if len(parts) > 1 and len(parts[1].split()) > 0:
-                        pred_item = parts[0] + "#### " + parts[1].split()[0]
-                    else:
-                        pred_item = parts[0] + "#### "
-
-                extracted_ans = None
-                try:
-                    matches = list(re.finditer(r"\b(A|B|C|D|E)\b", pred_item))
-                    extracted_ans = matches[-1].group(1) if matches else None
-                except IndexError as exc:
-                    print(f"Warning: Failed to extract answer from prediction at index {idx}: {exc}")
-                    continue
-
-                if extracted_ans and extracted_ans == correct_answer:
-                    is_correct = True
-
-                if is_correct:
-                    correct_count += 1
-                    try:
-                        write_output_example(config, out_path + "/correct_data.txt", pred_item, record, tok.eos_token)
-                    except Exception as exc:
-                        print(f"Warning: Failed to write output example at index {idx}: {exc}")
-                else:
-                    if not show_hint:
-                        incorrect_items.append(record)
-                total_count += 1
+# 예측 하나를 채점하는 함수
+def score_prediction(pred_item, record):
+    """
+    예측에서 다음 질문 이후를 버리고 마지막 선택지(A-E)를 정답과 비교합니다.
 
-            except Exception as inner_exc:
-                print(f"Warning: Error processing prediction at index {idx}: {inner_exc}")
-                continue
+    Returns:
+        (정답 여부, 정리한 예측) 튜플. 정답이 없는 예제는 None
+    """
+    correct_answer = record.get("answer")
+    if correct_answer is None:
+        return None
 
-    except Exception as exc:
-        print(f"Critical error in compute_metric: {exc}")
+    marker_index = pred_item.find("Q: ")
+    if marker_index != -1:
+        pred_item = pred_item[:marker_index]
 
-    return incorrect_items, correct_count, total_count
+    if "####" in pred_item:
+        parts = pred_item.split("####")
+        if len(parts) > 1 and len(parts[1].split()) > 0:
+            pred_item = parts[0] + "#### " + parts[1].split()[0]
+        else:
+            pred_item = parts[0] + "#### "
+
+    matches = list(re.finditer(r"\b(A|B|C|D|E)\b", pred_item))
+    extracted_ans = matches[-1].group(1) if matches else None
+    return extracted_ans is not None and extracted_ans == correct_answer, pred_item
+
+
+# ------------------------- rank별 결과 shard -------------------------
+
+# rank별 결과 shard 경로를 만드는 함수
+def result_shard_path(config, shard_name, rank):
+    return os.path.join(config.target_save, "shards", f"{shard_name}_rank{rank}.jsonl")
+
+
+# 예측을 채점해 rank별 shard 파일에 idx와 함께 기록하는 함수
+def write_result_shard(shard_file, preds, records):
+    """
+    통신 없이 이 rank의 예측만 채점하고, 예제마다 {"idx", "correct", "prediction"} 한 줄을 기록합니다.
+    """
+    for pred_item, record in zip(preds, records):
+        try:
+            scored = score_prediction(pred_item, record)
+        except Exception as exc:
+            print(f"Warning: Error processing prediction for idx {record.get('idx')}: {exc}")
+            continue
+        if scored is None:
+            print(f"Warning: Missing answer for idx {record.get('idx')}")
+            continue
+        is_correct, pred_item = scored
+        shard_file.write(json.dumps({"idx": int(record["idx"]), "correct": is_correct, "prediction": pred_item}) + "\n")
+
+
+# 모든 rank의 shard를 idx 기준으로 합쳐 최종 결과를 만드는 함수
+def merge_result_shards(config, shard_name, world_size, prompt_dataset, tok, show_hint):
+    """
+    분산 sampler가 rank 수를 맞추려고 반복한 예제는 idx가 같으므로 처음 것만 남깁니다.
+    정답 예제는 idx 순서로 correct_data.txt에 기록합니다.
+
+    Returns:
+        (오답 예제 리스트({"idx"}만 포함), 정답 수, 전체 수)
+    """
+    results = {}
+    for rank in range(world_size):
+        path = result_shard_path(config, shard_name, rank)
+        if not os.path.exists(path):
+            print(f"Warning: Missing result shard {path}")
+            continue
+        with open(path, "r") as shard_file:
+            for line in shard_file:
+                entry = json.loads(line)
+                results.setdefault(entry["idx"], entry)
 
+    incorrect_items = []
+    correct_count = 0
+    for idx in sorted(results):
+        entry = results[idx]
+        if entry["correct"]:
+            correct_count += 1
+            try:
+                write_output_example(
+                    config, config.target_save + "/correct_data.txt", entry["prediction"], prompt_dataset.records[idx], tok.eos_token
+                )
+            except Exception as exc:
+                print(f"Warning: Failed to write output example for idx {idx}: {exc}")
+        elif not show_hint:
+            incorrect_items.append({"idx": idx})
+    return incorrect_items, correct_count, len(results)
+
+
+# 평가가 끝난 뒤 shard를 한 번 합쳐 정확도를 출력하는 함수
+def finish_evaluation(config, device_rank, shard_name, prompt_dataset, tok, show_hint):
+    # 모든 rank가 shard 파일을 닫은 뒤에 합칩니다. 채점 결과를 모으는 데 쓰는 유일한 collective입니다.
+    dist.barrier()
+    if device_rank != 0:
+        return [], 0, 0
 
-# 입력 예시를 토크나이징하는 함수 (프롬프트 결합)
-def prepare_prompts(config, examples, tok, prompt_text, show_hint):
-    combined_queries = []
-    for question_item, answer_key in zip(examples["question"], examples["answerKey"]):
-        q_text = question_item["stem"]
-        choices_list = question_item["choices"]
-        options_formatted = "\n".join([f'({choice["label"]}) {choice["text"]}' for choice in choices_list])
+    incorrect_records, total_correct, overall_total = merge_result_shards(
+        config, shard_name, dist.get_world_size(), prompt_dataset, tok, show_hint
+    )
+    if overall_total > 0:
         if show_hint:
-            combined_queries.append(f"{prompt_text}\nQ: {q_text} ({answer_key})\nOptions:\n{options_formatted}\nA: ")
+            print(f"Hint Correct: {total_correct}, Accuracy: {total_correct / overall_total:.4f}")
         else:
-            combined_queries.append(f"{prompt_text}\nQ: {q_text}\nOptions:\n{options_formatted}\nA: ")
-
-    tokenized_queries = tok(
-        combined_queries,
-        return_tensors="pt",
-        padding="max_length",
-        truncation=True,
-        max_length=config.max_length,
-    )
+            print(f"No hint Correct: {total_correct}, Accuracy: {total_correct / overall_total:.4f}")
+    else:
+        print("Warning: No valid examples were processed")
+    return incorrect_records, total_correct, overall_total
+
+
+# 입력 예시를 토크나이징하는 함수 (프롬프트 결합)
+def prepare_prompts(config, examples, tok, prompt_text, show_hint):
+    combined_queries = [
+        format_prompt(prompt_text, question_item, answer_key, show_hint)
+        for question_item, answer_key in zip(examples["question"], examples["answerKey"])
+    ]
+
+    # 한 번 토크나이징한 결과로 truncation 통계를 구하고, 배치 안에서 가장 긴 프롬프트 길이에 맞춰 padding합니다.
+    token_ids, orig_lengths = tokenize_with_lengths(tok, combined_queries, config.max_length)
+    tokenized_queries = tok.pad({"input_ids": token_ids}, padding="longest", return_tensors="pt")
 
-    warn_truncation(config, combined_queries, tok, log_point="Data generation")
+    warn_truncation(config, combined_queries, orig_lengths, log_point="Data generation")
 
     return tokenized_queries
 
 
+# few-shot prefix를 rank마다 한 번만 모델에 통과시켜 past key/value를 저장하는 함수
+def build_prefix_cache(mdl, tok, prefix_text, device_rank):
+    """
+    prepare_prompts가 모든 질문 앞에 붙이는 prefix(few-shot 프롬프트와 줄바꿈)의 key/value를 계산합니다.
+
+    Returns:
+        {"input_ids": (1, prefix 길이) 텐서, "past_key_values": 레이어별 (key, value) 튜플}
+    """
+    prefix_ids = tok(prefix_text, return_tensors="pt")["input_ids"].to(device_rank)
+    with torch.no_grad():
+        outputs = mdl(input_ids=prefix_ids, use_cache=True)
+    return {"input_ids": prefix_ids, "past_key_values": tuple(cache_to_layers(outputs.past_key_values))}
+
+
+# left padding된 배치에서 공통 prefix 토큰을 떼어 내는 함수
+def split_prefix(input_ids, attention_mask, prefix_ids):
+    """
+    각 행의 padding 뒤에 오는 prefix 토큰을 제거한 (suffix input_ids, suffix attention_mask)를 반환합니다.
+    prefix와 질문의 경계에서 토큰화가 달라지거나 truncation으로 prefix가 잘린 행이 있으면 None을 반환합니다.
+    """
+    prefix_len = prefix_ids.size(1)
+    starts = attention_mask.size(1) - attention_mask.sum(dim=1)
+    suffix_ids, suffix_mask = [], []
+    for row, start in enumerate(starts.tolist()):
+        if not torch.equal(input_ids[row, start : start + prefix_len], prefix_ids[0]):
+            return None
+        suffix_ids.append(torch.cat([input_ids[row, :start], input_ids[row, start + prefix_len :]]))
+        suffix_mask.append(torch.cat([attention_mask[row, :start], attention_mask[row, start + prefix_len :]]))
+    return torch.stack(suffix_ids), torch.stack(suffix_mask)
+
+
+# prefix 캐시를 배치 크기만큼 펼친 DynamicCache를 만드는 함수
+def expand_prefix_cache(prefix_cache, batch_size):
+    """
+    prefix key/value를 복사하지 않고 expand한 view로 캐시를 채웁니다.
+    generate가 새 토큰을 이어 붙일 때 배치별 텐서가 새로 만들어지므로 저장된 prefix 캐시는 바뀌지 않습니다.
+    """
+    cache = DynamicCache()
+    for layer_idx, (key, value) in enumerate(prefix_cache["past_key_values"]):
+        cache.update(key.expand(batch_size, -1, -1, -1), value.expand(batch_size, -1, -1, -1), layer_idx)
+    return cache
+
+
+# prefix 캐시를 쓸 수 있으면 prefix 이후의 suffix만 prefill하도록 generate 입력을 구성하는 함수
+def build_generation_inputs(input_ids, attention_mask, prefix_cache):
+    """
+    반환하는 input_ids는 [prefix][padding][질문] 순서이고, 길이는 원래 input_ids와 같습니다.
+    padding 토큰은 attention_mask가 0이고 position id가 attention_mask 누적합으로 계산되므로,
+    [padding][prefix][질문] 순서의 캐시 없는 입력과 같은 위치와 같은 토큰을 보게 됩니다.
+    캐시를 쓸 수 없으면 None을 반환합니다.
+    """
+    split = split_prefix(input_ids, attention_mask, prefix_cache["input_ids"])
+    if split is None:
+        return None
+    suffix_ids, suffix_mask = split
+    batch_size = suffix_ids.size(0)
+    prefix_ids = prefix_cache["input_ids"].expand(batch_size, -1)
+    return {
+        "input_ids": torch.cat([prefix_ids, suffix_ids], dim=1),
+        "attention_mask": torch.cat([torch.ones_like(prefix_ids), suffix_mask], dim=1),
+        "past_key_values": expand_prefix_cache(prefix_cache, batch_size),
+    }
+
+
+ANSWER_PATTERN = re.compile(r"answer is[^\n]*?\([A-E]\)\.")
+NEXT_QUESTION_MARKER = "Q: "
+
+
+# 생성한 텍스트에 다음 질문 marker나 "the answer is ... (X)." 문장이 나왔는지 확인하는 함수
+def is_answer_complete(text):
+    return NEXT_QUESTION_MARKER in text or ANSWER_PATTERN.search(text) is not None
+
+
+# 행마다 답변이 끝나면 생성을 멈추는 stopping criteria
+class AnswerCompletionCriteria(StoppingCriteria):
+    """
+    생성한 부분에 다음 질문 marker("Q: ")나 "the answer is ... (X)." 문장이 나오면 그 행을 끝냅니다.
+    score_prediction은 "Q: " 뒤를 버리고 마지막 선택지만 보므로 그 뒤의 토큰은 결과에 영향을 주지 않습니다.
+    끝난 행은 generate가 pad 토큰으로 채우고, 모든 행이 끝나면 배치 생성이 멈춥니다.
+    행마다 끝난 시점의 생성 길이를 stop_lengths에 기록합니다 (끝나지 않은 행은 0).
+    """
+    def __init__(self, tok, prompt_length, window=48):
+        """
+        Args:
+            prompt_length: generate에 넣은 input_ids 길이. 이 뒤의 토큰만 검사합니다.
+            window: 매 step 다시 decode할 마지막 토큰 수. marker나 답변 문장이 이 안에 들어오면 충분합니다.
+        """
+        self.tok = tok
+        self.prompt_length = prompt_length
+        self.window = window
+        self.done = None
+        self.stop_lengths = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.done is None:
+            self.done = torch.zeros(input_ids.size(0), dtype=torch.bool, device=input_ids.device)
+            self.stop_lengths = torch.zeros(input_ids.size(0), dtype=torch.long, device=input_ids.device)
+        generated = input_ids[:, self.prompt_length :]
+        start = max(0, generated.size(1) - self.window)
+        active_rows = (~self.done).nonzero(as_tuple=True)[0].tolist()
+        if active_rows:
+            texts = self.tok.batch_decode(generated[active_rows, start:], skip_special_tokens=True)
+            for row, text in zip(active_rows, texts):
+                if is_answer_complete(text):
+                    self.done[row] = True
+                    self.stop_lengths[row] = generated.size(1)
+        return self.done.clone()
+
+
+# 행마다 실제로 생성한 토큰 수를 세는 함수 (첫 eos까지, pad는 eos로 채워짐)
+# stop_lengths가 있으면 stopping criteria로 끝난 행은 그 길이까지만 셉니다 (뒤따르는 pad eos 제외).
+def count_generated_tokens(generated_tokens, eos_token_id, stop_lengths=None):
+    is_eos = generated_tokens == eos_token_id
+    has_eos = is_eos.any(dim=1)
+    first_eos = is_eos.int().argmax(dim=1)
+    counts = torch.where(has_eos, first_eos + 1, torch.full_like(first_eos, generated_tokens.size(1)))
+    if stop_lengths is not None:
+        stop_lengths = stop_lengths.to(counts.device)
+        counts = torch.where(stop_lengths > 0, torch.minimum(counts, stop_lengths), counts)
+    return counts
+
+
+# 어느 한 rank라도 failed면 모든 rank에서 True를 반환하는 함수 (분산 환경이 아니면 failed 그대로)
+def any_rank_failed(failed, device_rank):
+    if not (dist.is_available() and dist.is_initialized()):
+        return failed
+    flag = torch.tensor([int(failed)], device=device_rank)
+    dist.all_reduce(flag, op=dist.ReduceOp.MAX)
+    return bool(flag.item())
+
+
 # 배치 단위로 평가를 수행하는 함수
-def evaluate_batches(config, mdl, device_rank, loader, tok, generation_length, prompt_str, show_hint=False):
+def evaluate_batches(config, mdl, device_rank, loader, tok, generation_length, prompt_str, show_hint=False,
+                     prefix_cache=None, shard_name="eval"):
+    """
+    배치 단위로 생성하고, 예측은 rank마다 채점해 shard 파일에 기록합니다.
+    채점 결과는 반복 중에 rank 사이로 모으지 않고, 끝난 뒤 rank 0이 shard를 합칩니다 (finish_evaluation).
+    FSDP 모델의 generate는 rank 간 collective를 쓰므로 모든 rank가 같은 수의 배치를 생성해야 합니다.
+    그래서 준비 단계에서 실패한 배치는 모든 rank가 함께 건너뛰고, generate 중의 예외는 건너뛰지 않고 전달합니다.
+    오답 예제와 정답 수, 전체 수는 rank 0에서만 채워집니다.
+    """
     generate_func = mdl.module.generate if hasattr(mdl, "module") else mdl.generate
+    if config.do_sample:
+        sampling_kwargs = {"do_sample": True, "top_p": 0.9, "temperature": 1.0}
+    else:
+        sampling_kwargs = {"do_sample": False}
 
     progress_bar = tqdm(
         enumerate(loader),
@@ -141,86 +335,163 @@ def evaluate_batches(config, mdl, device_rank, loader, tok, generation_length, p
         disable=(device_rank != 0),
     )
 
-    total_correct = 0
-    overall_total = 0
-    incorrect_records = []
+    shard_path = result_shard_path(config, shard_name, device_rank)
+    os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+    shard_file = open(shard_path, "w")
+    padding_logger = get_file_logger(config, "padding", "padding_stats.log")
+    total_tokens, total_pad_tokens = 0, 0
+    generation_logger = get_file_logger(config, "generation", "generation_stats.log")
+    total_generated, total_saved = 0, 0
 
     with torch.no_grad():
         for batch_idx, batch_data in progress_bar:
+            prepared = False
             try:
-                tokenized_batch = prepare_prompts(config, batch_data, tok, prompt_str, show_hint=show_hint)
+                # 토큰화 캐시를 읽는 loader는 이미 padding된 input_ids를 줍니다.
+                if "input_ids" in batch_data:
+                    tokenized_batch = {"input_ids": batch_data["input_ids"], "attention_mask": batch_data["attention_mask"]}
+                else:
+                    tokenized_batch = prepare_prompts(config, batch_data, tok, prompt_str, show_hint=show_hint)
                 input_ids = tokenized_batch["input_ids"].to(device_rank)
                 attention_mask = tokenized_batch["attention_mask"].to(device_rank)
 
-                try:
-                    outputs = generate_func(
-                        input_ids=input_ids,
-                        attention_mask=attention_mask,
-                        max_length=input_ids.size(1) + generation_length,
-                        pad_token_id=tok.eos_token_id,
-                        do_sample=True,
-                        top_p=0.9,
-                        temperature=1.0,
-                    )
-                except Exception as gen_exc:
-                    print(f"Warning: Generation failed for batch {batch_idx}: {gen_exc}")
-                    continue
-
-                try:
-                    generated_tokens = outputs[:, input_ids.shape[-1] :]
-                    decoded_preds = tok.batch_decode(generated_tokens, skip_special_tokens=True)
-                except Exception as dec_exc:
-                    print(f"Warning: Decoding failed for batch {batch_idx}: {dec_exc}")
-                    continue
-
-                gathered_preds = [None for _ in range(dist.get_world_size())]
-                gathered_data = [None for _ in range(dist.get_world_size())]
-
-                try:
-                    dist.all_gather_object(gathered_preds, decoded_preds)
-                    dist.all_gather_object(gathered_data, batch_data)
-                except Exception as ag_exc:
-                    print(f"Warning: All-gather failed for batch {batch_idx}: {ag_exc}")
-                    continue
-
-                if device_rank == 0:
-                    try:
-                        merged_preds = list(chain.from_iterable(gathered_preds))
-                        merged_dataset = []
-                        for proc_data in gathered_data:
-                            for i in range(len(proc_data["question"])):
-                                single_record = {}
-                                for key in proc_data.keys():
-                                    single_record[key] = proc_data[key][i]
-                                merged_dataset.append(single_record)
-
-                        incorrect_batch, batch_correct, batch_total = compute_metric(
-                            config, merged_preds, merged_dataset, config.target_save, tok, show_hint=show_hint
-                        )
-                        total_correct += batch_correct
-                        overall_total += batch_total
-                        if not show_hint:
-                            incorrect_records.extend(incorrect_batch)
-                    except Exception as merge_exc:
-                        print(f"Warning: Processing results failed for batch {batch_idx}: {merge_exc}")
-                        continue
-
-                dist.barrier()
-
+                batch_pad_ratio = padding_ratio(tokenized_batch["attention_mask"])
+                total_tokens += attention_mask.numel()
+                total_pad_tokens += round(batch_pad_ratio * attention_mask.numel())
+                padding_logger.info(
+                    f"Iteration: {config.exp_iter}, Rank: {device_rank}, Batch: {batch_idx}, "
+                    f"Shape: {tuple(input_ids.shape)}, Padding ratio: {batch_pad_ratio:.4f}"
+                )
+                progress_bar.set_postfix(pad=f"{batch_pad_ratio:.2f}", len=input_ids.size(1))
+
+                generation_inputs = None
+                if prefix_cache is not None:
+                    generation_inputs = build_generation_inputs(input_ids, attention_mask, prefix_cache)
+                    if generation_inputs is None:
+                        print(f"Warning: Prefix cache does not match batch {batch_idx}, running it without the cache")
+                if generation_inputs is None:
+                    generation_inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+
+                stopping_criteria, answer_criteria = None, None
+                if config.early_stop:
+                    answer_criteria = AnswerCompletionCriteria(tok, input_ids.size(1))
+                    stopping_criteria = StoppingCriteriaList([answer_criteria])
+                prepared = True
             except Exception as batch_exc:
-                print(f"Warning: Failed to process batch {batch_idx}: {batch_exc}")
+                print(f"Warning: Failed to prepare batch {batch_idx}: {batch_exc}")
+
+            # 한 rank만 배치를 건너뛰면 나머지 rank가 generate의 collective에서 기다리므로, 모든 rank가 함께 건너뜁니다.
+            if any_rank_failed(not prepared, device_rank):
+                print(f"Warning: Skipping batch {batch_idx} on rank {device_rank} because a rank failed to prepare it")
                 continue
 
-    if device_rank == 0:
-        if overall_total > 0:
-            if show_hint:
-                print(f"Hint Correct: {total_correct}, Accuracy: {total_correct / overall_total:.4f}")
-            else:
-                print(f"No hint Correct: {total_correct}, Accuracy: {total_correct / overall_total:.4f}")
-        else:
-            print("Warning: No valid examples were processed")
+            # generate 중의 예외는 다른 rank가 이미 collective에 들어가 있어 건너뛸 수 없으므로 그대로 전달합니다.
+            outputs = generate_func(
+                **generation_inputs,
+                max_length=input_ids.size(1) + generation_length,
+                pad_token_id=tok.eos_token_id,
+                stopping_criteria=stopping_criteria,
+                **sampling_kwargs,
+            )
 
-    return incorrect_records, total_correct, overall_total
+            # 여기부터는 rank 간 통신이 없으므로 실패한 배치는 이 rank에서만 건너뜁니다.
+            try:
+                generated_tokens = outputs[:, input_ids.shape[-1] :]
+                decoded_preds = tok.batch_decode(generated_tokens, skip_special_tokens=True)
+
+                # 모든 행이 generation_length까지 생성했을 때와 비교해 아낀 토큰 수
+                stop_lengths = answer_criteria.stop_lengths if answer_criteria is not None else None
+                batch_generated = count_generated_tokens(generated_tokens, tok.eos_token_id, stop_lengths).sum().item()
+                batch_saved = generated_tokens.size(0) * generation_length - batch_generated
+                total_generated += batch_generated
+                total_saved += batch_saved
+                generation_logger.info(
+                    f"Iteration: {config.exp_iter}, Rank: {device_rank}, Batch: {batch_idx}, "
+                    f"Generated tokens: {batch_generated}, Saved tokens: {batch_saved}, "
+                    f"Decoding steps: {generated_tokens.size(1)}/{generation_length}"
+                )
+                progress_bar.set_postfix(pad=f"{batch_pad_ratio:.2f}", len=input_ids.size(1), saved=batch_saved)
+
+                batch_records = [
+                    {key: batch_data[key][i] for key in ("idx", "answer")} for i in range(len(decoded_preds))
+                ]
+                write_result_shard(shard_file, decoded_preds, batch_records)
+            except Exception as dec_exc:
+                print(f"Warning: Decoding failed for batch {batch_idx}: {dec_exc}")
+                continue
+
+    if total_tokens > 0:
+        padding_logger.info(
+            f"Iteration: {config.exp_iter}, Rank: {device_rank}, Overall padding ratio: {total_pad_tokens / total_tokens:.4f}"
+        )
+    if total_generated + total_saved > 0:
+        generation_logger.info(
+            f"Iteration: {config.exp_iter}, Rank: {device_rank}, Total generated tokens: {total_generated}, "
+            f"Total saved tokens: {total_saved} ({total_saved / (total_generated + total_saved):.2%})"
+        )
+
+    shard_file.close()
+    return finish_evaluation(config, device_rank, shard_name, loader.dataset, tok, show_hint)
+
+
+# continuous batching으로 평가를 수행하는 함수
+def evaluate_continuous(config, mdl, device_rank, loader, tok, generation_length, prompt_str, show_hint=False,
+                        prefix_cache=None, shard_name="eval"):
+    """
+    evaluate_batches와 같은 결과를 반환하지만, 배치 단위로 기다리지 않고 config.num_slots개의 slot에서
+    끝난 예제를 바로 채점해 shard에 기록하고 빈 slot에 다음 예제를 넣습니다.
+    FSDP 모델이므로 엔진이 rank 간 forward 횟수를 맞추며, 먼저 끝난 rank는 더미 forward로 나머지 rank를 기다립니다.
+    loader는 토큰화 캐시를 읽는 loader여야 합니다 (배치에 input_ids, attention_mask 포함).
+    """
+    prefill_inputs_fn = None
+    if prefix_cache is not None:
+        prefill_inputs_fn = lambda input_ids, attention_mask: build_generation_inputs(input_ids, attention_mask, prefix_cache)
+    engine = ContinuousBatchGenerator(
+        mdl,
+        tok,
+        num_slots=config.num_slots,
+        max_new_tokens=generation_length,
+        device=device_rank,
+        stop_fn=is_answer_complete if config.early_stop else None,
+        do_sample=config.do_sample,
+        prefill_inputs_fn=prefill_inputs_fn,
+    )
+
+    def examples():
+        for batch_data in loader:
+            for i in range(len(batch_data["idx"])):
+                record = {key: batch_data[key][i] for key in batch_data}
+                prompt_ids = record["input_ids"][record["attention_mask"].bool()].tolist()
+                yield record, prompt_ids
+
+    generation_logger = get_file_logger(config, "generation", "generation_stats.log")
+    progress_bar = tqdm(
+        total=len(loader.dataset) if hasattr(loader.dataset, "__len__") else None,
+        desc=f"{'Hint' if show_hint else 'No Hint'} Continuous Eval [Rank {device_rank}]",
+        position=device_rank + 1,
+        leave=False,
+        disable=(device_rank != 0),
+    )
+
+    shard_path = result_shard_path(config, shard_name, device_rank)
+    os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+    num_examples = 0
+    start_time = time.perf_counter()
+    with torch.no_grad(), open(shard_path, "w") as shard_file:
+        for record, prediction, num_tokens in engine.generate(examples()):
+            write_result_shard(shard_file, [prediction], [record])
+            num_examples += 1
+            progress_bar.update(1)
+    progress_bar.close()
+    elapsed = time.perf_counter() - start_time
+    generation_logger.info(
+        f"Iteration: {config.exp_iter}, Rank: {device_rank}, Continuous batching: {num_examples} examples in {elapsed:.1f}s "
+        f"({num_examples / elapsed if elapsed else 0.0:.2f} examples/s), Generated tokens: {engine.stats['generated_tokens']}, "
+        f"Decode steps: {engine.stats['decode_steps']}, Prefills: {engine.stats['prefills']}, "
+        f"Dummy forwards: {engine.stats['dummy_forwards']}"
+    )
+
+    return finish_evaluation(config, device_rank, shard_name, loader.dataset, tok, show_hint)
 
 
 # 리스트를 분산 환경에서 broadcast하는 함수
@@ -231,12 +502,14 @@ def distribute_list(data, src_rank):
 
 
 # 전체 평가를 수행하는 함수 (두 번 평가 진행)
-def run_evaluation(config, mdl, device_rank, total_devices, loader, tok, generation_length, out_path, prompt_str, prompt_hint_str):
+def run_evaluation(config, mdl, device_rank, total_devices, loader, tok, generation_length, out_path, prompt_str, prompt_hint_str,
+                   prefix_cache=None):
     mdl.eval()
-    incorrect_records, correct_count, total_count = evaluate_batches(config, mdl, device_rank, loader, tok, generation_length, prompt_str, show_hint=False)
+    evaluate = evaluate_continuous if config.generation_mode == "continuous" else evaluate_batches
+    incorrect_records, correct_count, total_count = evaluate(config, mdl, device_rank, loader, tok, generation_length, prompt_str, show_hint=False, prefix_cache=prefix_cache)
     incorrect_records = distribute_list(incorrect_records, src_rank=0)
-    wrong_loader, sampler_wrong = create_incorrect_loader(config, incorrect_records, device_rank, total_devices)
-    wrong_records, additional_correct, additional_total = evaluate_batches(config, mdl, device_rank, wrong_loader, tok, generation_length, prompt_str, show_hint=False)
+    wrong_loader, sampler_wrong = create_incorrect_loader(config, incorrect_records, device_rank, total_devices, loader.dataset)
+    wrong_records, additional_correct, additional_total = evaluate(config, mdl, device_rank, wrong_loader, tok, generation_length, prompt_str, show_hint=False, prefix_cache=prefix_cache, shard_name="retry")
     correct_count += additional_correct
     hint_correct, hint_total = "_", "_"
     dist.barrier()
@@ -273,9 +546,15 @@ def distributed_main(rank, world_size, config):
 
     config.batch_size = config.test_batch_size  # inference 시 배치 사이즈
 
-    train_loader, sampler_train = create_data_loader(config, tok, rank, world_size)
+    train_loader, sampler_train = create_data_loader(config, tok, rank, world_size, base_prompt)
+
+    # 모든 질문 앞에 붙는 few-shot prefix는 rank마다 한 번만 prefill합니다.
+    prefix_cache = None
+    if config.prefix_cache:
+        model.eval()
+        prefix_cache = build_prefix_cache(model, tok, base_prompt + "\n", rank)
 
-    corr, tot, corr_hint, tot_hint = run_evaluation(config, model, rank, world_size, train_loader, tok, config.gen_length, config.target_save, base_prompt, hint_prompt)
+    corr, tot, corr_hint, tot_hint = run_evaluation(config, model, rank, world_size, train_loader, tok, config.gen_length, config.target_save, base_prompt, hint_prompt, prefix_cache=prefix_cache)
     if rank == 0:
         accuracy = corr / tot
         hint_accuracy = "_"
@@ -297,6 +576,19 @@ if __name__ == "__main__":
     args.max_length = params["max_length"]
     args.gen_length = params["gen_length"]
     args.n_shot = 7
+    # 길이가 비슷한 예제끼리 배치를 묶어 padding을 줄입니다.
+    args.group_by_length = params.get("group_by_length", True)
+    # few-shot prefix의 key/value를 한 번만 계산해 모든 배치에서 재사용합니다.
+    args.prefix_cache = params.get("prefix_cache", True)
+    # False면 greedy decoding을 사용합니다 (prefix 캐시 사용 여부와 관계없이 같은 출력).
+    args.do_sample = params.get("do_sample", True)
+    # 행마다 답변이 끝나면 생성을 멈춥니다 (AnswerCompletionCriteria).
+    args.early_stop = params.get("early_stop", True)
+    # "static"은 배치 단위 generate, "continuous"는 num_slots개의 slot으로 continuous batching을 합니다.
+    args.generation_mode = params.get("generation_mode", "static")
+    args.num_slots = params.get("num_slots", args.test_batch_size)
+    # 토큰화한 프롬프트를 저장하는 디렉터리
+    args.cache_dir = params.get("cache_dir", "cache/tokenized")
 
     # STaR specific
     args.name = params["name"]
@@ -1,16 +1,20 @@
 import os
 import json
+import math
+import hashlib
+import shutil
+import numpy as np
 import torch
 import torch.optim as optim
 import torch.distributed as dist
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Dataset
 from torch.utils.data.distributed import DistributedSampler
 from torch.distributed.fsdp import FullyShardedDataParallel as FSDP
 from torch.nn.parallel import DistributedDataParallel as DDP
 from torch.distributed.fsdp import MixedPrecision, FullStateDictConfig
 from torch.distributed.fsdp.wrap import size_based_auto_wrap_policy
 import functools
-from datasets import load_dataset, Dataset
+from datasets import load_dataset
 from transformers import AutoModelForCausalLM, AutoTokenizer
 import logging
 
@@ -33,136 +37,337 @@ def save_log_arguments(log_path, **kwargs):
     with open(log_path, "w") as jf:
         json.dump(logs, jf, indent=4)
 
-def warn_truncation(cfg, prompt_list, tokenizer, log_point):
+def warn_truncation(cfg, prompt_list, orig_lengths, log_point):
     """
     각 프롬프트의 원본 토큰 길이가 최대 길이를 초과하는지 검사하고,
-    초과한 경우 경고 로그를 남깁니다.
+    초과한 경우 경고 로그를 남깁니다. 길이는 토크나이징할 때 함께 계산한 값을 받습니다.
     """
-    logging.basicConfig(
-        level=logging.WARNING,
-        format="%(levelname)s - %(message)s",
-        handlers=[logging.FileHandler(f"{cfg.log_dir}/truncation_warnings.log")]
-    )
-    orig_lengths = [len(tokenizer(prompt, add_special_tokens=False)["input_ids"]) for prompt in prompt_list]
     is_truncated = [orig > cfg.max_length for orig in orig_lengths]
 
     if any(is_truncated):
+        logger = get_file_logger(cfg, "truncation", "truncation_warnings.log")
         num_truncated = sum(is_truncated)
-        logging.warning(f"{num_truncated} input(s) exceeded max_length and were truncated.")
+        logger.warning(f"{num_truncated} input(s) exceeded max_length and were truncated.")
         for idx, (prompt, length, truncated_flag) in enumerate(zip(prompt_list, orig_lengths, is_truncated)):
             if truncated_flag:
-                logging.warning(
+                logger.warning(
                     f"Iteration: {cfg.exp_iter}, Log point: {log_point}\n"
                     f"--Truncated Prompt {idx+1} (Token Length {length} > Max Length {cfg.max_length})--\n{prompt}"
                 )
 
+def get_file_logger(cfg, name, file_name):
+    """
+    log_dir 아래 file_name에 기록하는 logger를 반환합니다.
+    handler는 처음 호출할 때 한 번만 붙이므로 배치마다 호출해도 됩니다.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.FileHandler(os.path.join(cfg.log_dir, file_name))
+        handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def padding_ratio(attention_mask):
+    """
+    배치에서 padding 토큰이 차지하는 비율을 반환합니다.
+    """
+    total = attention_mask.numel()
+    return 1.0 - attention_mask.sum().item() / total if total else 0.0
+
 # ------------------------- 데이터 전처리 및 Collation -------------------------
 
-def preprocess_data(cfg, examples, tokenizer, split_mode):
+def format_prompt(prompt_text, question_item, answer_key, show_hint=False):
     """
-    질문과 선택지를 합쳐 텍스트로 구성한 후 토크나이징합니다.
-    train 모드인 경우 정답도 함께 포함합니다.
+    few-shot 프롬프트 뒤에 질문과 선택지를 붙인 생성용 프롬프트를 만듭니다.
+    show_hint면 질문 뒤에 정답 label을 힌트로 붙입니다.
     """
-    merged_texts = []
-    for question_item, answer_item in zip(examples["question"], examples["answerKey"]):
-        q_text = question_item['stem']
-        choices = question_item['choices']
-        opts = "\n".join([f'({choice["label"]}) {choice["text"]}' for choice in choices])
-        if split_mode == "train":
-            merged_texts.append(f"Q: {q_text}\nOptions:\n{opts}\nA: {answer_item}")
-        else:
-            merged_texts.append(f"Q: {q_text}\nOptions:\n{opts}\nA: ")
-    
-    tokenized_data = tokenizer(
-        merged_texts,
-        padding="max_length",
-        truncation=True,
-        max_length=cfg.max_length
-    )
-    tokenized_data["question"] = examples["question"]
-    tokenized_data["answer"] = examples["answerKey"]
+    q_text = question_item["stem"]
+    options_formatted = "\n".join([f'({choice["label"]}) {choice["text"]}' for choice in question_item["choices"]])
+    if show_hint:
+        return f"{prompt_text}\nQ: {q_text} ({answer_key})\nOptions:\n{options_formatted}\nA: "
+    return f"{prompt_text}\nQ: {q_text}\nOptions:\n{options_formatted}\nA: "
 
-    warn_truncation(cfg, merged_texts, tokenizer, log_point="Simple data load")
-    return tokenized_data
+def tokenize_with_lengths(tokenizer, texts, max_length):
+    """
+    텍스트를 한 번만 토크나이징해 max_length로 자른 토큰 id 리스트와 자르기 전 길이를 함께 반환합니다.
+    오른쪽을 자르므로 tokenizer(..., truncation=True, max_length=max_length)와 같은 id가 나옵니다.
+    자르기 전 길이는 예전 잘림 검사(add_special_tokens=False로 센 길이)와 같도록 추가된 special token(BOS 등)을 빼고 셉니다.
+    """
+    encoded = tokenizer(texts, truncation=False)["input_ids"]
+    num_special = tokenizer.num_special_tokens_to_add()
+    orig_lengths = [len(ids) - num_special for ids in encoded]
+    return [ids[:max_length] for ids in encoded], orig_lengths
 
-def custom_collate(batch):
+def custom_collate(batch, pad_token_id=0, padding_side="left"):
     """
-    배치 내 각 항목의 텐서 데이터는 torch.tensor로 변환하고,
+    배치 내 각 항목의 텐서 데이터는 배치 안에서 가장 긴 길이로 padding한 뒤 torch.tensor로 변환하고,
     문자열 등 텐서가 아닌 데이터는 리스트 형태로 유지합니다.
+    input_ids 계열은 pad_token_id로, attention_mask 계열은 0으로 채웁니다.
     """
     collated = {}
     for key in batch[0]:
         if key in ["input_ids", "attention_mask", "wrong_input_ids", "wrong_attention_mask"]:
-            collated[key] = torch.tensor([item[key] for item in batch], dtype=torch.long)
+            rows = [list(item[key]) for item in batch]
+            longest = max(len(row) for row in rows)
+            pad_value = 0 if key.endswith("attention_mask") else pad_token_id
+            if padding_side == "left":
+                rows = [[pad_value] * (longest - len(row)) + row for row in rows]
+            else:
+                rows = [row + [pad_value] * (longest - len(row)) for row in rows]
+            collated[key] = torch.tensor(rows, dtype=torch.long)
         else:
             collated[key] = [item[key] for item in batch]
     return collated
 
-def append_indices(batch, idx_list):
+# ------------------------- 토큰화 캐시 관련 함수 -------------------------
+
+def prompt_cache_key(cfg, tokenizer, prompt_text, data_file, data_range, show_hint=False):
     """
-    배치 내 각 예제에 인덱스 정보를 추가합니다.
+    토크나이저, 프롬프트 내용, 데이터 파일과 사용 범위, max_length로 캐시 키(sha256)를 만듭니다.
+    데이터 파일은 크기와 수정 시각으로 구분합니다.
     """
-    batch["idx"] = idx_list
-    return batch
+    hasher = hashlib.sha256()
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    tokenizer_state = backend.to_str() if backend is not None else json.dumps(tokenizer.get_vocab(), sort_keys=True)
+    stat = os.stat(data_file)
+    for part in (
+        # 캐시에 저장하는 값의 의미가 바뀌면 올립니다 (2: orig_lengths에서 special token 제외).
+        "prompt-cache-v2",
+        type(tokenizer).__name__,
+        tokenizer.name_or_path,
+        tokenizer_state,
+        prompt_text,
+        os.path.abspath(data_file),
+        f"{stat.st_size}:{stat.st_mtime_ns}",
+        f"{data_range.start}:{data_range.stop}:{data_range.step}",
+        str(cfg.max_length),
+        str(show_hint),
+    ):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
 
-# ------------------------- DataLoader 관련 함수 -------------------------
+def build_prompt_cache(cfg, tokenizer, records, prompt_text, cache_path, show_hint=False):
+    """
+    records의 프롬프트를 한 번에 토크나이징해 cache_path 디렉터리에 저장합니다.
+    input_ids.npy(이어 붙인 id), offsets.npy(예제별 시작 위치), lengths.npy(자른 뒤 길이),
+    orig_lengths.npy(자르기 전 길이)를 임시 디렉터리에 쓴 뒤 이름을 바꿔, 중간에 실패해도 반쯤 쓴 캐시가 남지 않습니다.
+    """
+    prompts = [format_prompt(prompt_text, record["question"], record["answerKey"], show_hint) for record in records]
+    token_ids, orig_lengths = tokenize_with_lengths(tokenizer, prompts, cfg.max_length)
+    lengths = np.array([len(ids) for ids in token_ids], dtype=np.int64)
+    offsets = np.zeros(len(token_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    flat_ids = np.fromiter((token for ids in token_ids for token in ids), dtype=np.int32, count=int(offsets[-1]))
 
-def create_data_loader(cfg, tokenizer, local_rank, num_devices):
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, "input_ids.npy"), flat_ids)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "lengths.npy"), lengths)
+    np.save(os.path.join(tmp_path, "orig_lengths.npy"), np.array(orig_lengths, dtype=np.int64))
+    if os.path.isdir(cache_path):
+        shutil.rmtree(cache_path)
+    os.replace(tmp_path, cache_path)
+
+def load_prompt_cache(cache_path):
     """
-    CommonsenseQA 데이터셋을 불러오고, 전처리한 후 분산 샘플러와 DataLoader를 생성합니다.
+    build_prompt_cache로 만든 캐시를 memory-map으로 엽니다.
     """
-    # 데이터셋 로드 및 일부 샘플 선택
-    full_dataset = load_dataset("json", data_files="CommonsenseQA/train_rand_split.jsonl")["train"]
-    train_dataset = full_dataset.select(range(200))
-    
-    # 데이터 전처리
-    train_dataset = train_dataset.map(
-        lambda ex: preprocess_data(cfg, ex, tokenizer, "train"),
-        batched=True
-    )
-    train_dataset = train_dataset.map(
-        append_indices,
-        with_indices=True,
-        batched=True
-    )
-    
-    dist_sampler = DistributedSampler(train_dataset, rank=local_rank, num_replicas=num_devices, shuffle=True)
-    loader_kwargs = {
-        'batch_size': cfg.batch_size,
-        'sampler': dist_sampler,
-        'collate_fn': custom_collate
+    return {
+        name: np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode="r")
+        for name in ("input_ids", "offsets", "lengths", "orig_lengths")
     }
+
+def get_prompt_cache(cfg, tokenizer, records, prompt_text, data_file, data_range, local_rank, show_hint=False):
+    """
+    캐시가 없으면 rank 0이 만들고, 모든 rank가 memory-map으로 엽니다.
+    잘린 프롬프트 통계는 캐시의 길이로 한 번만 기록합니다.
+    """
+    key = prompt_cache_key(cfg, tokenizer, prompt_text, data_file, data_range, show_hint)
+    cache_path = os.path.join(cfg.cache_dir, key)
+    if local_rank == 0 and not os.path.isdir(cache_path):
+        os.makedirs(cfg.cache_dir, exist_ok=True)
+        build_prompt_cache(cfg, tokenizer, records, prompt_text, cache_path, show_hint)
+    if dist.is_available() and dist.is_initialized():
+        dist.barrier()
+    prompt_cache = load_prompt_cache(cache_path)
+
+    if local_rank == 0:
+        truncated = np.flatnonzero(prompt_cache["orig_lengths"] > cfg.max_length)
+        if len(truncated):
+            # 로그에 남길 프롬프트 문자열은 잘린 예제만 다시 만듭니다.
+            prompt_list = [""] * len(records)
+            for idx in truncated.tolist():
+                record = records[idx]
+                prompt_list[idx] = format_prompt(prompt_text, record["question"], record["answerKey"], show_hint)
+            warn_truncation(cfg, prompt_list, prompt_cache["orig_lengths"].tolist(), log_point="Data generation")
+    return prompt_cache
+
+class TokenizedPromptDataset(Dataset):
+    """
+    원본 예제와 토큰화 캐시를 묶은 Dataset입니다.
+    각 항목은 원본 필드와 idx, answer, 캐시의 input_ids, attention_mask, length를 가집니다.
+    """
+    def __init__(self, records, prompt_cache, pad_token_id, padding_side="left", indices=None):
+        self.records = records
+        self.prompt_cache = prompt_cache
+        self.pad_token_id = pad_token_id
+        self.padding_side = padding_side
+        self.indices = list(range(len(records))) if indices is None else list(indices)
+
+    @property
+    def lengths(self):
+        lengths = self.prompt_cache["lengths"]
+        return [int(lengths[idx]) for idx in self.indices]
+
+    def subset(self, indices):
+        """
+        원본 예제 인덱스(idx) 리스트로 같은 캐시를 공유하는 Dataset을 만듭니다.
+        """
+        return TokenizedPromptDataset(self.records, self.prompt_cache, self.pad_token_id, self.padding_side, indices)
+
+    def collate_fn(self):
+        return functools.partial(custom_collate, pad_token_id=self.pad_token_id, padding_side=self.padding_side)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, position):
+        idx = self.indices[position]
+        start, end = self.prompt_cache["offsets"][idx], self.prompt_cache["offsets"][idx + 1]
+        input_ids = self.prompt_cache["input_ids"][start:end].tolist()
+        item = dict(self.records[idx])
+        item["idx"] = idx
+        item["answer"] = item["answerKey"]
+        item["input_ids"] = input_ids
+        item["attention_mask"] = [1] * len(input_ids)
+        item["length"] = len(input_ids)
+        return item
+
+# ------------------------- DataLoader 관련 함수 -------------------------
+
+class DistributedLengthGroupedBatchSampler:
+    """
+    길이가 비슷한 예제끼리 배치를 만드는 분산 batch sampler입니다.
+
+    DistributedSampler처럼 매 epoch 전체 인덱스를 섞고 rank 수의 배수로 맞춘 뒤(부족하면 앞에서 반복,
+    drop_last면 뒤를 버림), mega batch 단위로 길이순 정렬해 num_replicas * batch_size 크기의 전역 배치로 자릅니다.
+    각 rank는 전역 배치에서 자기 몫의 연속 구간을 가져가므로 모든 rank의 배치 수가 같고,
+    배치마다 collective 통신을 해도 어긋나지 않습니다.
+    """
+    def __init__(self, lengths, batch_size, num_replicas, rank, shuffle=True, seed=0, drop_last=False,
+                 mega_batch_mult=50):
+        """
+        Args:
+            lengths: 예제별 토큰 길이 리스트
+            batch_size: rank별 배치 크기
+            mega_batch_mult: 길이순 정렬 범위(전역 배치의 몇 배). 클수록 padding이 줄고 배치 구성의 무작위성이 줄어듭니다.
+        """
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.seed = seed
+        self.mega_batch_mult = mega_batch_mult
+        self.epoch = 0
+        if drop_last:
+            self.total_size = len(self.lengths) // num_replicas * num_replicas
+        else:
+            self.total_size = math.ceil(len(self.lengths) / num_replicas) * num_replicas
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _global_batches(self):
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        if self.shuffle:
+            indices = torch.randperm(len(self.lengths), generator=generator).tolist()
+        else:
+            indices = list(range(len(self.lengths)))
+
+        padding = self.total_size - len(indices)
+        if padding > 0:
+            indices += (indices * math.ceil(padding / len(indices)))[:padding]
+        else:
+            indices = indices[:self.total_size]
+
+        global_size = self.batch_size * self.num_replicas
+        mega_size = global_size * self.mega_batch_mult
+        batches = []
+        for start in range(0, len(indices), mega_size):
+            mega_batch = sorted(indices[start:start + mega_size], key=lambda i: self.lengths[i], reverse=True)
+            batches.extend(mega_batch[i:i + global_size] for i in range(0, len(mega_batch), global_size))
+        if self.shuffle:
+            order = torch.randperm(len(batches), generator=generator).tolist()
+            batches = [batches[i] for i in order]
+        return batches
+
+    def __iter__(self):
+        for batch in self._global_batches():
+            # 마지막 전역 배치는 작을 수 있지만 크기가 항상 num_replicas의 배수입니다.
+            share = len(batch) // self.num_replicas
+            yield batch[self.rank * share:(self.rank + 1) * share]
+
+    def __len__(self):
+        return math.ceil(self.total_size / (self.batch_size * self.num_replicas))
+
+
+def _build_loader(cfg, dataset, local_rank, num_devices, batch_size, drop_last=False):
+    """
+    TokenizedPromptDataset으로 분산 DataLoader를 만듭니다.
+    cfg.group_by_length가 켜져 있으면 길이가 비슷한 예제끼리 배치를 만들고, 반환하는 sampler는 batch sampler입니다.
+    """
+    if cfg.group_by_length:
+        sampler = DistributedLengthGroupedBatchSampler(
+            dataset.lengths, batch_size, num_replicas=num_devices, rank=local_rank, shuffle=True, drop_last=drop_last
+        )
+        loader_kwargs = {
+            'batch_sampler': sampler,
+            'collate_fn': dataset.collate_fn()
+        }
+    else:
+        sampler = DistributedSampler(dataset, rank=local_rank, num_replicas=num_devices, shuffle=True, drop_last=drop_last)
+        loader_kwargs = {
+            'batch_size': batch_size,
+            'sampler': sampler,
+            'collate_fn': dataset.collate_fn()
+        }
     cuda_opts = {
         'num_workers': 4,
         'pin_memory': True,
         'shuffle': False
     }
     loader_kwargs.update(cuda_opts)
-    
-    data_loader = DataLoader(train_dataset, **loader_kwargs)
-    return data_loader, dist_sampler
 
-def create_incorrect_loader(cfg, wrong_data, local_rank, num_devices):
+    return DataLoader(dataset, **loader_kwargs), sampler
+
+def create_data_loader(cfg, tokenizer, local_rank, num_devices, prompt_text, show_hint=False):
+    """
+    CommonsenseQA 데이터셋을 불러오고, few-shot 프롬프트를 붙인 입력을 한 번만 토크나이징해 캐시한 뒤
+    분산 샘플러와 DataLoader를 생성합니다. 배치의 input_ids와 attention_mask는 바로 generate에 넣을 수 있습니다.
+    """
+    data_file = "CommonsenseQA/train_rand_split.jsonl"
+    data_range = range(200)
+    # 데이터셋 로드 및 일부 샘플 선택
+    full_dataset = load_dataset("json", data_files=data_file)["train"]
+    train_dataset = full_dataset.select(data_range)
+
+    prompt_cache = get_prompt_cache(cfg, tokenizer, train_dataset, prompt_text, data_file, data_range, local_rank, show_hint)
+    dataset = TokenizedPromptDataset(train_dataset, prompt_cache, tokenizer.pad_token_id, tokenizer.padding_side)
+    return _build_loader(cfg, dataset, local_rank, num_devices, cfg.batch_size)
+
+def create_incorrect_loader(cfg, wrong_data, local_rank, num_devices, prompt_dataset):
     """
     오답 예제 리스트를 기반으로 DataLoader를 생성합니다.
+    예제의 idx로 prompt_dataset의 토큰화 캐시를 그대로 다시 사용합니다.
     """
-    wrong_dataset = Dataset.from_list(wrong_data)
-    wrong_sampler = DistributedSampler(wrong_dataset, rank=local_rank, num_replicas=num_devices, shuffle=True, drop_last=True)
-    
-    loader_opts = {
-        'batch_size': cfg.test_batch_size,
-        'sampler': wrong_sampler,
-        'collate_fn': custom_collate
-    }
-    cuda_opts = {
-        'num_workers': 4,
-        'pin_memory': True,
-        'shuffle': False
-    }
-    loader_opts.update(cuda_opts)
-    
-    wrong_loader = DataLoader(wrong_dataset, **loader_opts)
-    return wrong_loader, wrong_sampler
+    wrong_dataset = prompt_dataset.subset([record["idx"] for record in wrong_data])
+    return _build_loader(cfg, wrong_dataset, local_rank, num_devices, cfg.test_batch_size, drop_last=True)
 
 # ------------------------- 모델 및 FSDP 래핑 관련 함수 -------------------------
 